@@ -0,0 +1,79 @@
+"""Headless voice-banking API: the Streamlit app's banking operations over HTTP/JSON.
+
+    python api_server.py --port 8080 --ledger-dir ledger_data
+    python api_server.py --port 0 --demo-accounts 32 --record mix.jsonl
+
+Prints ``listening on http://HOST:PORT`` once it accepts connections;
+SIGINT or SIGTERM stops accepting and drains running requests. See
+``utils.api.BankingAPI`` for the endpoints.
+"""
+import argparse
+import asyncio
+import os
+import signal
+
+from utils.api import BankingAPI
+from utils.credentials import SCRYPT_N, CredentialService
+from utils.risk import DEFAULT_LIMITS
+from utils.transaction_processor import TransactionProcessor
+from utils.voice_authentication import VoiceAuthenticator
+
+
+def build_api(args):
+    credentials = CredentialService(workers=args.kdf_workers, n=args.scrypt_n)
+    processor = TransactionProcessor(ledger_dir=args.ledger_dir, credentials=credentials,
+                                     risk_limits=DEFAULT_LIMITS if args.risk_limits else None)
+    for i in range(args.demo_accounts):
+        processor.open_account(f"demo{i:03d}", args.demo_pin, args.demo_funds)
+    voice = VoiceAuthenticator(state_dir=args.voice_dir, legacy_file=None) if args.voice_dir else None
+    return BankingAPI(processor, voice, workers=args.workers, voice_workers=args.voice_workers,
+                      max_inflight=args.max_inflight,
+                      max_connections=args.max_connections, batch_size=args.batch_size,
+                      batch_delay=args.batch_delay_ms / 1000, record=args.record,
+                      voice_attempts=args.voice_attempts, voice_lockout=args.voice_lockout)
+
+
+async def serve(args):
+    api = build_api(args)
+    host, port = await api.start(args.host, args.port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"listening on http://{host}:{port}", flush=True)
+    server = asyncio.create_task(api.serve_forever())
+    await stop.wait()
+    await api.close()
+    server.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", "8080")))
+    parser.add_argument("--ledger-dir", default=None, help="durable ledger directory (in-memory if unset)")
+    parser.add_argument("--voice-dir", default=None,
+                        help="voice profile store; the voice endpoints are off unless this is set")
+    parser.add_argument("--voice-attempts", type=int, default=5,
+                        help="failed voice logins per user before it gets 429")
+    parser.add_argument("--voice-lockout", type=float, default=300.0,
+                        help="seconds a failed voice login counts against its user")
+    parser.add_argument("--workers", type=int, default=4, help="threads for ledger and intent work")
+    parser.add_argument("--voice-workers", type=int, default=2, help="threads for voice enrollment and verification")
+    parser.add_argument("--kdf-workers", type=int, default=2, help="threads for PIN hashing")
+    parser.add_argument("--scrypt-n", type=int, default=SCRYPT_N)
+    parser.add_argument("--max-inflight", type=int, default=256, help="requests handled at once before 503")
+    parser.add_argument("--max-connections", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=64, help="most texts per batched classify call")
+    parser.add_argument("--batch-delay-ms", type=float, default=2.0, help="longest wait to fill a batch")
+    parser.add_argument("--record", default=None, help="append every banking request to this JSONL mix")
+    parser.add_argument("--risk-limits", action="store_true",
+                        help="block transfers over the default velocity and amount limits (utils.risk)")
+    parser.add_argument("--demo-accounts", type=int, default=0, help="open demo000.. accounts for load tests")
+    parser.add_argument("--demo-pin", default="1234")
+    parser.add_argument("--demo-funds", type=int, default=10**9)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Analytics benchmark: rollup query latency vs. scanning the account's history.
+
+Fills a ledger with a year of synthetic transfers, builds SpendingAnalytics
+over it, and times typical voice questions against a scan-and-sum over
+``Ledger.range``.
+
+    python -m benchmarks.bench_analytics --records 2000000
+"""
+import argparse
+import time
+from datetime import date, datetime
+
+from utils.analytics import PERIODS, SpendingAnalytics
+from utils.ledger import Ledger
+from utils.money import to_minor
+
+BATCH = 10000
+
+
+def fill(ledger, count, accounts, recipients, days):
+    now = int(time.time())
+    start = now - days * 86400
+    step = days * 86400 / count
+    batch = []
+    for i in range(count):
+        recipient = f"r{(i * 7) % recipients}"
+        batch.append({
+            'type': 'debit',
+            'amount_minor': (i % 5000) + 100,
+            'balance_minor': 10**12,
+            'account': f"acct{i % accounts}",
+            'counterparty': recipient,
+            'description': f"Transfer to {recipient}",
+            'ts': int(start + i * step),
+        })
+        if len(batch) == BATCH:
+            ledger.extend(batch)
+            batch = []
+    if batch:
+        ledger.extend(batch)
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1e6, result
+
+
+def scan_sent_to(ledger, account, recipient, period):
+    first, _ = PERIODS[period](date.today())
+    since = datetime.combine(first, datetime.min.time())
+    return sum((to_minor(r['amount']) for r in ledger.range(since, account=account, counterparty=recipient)), 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000000)
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--recipients", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    ledger = Ledger()
+    start = time.perf_counter()
+    fill(ledger, args.records, args.accounts, args.recipients, args.days)
+    print(f"ledger: {len(ledger):,} records in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    analytics = SpendingAnalytics(ledger)
+    print(f"rollups built from history in {time.perf_counter() - start:.2f}s")
+
+    account, recipient = "acct0", "r0"
+    queries = [
+        ("sent to r0 this month", lambda: analytics.sent_to(account, recipient, 'this month')),
+        ("sent to r0 this year", lambda: analytics.sent_to(account, recipient, 'this year')),
+        ("top 5 recipients last month", lambda: analytics.top_recipients(account, 5, 'last month')),
+        ("by counterparty, all time", lambda: analytics.by_counterparty(account)),
+        ("12 monthly totals", lambda: analytics.period_totals(account, 'month', 12)),
+    ]
+    for label, query in queries:
+        micros, _ = per_call(query, args.repeat)
+        print(f"{label:<30} {micros:9.1f} us")
+
+    for period in ('this month', 'this year'):
+        micros, total = per_call(lambda: scan_sent_to(ledger, account, recipient, period), 3)
+        rollup = to_minor(analytics.sent_to(account, recipient, period))
+        assert total == rollup, (total, rollup)
+        print(f"{'scan: sent to r0 ' + period:<30} {micros:9.1f} us  (matches rollup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Batch transfer benchmark: process_transfers_batch vs. per-call process_transfer.
+
+    python -m benchmarks.bench_batch --transfers 100000
+"""
+import argparse
+import random
+import time
+
+from utils.transaction_processor import TransactionProcessor
+
+RECIPIENTS = ["john", "mary", "alice", "bob", "priya", "arjun"]
+
+
+def make_commands(count, seed=0):
+    rng = random.Random(seed)
+    return [f"transfer {rng.randint(1, 50)} to {rng.choice(RECIPIENTS)}" for _ in range(count)]
+
+
+def make_structured(count, seed=0):
+    rng = random.Random(seed)
+    return [{'amount': rng.randint(1, 50), 'recipient': rng.choice(RECIPIENTS)} for _ in range(count)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.transfers
+    funds = n * 100
+
+    commands = make_commands(n)
+    structured = make_structured(n)
+
+    processor = TransactionProcessor()
+    processor.account_balance = funds
+    per_call = timed(lambda: [processor.process_transfer(c) for c in commands])
+
+    processor = TransactionProcessor()
+    processor.account_balance = funds
+    batch_text = timed(lambda: processor.process_transfers_batch(commands))
+
+    processor = TransactionProcessor()
+    processor.account_balance = funds
+    batch_structured = timed(lambda: processor.process_transfers_batch(structured, atomic=False))
+
+    print(f"per-call process_transfer     {n / per_call:>12,.0f} transfers/sec")
+    print(f"batch (free text, atomic)     {n / batch_text:>12,.0f} transfers/sec")
+    print(f"batch (structured, per-item)  {n / batch_structured:>12,.0f} transfers/sec")
+
+
+if __name__ == "__main__":
+    main()
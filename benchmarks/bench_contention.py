@@ -0,0 +1,61 @@
+"""Contention benchmark for the multi-account transfer engine.
+
+Runs random two-party transfers between internal accounts from 1..N
+threads and reports throughput for each thread count.
+
+    python -m benchmarks.bench_contention --accounts 1000 --transfers 200000
+"""
+import argparse
+import random
+import threading
+import time
+
+from utils.ledger import Ledger
+from utils.accounts import AccountStore
+from utils.money import to_minor
+
+
+def run(threads, accounts, transfers, shards):
+    store = AccountStore(Ledger(), shards=shards)
+    account_ids = [f"acct{i}" for i in range(accounts)]
+    for account_id in account_ids:
+        store.open_account(account_id, 1_000_000)
+
+    per_thread = transfers // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            source, recipient = rng.sample(account_ids, 2)
+            store.transfer(source, recipient, rng.randint(1, 100))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    # Money is only moved between internal accounts, so the total is invariant
+    assert sum(store.balances.values()) == accounts * to_minor(1_000_000)
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--transfers", type=int, default=200000)
+    parser.add_argument("--max-threads", type=int, default=8)
+    parser.add_argument("--shards", type=int, default=64)
+    args = parser.parse_args()
+
+    threads = 1
+    while threads <= args.max_threads:
+        rate = run(threads, args.accounts, args.transfers, args.shards)
+        print(f"threads={threads:<3} transfers/sec={rate:,.0f}")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Credential benchmark: PIN logins/sec under concurrency and event-loop lag while they run.
+
+Logins: ``--clients`` threads each log in repeatedly through one
+CredentialService with 1, 2 and 4 KDF workers; reports logins/sec and
+login latency. A token check, what a rerun costs after login, is timed
+for comparison.
+
+Event-loop lag: an asyncio loop ticks every millisecond and records how
+late each tick fires, standing in for the UI thread. It is measured
+idle, while the loop awaits logins run in the pool, and while the loop
+runs the same KDF inline (the naive way).
+
+    python -m benchmarks.bench_credentials --logins 48 --clients 8
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.credentials import SCRYPT_N, CredentialService, verify_pin
+
+TICK = 0.001
+
+
+def login_throughput(workers, clients, logins, n):
+    service = CredentialService(workers=workers, n=n)
+    accounts = [f"user{i}" for i in range(clients)]
+    for account in accounts:
+        service.set_pin(account, "1234")
+
+    def client(account):
+        latencies = []
+        for _ in range(logins // clients):
+            start = time.perf_counter()
+            assert service.login(account, "1234") is not None
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = np.concatenate([np.array(done) for done in pool.map(client, accounts)])
+    elapsed = time.perf_counter() - start
+    service.shutdown()
+    return len(latencies) / elapsed, np.percentile(latencies, [50, 99]) * 1000
+
+
+def token_check_us(n, calls=100000):
+    service = CredentialService(n=n)
+    service.set_pin("user", "1234")
+    token = service.login("user", "1234")
+    start = time.perf_counter()
+    for _ in range(calls):
+        service.check_token(token)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def ticker(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        due = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - due)
+
+
+async def loop_lag(mode, logins, n, workers):
+    service = CredentialService(workers=workers, n=n)
+    service.set_pin("user", "1234")
+    record = service._records["user"]
+    lags = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(0.05)
+    if mode == "idle":
+        await asyncio.sleep(0.5)
+    elif mode == "pool":
+        await asyncio.gather(*(asyncio.wrap_future(service.verify("user", "1234")) for _ in range(logins)))
+    else:
+        for _ in range(logins):
+            verify_pin("1234", record)
+            await asyncio.sleep(0)
+    stop.set()
+    await task
+    service.shutdown()
+    lags = np.array(lags) * 1000
+    return len(lags), np.percentile(lags, [50, 99]), lags.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=48)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--n", type=int, default=SCRYPT_N, help="scrypt cost (power of two)")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'logins/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in (1, 2, 4):
+        rate, (p50, p99) = login_throughput(workers, args.clients, args.logins, args.n)
+        print(f"{workers:>8} {rate:>10.1f} {p50:>8.1f} {p99:>8.1f}")
+    print(f"token check: {token_check_us(args.n):.1f} us")
+
+    print(f"\n{'event loop':<22} {'ticks':>6} {'p50 lag ms':>11} {'p99 lag ms':>11} {'max ms':>8}")
+    for mode in ("idle", "pool", "inline"):
+        ticks, (p50, p99), worst = asyncio.run(loop_lag(mode, args.logins // 4, args.n, 2))
+        label = {"idle": "idle", "pool": "logins in pool", "inline": "logins inline (naive)"}[mode]
+        print(f"{label:<22} {ticks:>6} {p50:>11.2f} {p99:>11.2f} {worst:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
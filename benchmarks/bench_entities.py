@@ -0,0 +1,178 @@
+"""Entity extraction benchmark: EntityParser vs. the regex-and-dict extractors it replaced.
+
+Builds a transcript corpus with known answers: transfer commands with
+digit, grouped ("1,500.50") and spoken ("five hundred and twenty")
+amounts and trailing fillers ("to john please"), plus spoken PINs. Each
+extractor is scored for throughput and for how many amounts, recipients
+and PINs it gets right. The legacy path is the two functions a caller
+needed for the same answers (transfer details and PIN digits).
+
+Two corpora are timed: every transcript unique, and a session log that
+draws transcripts from a fixed vocabulary with Zipf frequencies, the way
+a deployed voice app hears the same commands again and again.
+
+    python -m benchmarks.bench_entities --commands 1000000
+"""
+import argparse
+import re
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from benchmarks.corpus import DIGIT_WORDS, NAMES
+from utils.entities import EntityParser
+
+TEENS = ["ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+         "seventeen", "eighteen", "nineteen"]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+TEMPLATES = [
+    "transfer {amount} to {name}",
+    "send {amount} rupees to {name} please",
+    "please pay {amount} rs to {name} now",
+    "send money {amount} to {name} for dinner",
+]
+
+
+def spoken(n):
+    """``n`` (< 100000) in words: 1520 -> "one thousand five hundred and twenty" """
+    words = []
+    if n >= 1000:
+        words += [spoken(n // 1000), "thousand"]
+        n %= 1000
+    if n >= 100:
+        words += [DIGIT_WORDS[n // 100], "hundred"]
+        n %= 100
+        if n:
+            words.append("and")
+    if n >= 20:
+        words.append(TENS[n // 10])
+        if n % 10:
+            words.append(DIGIT_WORDS[n % 10])
+    elif n >= 10:
+        words.append(TEENS[n - 10])
+    elif n or not words:
+        words.append(DIGIT_WORDS[n])
+    return " ".join(words)
+
+
+def make_corpus(count, seed=0):
+    """``[(text, amount, recipient, pin)]``; amount/recipient are None for PIN phrases"""
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(10, size=count).tolist()
+    amounts = rng.integers(1, 20000, size=count).tolist()
+    cents = rng.integers(0, 100, size=count).tolist()
+    names = rng.integers(len(NAMES), size=count).tolist()
+    templates = rng.integers(len(TEMPLATES), size=count).tolist()
+    pins = rng.integers(10, size=(count, 4)).tolist()
+    items = []
+    for kind, amount, cent, name, template, pin in zip(kinds, amounts, cents, names, templates, pins):
+        if kind < 3:
+            pin = "".join(map(str, pin))
+            words = " ".join(DIGIT_WORDS[int(d)] for d in pin) if kind else " ".join(pin)
+            items.append((f"my pin is {words}.", None, None, pin))
+            continue
+        if kind < 5:
+            said, value = spoken(amount), Decimal(amount)
+        elif kind < 7:
+            said, value = f"{amount:,}.{cent:02d}", Decimal(f"{amount}.{cent:02d}")
+        else:
+            said, value = str(amount), Decimal(amount)
+        items.append((TEMPLATES[template].format(amount=said, name=NAMES[name]), value, NAMES[name], None))
+    return items
+
+
+def session_log(corpus, count, vocabulary=5000, seed=0):
+    """``count`` transcripts drawn from the first ``vocabulary`` with Zipf frequencies"""
+    rng = np.random.default_rng(seed)
+    picks = (rng.zipf(1.2, size=count) - 1) % min(vocabulary, len(corpus))
+    return [corpus[i][0] for i in picks.tolist()]
+
+
+def legacy_transfer(text):
+    """The extractor before EntityParser: two uncompiled searches"""
+    amount_pattern = r'(\d+(?:\.\d{1,2})?)(?:\s*(?:dollars|rupees|rs|inr|\$))?'
+    recipient_pattern = r'(?:to|for)\s+([a-zA-Z\s]+)'
+    amount_match = re.search(amount_pattern, text)
+    recipient_match = re.search(recipient_pattern, text.lower())
+    amount = Decimal(amount_match.group(1)) if amount_match else None
+    recipient = recipient_match.group(1).strip() if recipient_match else None
+    return amount, recipient
+
+
+def legacy_pin(text):
+    """The PIN extractor before EntityParser: a dict built per call, word by word"""
+    number_words = {
+        'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+        'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9',
+        'ten': '10', 'eleven': '11', 'twelve': '12', 'thirteen': '13',
+        'fourteen': '14', 'fifteen': '15', 'sixteen': '16', 'seventeen': '17',
+        'eighteen': '18', 'nineteen': '19', 'twenty': '20'
+    }
+    pin_digits = ""
+    for word in text.lower().split():
+        clean_word = word.strip('.,!?')
+        if clean_word in number_words:
+            pin_digits += number_words[clean_word]
+        elif clean_word.isdigit():
+            pin_digits += clean_word
+    return pin_digits
+
+
+def legacy(texts):
+    return [legacy_transfer(text) + (legacy_pin(text),) for text in texts]
+
+
+def accuracy(corpus, answers):
+    """Share of right amounts, recipients and PINs"""
+    right = {'amount': 0, 'recipient': 0, 'pin': 0}
+    totals = {'amount': 0, 'recipient': 0, 'pin': 0}
+    for (_, amount, recipient, pin), (got_amount, got_recipient, got_digits) in zip(corpus, answers):
+        if pin is not None:
+            totals['pin'] += 1
+            right['pin'] += got_digits == pin
+        else:
+            totals['amount'] += 1
+            totals['recipient'] += 1
+            right['amount'] += got_amount == amount
+            right['recipient'] += got_recipient == recipient
+    return {key: right[key] / totals[key] for key in right if totals[key]}
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    result = fn(texts)
+    return len(texts) / (time.perf_counter() - start), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=300000)
+    parser.add_argument("--vocabulary", type=int, default=5000, help="distinct transcripts in the session log")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.commands)
+    texts = [item[0] for item in corpus]
+    log = session_log(corpus, args.commands, args.vocabulary)
+
+    def parse_each(texts):
+        parse = EntityParser().parse
+        return [(e.amount, e.recipient, e.digits) for e in map(parse, texts)]
+
+    def parse_many(texts):
+        return [(e.amount, e.recipient, e.digits) for e in EntityParser().parse_many(texts)]
+
+    print(f"{'corpus':<12} {'extractor':<24} {'commands/s':>12} {'speedup':>8}")
+    for label, batch in (("unique", texts), ("session log", log)):
+        base, legacy_answers = timed(legacy, batch)
+        print(f"{label:<12} {'legacy regex + dict':<24} {base:>12,.0f} {1:>7.1f}x")
+        for name, fn in (("EntityParser.parse", parse_each), ("EntityParser.parse_many", parse_many)):
+            rate, answers = timed(fn, batch)
+            print(f"{label:<12} {name:<24} {rate:>12,.0f} {rate / base:>7.1f}x")
+        if label == "unique":
+            print(f"{'':<12} accuracy legacy {accuracy(corpus, legacy_answers)}")
+            print(f"{'':<12} accuracy parser {accuracy(corpus, answers)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Export/import benchmark: columnar streaming throughput and peak memory.
+
+Builds a synthetic ledger, streams it out in each available format, and
+loads it back into a fresh ledger with ``import_ledger``, against the
+record-dict ``Ledger.extend`` path. Peak memory is measured with
+tracemalloc and should stay flat as ``--records`` grows.
+
+    python -m benchmarks.bench_export --records 2000000
+    python -m benchmarks.bench_export --formats csv parquet arrow
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.ledger import RECORD_DTYPE, Ledger
+from utils.ledger_io import export_ledger, import_ledger
+
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrows'}
+
+
+def synthetic(count, accounts, recipients):
+    rows = np.empty(count, dtype=RECORD_DTYPE)
+    index = np.arange(count)
+    rows['ts'] = int(time.time()) - count + index
+    rows['amount'] = index % 5000 + 100
+    rows['balance'] = 10**12 - index
+    rows['account'] = index % accounts
+    rows['counterparty'] = accounts + index % recipients
+    rows['description'] = accounts + recipients + index % recipients
+    rows['type'] = 0
+    names = ([f"acct{i}" for i in range(accounts)] + [f"r{i}" for i in range(recipients)]
+             + [f"Transfer to r{i}" for i in range(recipients)])
+    ledger = Ledger()
+    ledger.extend_rows(rows, names)
+    return ledger
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(fn):
+    """Peak traced allocation of a second, untimed run (tracemalloc slows Python code)"""
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def load(path):
+    target = Ledger()
+    import_ledger(target, path)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "arrow"])
+    args = parser.parse_args()
+    n = args.records
+
+    ledger = synthetic(n, args.accounts, args.recipients)
+    print(f"ledger: {n:,} records")
+    with tempfile.TemporaryDirectory() as directory:
+        for format in args.formats:
+            path = os.path.join(directory, "ledger" + EXTENSIONS[format])
+            try:
+                _, elapsed = timed(lambda: export_ledger(ledger, path))
+            except ImportError as e:
+                print(f"{format:<8} skipped ({e})")
+                continue
+            peak = peak_memory(lambda: export_ledger(ledger, path))
+            print(f"{format:<8} export {n / elapsed:>12,.0f} rows/s  peak {peak / 2**20:6.1f} MiB  "
+                  f"file {os.path.getsize(path) / n:5.1f} B/row")
+
+            target, elapsed = timed(lambda: load(path))
+            assert len(target) == n and (target.rows()['amount'] == ledger.rows()['amount']).all()
+            ledger_bytes = target.rows().nbytes
+            del target
+            peak = peak_memory(lambda: load(path))
+            print(f"{format:<8} import {n / elapsed:>12,.0f} rows/s  peak {peak / 2**20:6.1f} MiB  "
+                  f"(rows alone {ledger_bytes / 2**20:.1f} MiB)")
+
+    # The record-at-a-time path an import would otherwise take
+    count = min(n, 200000)
+    records = ledger[:count]
+    fresh = Ledger()
+    _, elapsed = timed(lambda: [fresh.extend(records[offset:offset + 10000]) for offset in range(0, count, 10000)])
+    print(f"Ledger.extend of record dicts {count / elapsed:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Feature extraction benchmark for bulk re-enrollment of a voice archive.
+
+Compares one-clip-at-a-time extraction, a single batched call, and the
+process-pool archive path. Adds librosa as a reference when installed.
+
+    python -m benchmarks.bench_features --clips 512 --seconds 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from utils.audio import AudioClip
+from utils.features import FeatureExtractor, embed_archive
+
+SAMPLE_RATE = 16000
+
+
+def write_archive(directory, count, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"clip{i}.wav")
+        AudioClip.from_samples(rng.normal(scale=0.1, size=int(seconds * SAMPLE_RATE)), SAMPLE_RATE).save(path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=512)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = write_archive(directory, args.clips, args.seconds)
+        clips = [AudioClip.from_wav(path) for path in paths]
+
+        try:
+            import librosa
+            start = time.perf_counter()
+            for path in paths:
+                wav, sr = librosa.load(path, sr=SAMPLE_RATE)
+                librosa.feature.mfcc(y=wav, sr=sr, n_mfcc=13).mean(axis=1)
+            print(f"librosa per clip      {args.clips / (time.perf_counter() - start):>10,.1f} clips/sec")
+        except ImportError:
+            pass
+
+        extractor = FeatureExtractor()
+        start = time.perf_counter()
+        for clip in clips:
+            extractor.embed(clip)
+        print(f"FeatureExtractor.embed {args.clips / (time.perf_counter() - start):>9,.1f} clips/sec")
+
+        extractor = FeatureExtractor()
+        start = time.perf_counter()
+        extractor.embed_batch(clips)
+        print(f"embed_batch            {args.clips / (time.perf_counter() - start):>9,.1f} clips/sec")
+
+        start = time.perf_counter()
+        extractor.embed_batch(clips)
+        print(f"embed_batch (memo hit) {args.clips / (time.perf_counter() - start):>9,.1f} clips/sec")
+
+        start = time.perf_counter()
+        embed_archive(paths, processes=args.processes)
+        print(f"embed_archive x{args.processes:<7} {args.clips / (time.perf_counter() - start):>9,.1f} clips/sec")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
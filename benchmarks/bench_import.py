@@ -0,0 +1,102 @@
+"""Import-time report: cold-start cost of the utils package and the app's imports.
+
+Runs each scenario in a fresh interpreter under ``python -X importtime``,
+prints the total and the slowest modules, and lists heavy dependencies
+that were loaded although the scenario should not need them. With
+``--check`` any such dependency fails the run (exit status 1), so this
+doubles as a regression test for lazy loading.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --check --top 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario -> (statement, dependencies it must not pull in)
+AUDIO = ('speech_recognition', 'pyaudio')
+CHARTS = ('pandas', 'plotly')
+MODELS = ('torch', 'transformers', 'whisper')
+COLUMNAR = ('pyarrow',)
+SCENARIOS = {
+    'import utils': ("import utils", ('numpy',) + AUDIO + CHARTS + MODELS + COLUMNAR),
+    'TransactionProcessor': ("from utils import TransactionProcessor", AUDIO + CHARTS + MODELS + COLUMNAR),
+    'app imports + recorder': (
+        "from utils.voice_authentication import VoiceAuthenticator\n"
+        "from utils.transaction_processor import TransactionProcessor\n"
+        "from utils.realtime_recorder import RealTimeRecorder\n"
+        "from utils.intent_model import TransformersIntentBackend\n"
+        "from utils.stt import GoogleSTT, STTWorkerPool, WhisperSTT\n"
+        "from utils.sessions import SessionManager\n"
+        "from utils.pipeline import CommandPipeline\n"
+        "RealTimeRecorder()",
+        AUDIO + CHARTS + MODELS + COLUMNAR,
+    ),
+}
+REPORT = "import sys; print(','.join(sorted(sys.modules)), file=sys.stderr)"
+
+
+def profile(statement, startup=()):
+    """``(total_us, [(cumulative_us, module)], loaded)`` for one fresh interpreter
+
+    Modules named in ``startup`` (those the bare interpreter imports) are
+    left out of the total and the module list.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{statement}\n{REPORT}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = result.stderr.splitlines()
+    loaded = set(lines.pop().split(','))
+    total = 0
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        top_level = not name[1:].startswith(" ")
+        name = name.strip()
+        if name in startup:
+            continue
+        if top_level:
+            total += int(cumulative)
+        modules.append((int(cumulative), name))
+    return total, modules, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--check", action="store_true", help="exit 1 if a scenario loads a forbidden module")
+    args = parser.parse_args()
+
+    # Whatever the bare interpreter imports is not charged to a scenario
+    _, startup, _ = profile("pass")
+    startup = {name for _, name in startup}
+    failures = 0
+    for label, (statement, forbidden) in SCENARIOS.items():
+        try:
+            total, modules, loaded = profile(statement, startup)
+        except RuntimeError as e:
+            failures += 1
+            print(f"{label:<24}   failed: {e}")
+            continue
+        unexpected = sorted(name for name in forbidden if name in loaded)
+        failures += bool(unexpected)
+        print(f"{label:<24} {total / 1000:8.1f} ms")
+        for cumulative, name in sorted(modules, reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+        if unexpected:
+            print(f"    loaded eagerly: {', '.join(unexpected)}")
+
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
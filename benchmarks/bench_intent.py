@@ -0,0 +1,79 @@
+"""Intent classification micro-benchmark over a synthetic command corpus.
+
+Compares the compiled IntentMatcher with the original any() keyword chains.
+
+    python -m benchmarks.bench_intent --commands 200000
+"""
+import argparse
+import random
+import time
+
+from utils.intent import IntentMatcher
+
+TEMPLATES = [
+    "transfer {amount} to {name}",
+    "please send {amount} rupees to {name}",
+    "pay {name} {amount}",
+    "check my balance",
+    "what is my account balance",
+    "show last {count} transactions",
+    "give me my statement",
+    "change my pin",
+    "reset pin please",
+    "good morning how are you",
+]
+NAMES = ["john", "mary", "alice", "bob", "priya", "arjun"]
+
+
+def make_corpus(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(amount=rng.randint(1, 5000), name=rng.choice(NAMES), count=rng.randint(1, 10))
+        for _ in range(count)
+    ]
+
+
+def legacy_classify(text):
+    """The keyword any() chains the matcher replaced"""
+    text_lower = text.lower()
+    if any(word in text_lower for word in ['transfer', 'send', 'pay', 'send money']):
+        return 'transfer'
+    elif any(word in text_lower for word in ['balance', 'check balance', 'account balance']):
+        return 'balance'
+    elif any(word in text_lower for word in ['transaction', 'history', 'statement', 'transactions']):
+        return 'transactions'
+    elif any(word in text_lower for word in ['pin', 'change pin', 'reset pin', 'update pin']):
+        return 'change_pin'
+    return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=200000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.commands)
+    matcher = IntentMatcher()
+
+    start = time.perf_counter()
+    legacy = [legacy_classify(text) for text in corpus]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [matcher.classify(text) for text in corpus]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher.classify_many(corpus)
+    batch_time = time.perf_counter() - start
+
+    agree = sum(a == b[0] for a, b in zip(legacy, single)) / len(corpus)
+    n = len(corpus)
+    print(f"legacy any() chains   {n / legacy_time:>12,.0f} commands/sec")
+    print(f"IntentMatcher         {n / single_time:>12,.0f} commands/sec")
+    print(f"classify_many         {n / batch_time:>12,.0f} commands/sec")
+    print(f"agreement with legacy {agree:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Ledger memory benchmark: bytes per transaction, compact rows vs. per-record dicts.
+
+Builds the same synthetic transfer history twice and measures the Python
+heap with tracemalloc: once in the Ledger's fixed-width rows, once as the
+dict-per-record layout (with list indexes) the ledger used before.
+
+    python -m benchmarks.bench_memory --records 1000000
+    python -m benchmarks.bench_memory --records 10000000 --skip-legacy
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+
+from utils.ledger import Ledger
+
+BATCH = 10000
+
+
+def synthetic(count, accounts, recipients, start_ts):
+    """Debit legs as AccountStore writes them, in batches"""
+    batch = []
+    for i in range(count):
+        recipient = f"r{i % recipients}"
+        batch.append({
+            'type': 'debit',
+            'amount_minor': (i % 5000) + 100,
+            'balance_minor': 10**12 - i * 2600,
+            'account': f"acct{i % accounts}",
+            'counterparty': recipient,
+            'description': f"Transfer to {recipient}",
+            'ts': start_ts + i // 10,
+        })
+        if len(batch) == BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def legacy_layout(batches):
+    """The previous in-memory layout: one dict per record plus list indexes"""
+    records, timestamps, by_account, by_counterparty, by_pair = [], [], {}, {}, {}
+    for batch in batches:
+        for item in batch:
+            seq = len(records)
+            ts = float(item['ts'])
+            record = {
+                'date': datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'),
+                'type': item['type'],
+                'amount': item['amount_minor'] / 100,
+                'description': f"Transfer to {item['counterparty']}",
+                'balance_after': item['balance_minor'] / 100,
+                'account': item['account'],
+                'counterparty': item['counterparty'],
+                'ts': ts,
+                'seq': seq,
+            }
+            records.append(record)
+            timestamps.append(ts)
+            by_account.setdefault(record['account'], []).append(seq)
+            by_counterparty.setdefault(record['counterparty'], []).append(seq)
+            by_pair.setdefault((record['account'], record['counterparty']), []).append(seq)
+    return records, timestamps, by_account, by_counterparty, by_pair
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+    n = args.records
+    start_ts = int(time.time()) - n
+
+    def build_ledger():
+        ledger = Ledger()
+        for batch in synthetic(n, args.accounts, args.recipients, start_ts):
+            ledger.extend(batch)
+        return ledger
+
+    ledger, current, peak, elapsed = measure(build_ledger)
+    compact = current / n
+    print(f"compact rows:  {compact:8.1f} bytes/record  (row {ledger.rows().dtype.itemsize} B, "
+          f"peak {peak / n:.1f}, {n / elapsed:,.0f} records/s)")
+    print(f"  projected for 10M records: {compact * 10_000_000 / 2**20:,.0f} MiB")
+    del ledger
+
+    if not args.skip_legacy:
+        layout, current, peak, elapsed = measure(
+            lambda: legacy_layout(synthetic(n, args.accounts, args.recipients, start_ts)))
+        legacy = current / n
+        print(f"dict records:  {legacy:8.1f} bytes/record  (peak {peak / n:.1f}, {n / elapsed:,.0f} records/s)")
+        print(f"  projected for 10M records: {legacy * 10_000_000 / 2**20:,.0f} MiB")
+        print(f"reduction: {legacy / compact:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Metrics overhead: cost per call of counters, histograms, timers and the sampling profiler.
+
+Times each instrumentation primitive in a tight loop against an empty
+loop, so the numbers are the added cost per instrumented call, then runs
+a CPU-bound function with and without the sampling profiler attached.
+
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --calls 1000000
+"""
+import argparse
+import time
+
+from utils.metrics import MetricsRegistry, SamplingProfiler
+
+
+def per_call_ns(fn, calls):
+    clock = time.perf_counter_ns
+    start = clock()
+    for _ in range(calls):
+        fn()
+    return (clock() - start) / calls
+
+
+def busy(n):
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    counter = registry.counter('bench_total', stage='execute')
+    histogram = registry.histogram('bench_seconds', stage='execute')
+
+    def timed():
+        with histogram.time():
+            pass
+
+    def timed_lookup():
+        with registry.timer('bench_seconds', stage='execute'):
+            pass
+
+    @registry.timed('bench_decorated_seconds')
+    def decorated():
+        pass
+
+    empty = per_call_ns(lambda: None, args.calls)
+    cases = [
+        ("counter.inc", counter.inc),
+        ("histogram.observe", lambda: histogram.observe(0.0042)),
+        ("histogram.time()", timed),
+        ("registry.timer() with lookup", timed_lookup),
+        ("@registry.timed", decorated),
+    ]
+    print(f"{'primitive':<30} {'ns/call':>10}")
+    for label, fn in cases:
+        print(f"{label:<30} {per_call_ns(fn, args.calls) - empty:>10.0f}")
+
+    n = 2_000_000
+    start = time.perf_counter()
+    busy(n)
+    plain = time.perf_counter() - start
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.start()
+    start = time.perf_counter()
+    busy(n)
+    profiled = time.perf_counter() - start
+    profiler.stop()
+    print(f"\nsampling profiler: {plain * 1000:.1f} ms -> {profiled * 1000:.1f} ms "
+          f"({profiled / plain - 1:+.1%}), {profiler.samples} samples")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Command pipeline benchmark: staged throughput vs running each command serially.
+
+Recording and speech-to-text are simulated with sleeps of the given
+durations (they are I/O- or device-bound in the app); intent and execution
+use the real TransactionProcessor.
+
+    python -m benchmarks.bench_pipeline --commands 40 --record-ms 50 --stt-ms 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.audio import AudioClip
+from utils.pipeline import CommandPipeline
+from utils.sessions import SessionManager
+from utils.transaction_processor import TransactionProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=40)
+    parser.add_argument("--record-ms", type=float, default=50)
+    parser.add_argument("--stt-ms", type=float, default=200)
+    parser.add_argument("--stt-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    processor = TransactionProcessor()
+    session = SessionManager(processor).get("bench")
+    processor.open_account("bench", "1234")
+    session.login("bench", "1234")
+    clip = AudioClip.from_samples(np.zeros(1600), 16000)
+
+    def record():
+        time.sleep(args.record_ms / 1000)
+        return clip
+
+    def transcribe(clip):
+        time.sleep(args.stt_ms / 1000)
+        return "transfer 1 to alice"
+
+    start = time.perf_counter()
+    for _ in range(args.commands):
+        text = transcribe(record())
+        session.run_command(text)
+    serial = time.perf_counter() - start
+
+    pipeline = CommandPipeline(transcribe, processor.classify_intent, stt_workers=args.stt_workers)
+    start = time.perf_counter()
+    jobs = [pipeline.submit(source=record, handler=session.execute) for _ in range(args.commands)]
+    for job in jobs:
+        job.wait()
+    staged = time.perf_counter() - start
+    failed = sum(job.error is not None for job in jobs)
+
+    print(f"serial:    {serial:6.2f}s  {args.commands / serial:6.1f} commands/s")
+    print(f"pipelined: {staged:6.2f}s  {args.commands / staged:6.1f} commands/s  ({failed} failed)")
+    print(f"slowest-stage bound: {1 / max(args.record_ms / 1000, args.stt_ms / 1000 / args.stt_workers):6.1f} commands/s")
+
+    # The voice PIN change transcribes three clips; they now overlap
+    start = time.perf_counter()
+    for job in pipeline.transcribe_many([clip] * 3):
+        job.wait()
+    print(f"3 PIN clips: {time.perf_counter() - start:.2f}s (serial {3 * args.stt_ms / 1000:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
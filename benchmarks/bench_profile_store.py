@@ -0,0 +1,61 @@
+"""Profile store benchmark: enrollment cost and startup time vs. population.
+
+    python -m benchmarks.bench_profile_store --sizes 1000 10000 100000
+"""
+import argparse
+import pickle
+import shutil
+import tempfile
+import time
+import os
+
+import numpy as np
+
+from utils.profile_store import ProfileStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=13)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            embeddings = rng.normal(size=(size, args.dim)).astype(np.float32)
+            store = ProfileStore(directory, dim=args.dim)
+            for i, embedding in enumerate(embeddings):
+                store.put(f"user{i}", embedding, enrolled_at=time.time())
+
+            start = time.perf_counter()
+            store.put("one_more", embeddings[0], enrolled_at=time.time())
+            enroll = time.perf_counter() - start
+            store.close()
+
+            start = time.perf_counter()
+            reopened = ProfileStore(directory, dim=args.dim)
+            startup = time.perf_counter() - start
+            reopened.close()
+
+            # The whole-dict pickle rewrite the store replaced
+            legacy = {f"user{i}": {'enrolled_at': 0.0, 'embedding': e.tolist()} for i, e in enumerate(embeddings)}
+            legacy_path = os.path.join(directory, "legacy.pkl")
+            start = time.perf_counter()
+            with open(legacy_path, 'wb') as f:
+                pickle.dump(legacy, f)
+            legacy_enroll = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(legacy_path, 'rb') as f:
+                pickle.load(f)
+            legacy_startup = time.perf_counter() - start
+
+            print(f"n={size:<8} enroll={enroll * 1000:.2f}ms startup={startup * 1000:.1f}ms | "
+                  f"pickle enroll={legacy_enroll * 1000:.1f}ms startup={legacy_startup * 1000:.1f}ms")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
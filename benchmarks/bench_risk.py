@@ -0,0 +1,115 @@
+"""Risk-check benchmark: streaming windowed checks vs. scanning the ledger, and their cost per transfer.
+
+Builds a ledger with ``--history`` debits spread over the last two days
+across ``--accounts`` accounts, then measures:
+
+- ``RiskEngine.check_minor`` on its own, per call;
+- AccountStore.transfer with and without the engine (UNLIMITED limits,
+  so every check runs and nothing is vetoed), as throughput and added
+  latency per transfer;
+- the naive check the engine replaces, which scans the ledger for the
+  account's last-minute/hour/day debits, at growing history sizes.
+
+    python -m benchmarks.bench_risk --history 1000000 --transfers 200000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.accounts import AccountStore
+from utils.ledger import Ledger
+from utils.risk import UNLIMITED, RiskEngine
+
+RECIPIENTS = [f"payee{i}" for i in range(200)]
+
+
+def build_ledger(history, accounts, seed=0):
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    ts = np.sort(rng.integers(now - 2 * 86400, now, size=history)).tolist()
+    sources = rng.integers(accounts, size=history).tolist()
+    recipients = rng.integers(len(RECIPIENTS), size=history).tolist()
+    amounts = rng.integers(100, 500000, size=history).tolist()
+    ledger = Ledger()
+    for start in range(0, history, 100000):
+        ledger.extend([
+            {'type': 'debit', 'amount_minor': amount, 'balance_minor': 0, 'account': f"acct{source}",
+             'counterparty': RECIPIENTS[recipient], 'description': '', 'ts': t}
+            for t, source, recipient, amount in zip(ts[start:start + 100000], sources[start:start + 100000],
+                                                    recipients[start:start + 100000], amounts[start:start + 100000])
+        ])
+    return ledger
+
+
+def naive_check(ledger, account_id, amount, now):
+    """What a scan-based check costs: every record, every transfer"""
+    totals = {60: [0, 0], 3600: [0, 0], 86400: [0, 0]}
+    for record in ledger:
+        if record['account'] != account_id or record['type'] != 'debit':
+            continue
+        age = now - record['ts']
+        for span, total in totals.items():
+            if age < span:
+                total[0] += 1
+                total[1] += record['amount']
+    return totals[60][0] < 5 and totals[86400][1] + amount < 200000
+
+
+def per_call_us(fn, args):
+    latencies = np.empty(len(args))
+    clock = time.perf_counter
+    start = clock()
+    for i, arg in enumerate(args):
+        t = clock()
+        fn(*arg)
+        latencies[i] = clock() - t
+    return len(args) / (clock() - start), np.percentile(latencies, [50, 99]) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=200000, help="debits already in the ledger")
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--transfers", type=int, default=100000)
+    parser.add_argument("--naive-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+
+    ledger = build_ledger(args.history, args.accounts)
+    start = time.perf_counter()
+    engine = RiskEngine(ledger, UNLIMITED, replay_limit=args.history)
+    print(f"replayed {args.history:,} rows into the windows in {time.perf_counter() - start:.2f}s")
+
+    sources = [f"acct{i}" for i in rng.integers(args.accounts, size=args.transfers).tolist()]
+    payees = [RECIPIENTS[i] for i in rng.integers(len(RECIPIENTS), size=args.transfers).tolist()]
+    amounts = rng.integers(100, 50000, size=args.transfers).tolist()
+    rate, (p50, p99) = per_call_us(engine.check_minor, list(zip(sources, payees, amounts)))
+    print(f"\n{'check_minor':<28} {rate:>12,.0f} checks/s   p50 {p50:>6.2f} us  p99 {p99:>6.2f} us")
+
+    print(f"\n{'transfer path':<28} {'transfers/s':>12} {'p50 us':>8} {'p99 us':>8}")
+    transfers = list(zip(sources, payees, [amount / 100 for amount in amounts]))
+    results = {}
+    for label, risk in (("AccountStore.transfer", False), ("  + RiskEngine", True)):
+        store_ledger = Ledger()
+        store = AccountStore(store_ledger, risk=RiskEngine(store_ledger, UNLIMITED) if risk else None)
+        for i in range(args.accounts):
+            store.open_account(f"acct{i}", 10**9)
+        results[label] = per_call_us(store.transfer, transfers)
+        rate, (p50, p99) = results[label]
+        print(f"{label:<28} {rate:>12,.0f} {p50:>8.2f} {p99:>8.2f}")
+    (plain, (plain_p50, _)), (checked, (checked_p50, _)) = results.values()
+    print(f"{'added per transfer':<28} {1e6 / checked - 1e6 / plain:>11.2f}us {checked_p50 - plain_p50:>8.2f}")
+
+    print(f"\n{'naive scan, history':<28} {'checks/s':>12} {'p50 us':>8}")
+    for size in args.naive_sizes:
+        small = build_ledger(size, args.accounts, seed=2)
+        now = int(time.time())
+        calls = max(3, min(200, 2000000 // size))
+        rate, (p50, _) = per_call_us(lambda account, amount: naive_check(small, account, amount, now),
+                                     list(zip(sources[:calls], amounts[:calls])))
+        print(f"{size:<28,} {rate:>12,.1f} {p50:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
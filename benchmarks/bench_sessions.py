@@ -0,0 +1,73 @@
+"""Session load test: per-request latency as concurrent sessions grow.
+
+Simulates browser sessions that log in to their own account and then issue
+a mix of balance checks, transfers and history reads through SessionManager
+handles over one shared TransactionProcessor.
+
+    python -m benchmarks.bench_sessions --sessions 50 200 800 --requests 20
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.credentials import CredentialService
+from utils.sessions import SessionManager
+from utils.transaction_processor import TransactionProcessor
+
+PIN = "1234"
+COMMANDS = [
+    "check balance",
+    "transfer 5 to alice",
+    "show transactions",
+    "what is my balance",
+    "send 3 to bob",
+]
+
+
+def run(manager, sessions, requests, threads, seed):
+    ids = [manager.new_session_id() for _ in range(sessions)]
+    for n, session_id in enumerate(ids):
+        manager.processor.open_account(f"load{n}", PIN)
+        manager.get(session_id).login(f"load{n}", PIN)
+
+    rng = random.Random(seed)
+    plan = [(rng.choice(ids), rng.choice(COMMANDS)) for _ in range(sessions * requests)]
+
+    def one(item):
+        session_id, command = item
+        t0 = time.perf_counter()
+        manager.get(session_id).run_command(command)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = np.array(list(pool.map(one, plan, chunksize=64)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--requests", type=int, default=20, help="requests per session")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Opening an account hashes its PIN; a cheap KDF keeps setup out of the way
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10))
+    manager = SessionManager(processor, idle_timeout=3600, max_sessions=max(args.sessions) * 2)
+
+    print(f"{'sessions':>9} {'requests':>9} {'req/s':>10} {'p50 us':>9} {'p99 us':>9}")
+    for count in args.sessions:
+        latencies, elapsed = run(manager, count, args.requests, args.threads, args.seed)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+        print(f"{count:>9} {len(latencies):>9} {len(latencies) / elapsed:>10,.0f} {p50:>9.1f} {p99:>9.1f}")
+    print(f"live sessions: {len(manager)}, ledger records: {len(processor.transactions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Streaming endpointing benchmark with a WAV-driven fake microphone.
+
+Plays a synthetic utterance (speech-like burst followed by silence) in real
+time and reports when the final transcript is available, compared with the
+fixed-duration recording the app used before.
+
+    python -m benchmarks.bench_streaming --speech 1.0 --fixed 6
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.audio import AudioClip
+from utils.streaming import EnergyVAD, BufferedSTT, wav_chunks, stream_transcribe
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_utterance(speech_seconds, silence_seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    lead = rng.normal(scale=0.002, size=int(0.3 * SAMPLE_RATE))
+    t = np.arange(int(speech_seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    # Amplitude-modulated harmonics roughly shaped like voiced speech
+    speech = 0.3 * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    tail = rng.normal(scale=0.002, size=int(silence_seconds * SAMPLE_RATE))
+    return AudioClip.from_samples(np.concatenate([lead, speech, tail]), SAMPLE_RATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speech", type=float, default=1.0)
+    parser.add_argument("--fixed", type=float, default=6.0, help="old fixed recording duration")
+    parser.add_argument("--stt-latency", type=float, default=0.2, help="stub STT delay in seconds")
+    args = parser.parse_args()
+
+    clip = synthetic_utterance(args.speech, args.fixed)
+
+    def stub_stt(utterance):
+        time.sleep(args.stt_latency)
+        return "check balance"
+
+    backend = BufferedSTT(stub_stt, SAMPLE_RATE)
+    vad = EnergyVAD(SAMPLE_RATE)
+    start = time.perf_counter()
+    for event in stream_transcribe(wav_chunks(clip, realtime=True), backend, vad):
+        if event.kind == 'final':
+            streaming = time.perf_counter() - start
+            captured = event.clip.duration
+
+    speech_end = 0.3 + args.speech
+    print(f"streaming: final transcript {streaming:.2f}s after start, "
+          f"{streaming - speech_end:.2f}s after end of speech (captured {captured:.2f}s of audio)")
+    print(f"fixed-duration: final transcript {args.fixed + args.stt_latency:.2f}s after start, "
+          f"{args.fixed + args.stt_latency - speech_end:.2f}s after end of speech")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""STT pool benchmark: real-time factor and p50/p99 latency under concurrent load.
+
+Uses a CPU-bound stub engine by default so it runs anywhere; pass
+``--engine whisper`` to measure the real offline model.
+
+    python -m benchmarks.bench_stt --clients 8 --requests 64 --workers 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.audio import AudioClip
+from utils.stt import STTWorkerPool, WhisperSTT
+
+SAMPLE_RATE = 16000
+
+
+class StubSTT:
+    """Burns CPU proportional to clip length, like a local model would"""
+
+    def __init__(self, cost=0.05):
+        self.cost = cost
+
+    def transcribe(self, clip):
+        deadline = time.perf_counter() + self.cost * clip.duration
+        x = 0
+        while time.perf_counter() < deadline:
+            x += 1
+        return "check balance"
+
+
+def make_clips(count, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    return [AudioClip.from_samples(rng.normal(scale=0.1, size=int(seconds * SAMPLE_RATE)), SAMPLE_RATE)
+            for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", choices=["stub", "whisper"], default="stub")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=2.0, help="clip length")
+    args = parser.parse_args()
+
+    if args.engine == "whisper":
+        pool = STTWorkerPool(WhisperSTT, workers=args.workers, max_pending=args.clients)
+    else:
+        pool = STTWorkerPool(StubSTT, workers=args.workers, max_pending=args.clients)
+    start = time.perf_counter()
+    pool.warm()
+    print(f"warm-up: {time.perf_counter() - start:.2f}s for {args.workers} workers")
+
+    clips = make_clips(args.requests, args.seconds)
+
+    def one(clip):
+        t0 = time.perf_counter()
+        pool.transcribe(clip)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as clients:
+        latencies = list(clients.map(one, clips))
+    wall = time.perf_counter() - start
+
+    # Same clips again: served from the content-hash cache
+    start = time.perf_counter()
+    for clip in clips:
+        pool.transcribe(clip)
+    cached = (time.perf_counter() - start) / len(clips)
+    pool.shutdown()
+
+    audio_seconds = args.requests * args.seconds
+    print(f"requests={args.requests} clients={args.clients} workers={args.workers}")
+    print(f"real-time factor: {wall / audio_seconds:.3f} (wall {wall:.2f}s for {audio_seconds:.0f}s of audio)")
+    print(f"latency p50={np.percentile(latencies, 50) * 1000:.1f}ms p99={np.percentile(latencies, 99) * 1000:.1f}ms")
+    print(f"cached retry: {cached * 1e6:.1f}us per clip")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Voice verification accuracy: false accepts and rejects on held-out synthetic speakers and noise.
+
+Embeds fixture-corpus voices (``benchmarks.corpus.voice``) for three
+disjoint speaker sets: background speakers give the normalization
+statistics, calibration speakers give the threshold at ``--far``, and
+the held-out test speakers and white-noise clips measure the result.
+Scores are reported for raw mean-MFCC cosine and for normalized
+embeddings. ``--calibrate`` prints the background statistics and
+threshold as the constants ``utils.voice_authentication`` ships with.
+
+    python -m benchmarks.bench_voice_auth
+    python -m benchmarks.bench_voice_auth --calibrate
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.corpus import SAMPLE_RATE, voice
+from utils.audio import AudioClip
+from utils.features import FeatureExtractor
+from utils.voice_authentication import (DEFAULT_BACKGROUND_MEAN, DEFAULT_BACKGROUND_STD, DEFAULT_THRESHOLD,
+                                        EMBEDDING_DIM, calibrate_threshold, normalize_embeddings, pair_scores)
+
+
+def embed_speakers(features, speakers, utterances, seconds, rng):
+    clips = [voice(speaker, seconds, rng) for speaker in speakers for _ in range(utterances)]
+    labels = [speaker for speaker in speakers for _ in range(utterances)]
+    return features.embed_batch(clips), labels
+
+
+def cross_scores(embeddings, probes):
+    """Cosine of every embedding against every probe"""
+    unit = lambda rows: rows / np.linalg.norm(rows, axis=1, keepdims=True)
+    return (unit(embeddings) @ unit(probes).T).ravel()
+
+
+def rates(genuine, impostor, noise, threshold):
+    return (float((impostor > threshold).mean()), float((genuine <= threshold).mean()),
+            float((noise > threshold).mean()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speakers", type=int, default=40, help="speakers per set")
+    parser.add_argument("--utterances", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=1.5)
+    parser.add_argument("--far", type=float, default=0.01, help="target false-accept rate")
+    parser.add_argument("--calibrate", action="store_true", help="print fitted constants for voice_authentication")
+    args = parser.parse_args()
+
+    features = FeatureExtractor(n_mfcc=EMBEDDING_DIM)
+    rng = np.random.default_rng(0)
+    n = args.speakers
+    background, _ = embed_speakers(features, range(n), args.utterances, args.seconds, rng)
+    calibration, calibration_labels = embed_speakers(features, range(n, 2 * n), args.utterances, args.seconds, rng)
+    test, test_labels = embed_speakers(features, range(2 * n, 3 * n), args.utterances, args.seconds, rng)
+    noise = features.embed_batch([
+        AudioClip.from_samples(rng.normal(scale=scale, size=int(args.seconds * SAMPLE_RATE)), SAMPLE_RATE)
+        for scale in (0.003, 0.01, 0.03, 0.1, 0.3)
+    ])
+
+    mean = background.mean(axis=0)
+    std = np.maximum(background.std(axis=0), 1e-6)
+    _, calibration_impostor = pair_scores(normalize_embeddings(calibration, mean, std), calibration_labels)
+    threshold = calibrate_threshold(calibration_impostor, args.far)
+
+    print(f"{'scoring':<26} {'threshold':>9} {'FAR':>7} {'FRR':>7} {'noise FA':>9} {'max noise':>10}")
+    rows = [("raw mean MFCC", 0.7, test, noise)]
+    for label, (center, scale), cutoff in (
+            ("normalized, shipped", (DEFAULT_BACKGROUND_MEAN, DEFAULT_BACKGROUND_STD), DEFAULT_THRESHOLD),
+            ("normalized, fitted", (mean, std), threshold)):
+        rows.append((label, cutoff, normalize_embeddings(test, center, scale),
+                     normalize_embeddings(noise, center, scale)))
+    for label, cutoff, embeddings, noisy in rows:
+        genuine, impostor = pair_scores(embeddings, test_labels)
+        noisy = cross_scores(embeddings, noisy)
+        far, frr, noise_fa = rates(genuine, impostor, noisy, cutoff)
+        print(f"{label:<26} {cutoff:>9.3f} {far:>7.2%} {frr:>7.2%} {noise_fa:>9.2%} {noisy.max():>10.3f}")
+
+    if args.calibrate:
+        print(f"\nDEFAULT_BACKGROUND_MEAN = ({', '.join(f'{v:.2f}' for v in mean)})")
+        print(f"DEFAULT_BACKGROUND_STD = ({', '.join(f'{v:.3f}' for v in std)})")
+        print(f"DEFAULT_THRESHOLD = {threshold:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Voiceprint index benchmark: identification latency vs. enrolled population.
+
+    python -m benchmarks.bench_voice_index --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.voice_index import VoiceprintIndex
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=13)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        embeddings = rng.normal(size=(size, args.dim)).astype(np.float32)
+        index = VoiceprintIndex(dim=args.dim, capacity=size)
+        for i, embedding in enumerate(embeddings):
+            index.add(f"user{i}", embedding)
+
+        targets = rng.integers(0, size, args.queries)
+        probes = embeddings[targets] + rng.normal(scale=0.05, size=(args.queries, args.dim)).astype(np.float32)
+
+        exact = []
+        for probe in probes:
+            start = time.perf_counter()
+            index.identify(probe, k=5)
+            exact.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        index.build_ann()
+        build_time = time.perf_counter() - start
+
+        approx = []
+        hits = 0
+        for target, probe in zip(targets, probes):
+            start = time.perf_counter()
+            top = index.identify(probe, k=5, approximate=True)
+            approx.append(time.perf_counter() - start)
+            hits += top[0][0] == f"user{target}"
+
+        start = time.perf_counter()
+        index.verify_batch([f"user{t}" for t in targets], probes)
+        batch_verify = time.perf_counter() - start
+
+        print(f"n={size:<8} exact p50={percentile_ms(exact, 50):.3f}ms p99={percentile_ms(exact, 99):.3f}ms | "
+              f"ann p50={percentile_ms(approx, 50):.3f}ms recall@1={hits / args.queries:.1%} "
+              f"build={build_time:.2f}s | verify_batch({args.queries})={batch_verify * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
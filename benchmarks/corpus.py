@@ -0,0 +1,136 @@
+"""Synthetic workloads for the benchmark suite: command text, PIN phrases and a WAV corpus.
+
+Everything is generated from a seed, so a corpus of a given size is the
+same on every run and results stay comparable with a stored baseline.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from utils.audio import AudioClip
+
+SAMPLE_RATE = 16000
+NAMES = ["john", "mary", "alice", "bob", "priya", "rahul", "anita", "vikram", "sara", "arjun"]
+DIGIT_WORDS = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+PERIODS = ["today", "this week", "this month", "last month", "this year"]
+
+TRANSFER_TEMPLATES = [
+    "transfer {amount} to {name}",
+    "send {amount} rupees to {name}",
+    "please transfer {amount} rs to {name}",
+    "pay {amount} to {name}",
+    "send money {amount} to {name} now",
+]
+COMMAND_TEMPLATES = TRANSFER_TEMPLATES + [
+    "check my balance",
+    "what is my account balance",
+    "show my recent transactions",
+    "read my transaction history",
+    "how much did i send to {name} {period}",
+    "who are my top recipients {period}",
+    "i want to change my pin",
+    "play some music",
+]
+# Short commands spoken in the WAV corpus; the stub STT maps each clip back to its text
+SPOKEN_COMMANDS = [
+    "check my balance",
+    "transfer 25 to john",
+    "show my recent transactions",
+    "how much did i send to mary this month",
+    "send 10 rupees to alice",
+    "what is my account balance",
+]
+MANIFEST = "manifest.json"
+
+
+def commands(count, seed=0, templates=COMMAND_TEMPLATES):
+    """``count`` voice-command transcripts drawn from ``templates``"""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(templates), size=count).tolist()
+    names = rng.integers(len(NAMES), size=count).tolist()
+    periods = rng.integers(len(PERIODS), size=count).tolist()
+    amounts = rng.integers(1, 5000, size=count).tolist()
+    cents = rng.integers(0, 100, size=count).tolist()
+    return [
+        templates[pick].format(
+            amount=f"{amount}.{cent:02d}" if cent % 4 == 0 else amount,
+            name=NAMES[name], period=PERIODS[period])
+        for pick, name, period, amount, cent in zip(picks, names, periods, amounts, cents)
+    ]
+
+
+def transfer_commands(count, seed=0):
+    return commands(count, seed, TRANSFER_TEMPLATES)
+
+
+def pin_phrases(count, seed=0):
+    """Spoken PINs, as words, digits or a mix"""
+    rng = np.random.default_rng(seed)
+    digits = rng.integers(10, size=(count, 4)).tolist()
+    styles = rng.integers(3, size=count).tolist()
+    phrases = []
+    for pin, style in zip(digits, styles):
+        if style == 0:
+            spoken = " ".join(DIGIT_WORDS[d] for d in pin)
+        elif style == 1:
+            spoken = " ".join(str(d) for d in pin)
+        else:
+            spoken = " ".join(DIGIT_WORDS[d] if i % 2 else str(d) for i, d in enumerate(pin))
+        phrases.append(f"my pin is {spoken}.")
+    return phrases
+
+
+def voice(speaker, seconds, rng):
+    """A speaker-specific harmonic tone with noise: stable MFCCs per speaker"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 90 + 17 * (speaker % 11) + 5 * (speaker // 11 % 7)
+    signal = sum(np.sin(2 * np.pi * pitch * k * t) / k**(1 + 0.1 * (speaker % 5)) for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * (2 + speaker % 3) * t)
+    samples = 0.25 * signal * envelope / 2 + rng.normal(scale=0.01, size=len(t))
+    return AudioClip.from_samples(samples, SAMPLE_RATE)
+
+
+def write_wav_corpus(directory, speakers=16, utterances=4, seconds=1.5, seed=0):
+    """Write (or reuse) a fixture WAV corpus and return its manifest.
+
+    The manifest lists ``{'path', 'speaker', 'text'}`` per clip; each
+    utterance "says" one of SPOKEN_COMMANDS, for the stub STT to return.
+    """
+    path = os.path.join(directory, MANIFEST)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest['params'] == [speakers, utterances, seconds, seed]:
+            return manifest['clips']
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    clips = []
+    for speaker in range(speakers):
+        for n in range(utterances):
+            wav = os.path.join(directory, f"speaker{speaker:03d}-{n}.wav")
+            voice(speaker, seconds, rng).save(wav)
+            clips.append({'path': wav, 'speaker': f"speaker{speaker:03d}",
+                          'text': SPOKEN_COMMANDS[(speaker + n) % len(SPOKEN_COMMANDS)]})
+    with open(path, 'w') as f:
+        json.dump({'params': [speakers, utterances, seconds, seed], 'clips': clips}, f)
+    return clips
+
+
+class StubSTT:
+    """Speech-to-text stand-in: returns each fixture clip's scripted text by digest"""
+
+    def __init__(self, transcripts, delay=0.0):
+        self.transcripts = transcripts
+        self.delay = delay
+
+    @classmethod
+    def for_corpus(cls, clips, audio, delay=0.0):
+        return cls({clip.digest: item['text'] for item, clip in zip(clips, audio)}, delay)
+
+    def transcribe(self, clip):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.transcripts.get(clip.digest, '')
@@ -0,0 +1,310 @@
+"""Load generator: replays a command mix against the API server and reports throughput/latency curves.
+
+Each virtual user holds one keep-alive connection, presents the token
+of one of the demo accounts (all logged in before timing starts) and
+sends the mix's requests back to back (a closed loop), starting at a
+different offset so users don't move in lockstep. The run
+steps through ``--concurrency`` levels for ``--duration`` seconds each
+and prints requests/s, latency percentiles and how many requests were
+shed (503) or failed at every level, so capacity can be read off where
+latency turns up.
+
+The mix is a JSONL file as written by ``api_server.py --record``, or a
+generated one: voice commands, single classifications, balance and
+history reads, transfers and voice verifications of the fixture WAV
+corpus. Without ``--url`` a server is started for the run.
+
+    python -m benchmarks.loadgen --concurrency 1 4 16 64 --duration 5
+    python -m benchmarks.loadgen --url http://127.0.0.1:8080 --mix mix.jsonl
+    python -m benchmarks.loadgen --save-mix mix.jsonl --requests 5000
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from benchmarks import corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Share of each request kind in a generated mix
+MIX = {'command': 0.45, 'classify': 0.2, 'balance': 0.15, 'history': 0.1, 'transfer': 0.05, 'voice': 0.05}
+
+
+def voice_accounts(clips, accounts):
+    """Map fixture speakers onto demo accounts, one each, dropping speakers past ``accounts``"""
+    speakers = sorted({clip['speaker'] for clip in clips})[:accounts]
+    return {speaker: f"demo{i:03d}" for i, speaker in enumerate(speakers)}
+
+
+def make_mix(count, clips=(), seed=0, accounts=None):
+    """``count`` generated requests in the mix format; voice requests need ``clips`` (a WAV manifest)
+
+    Each speaker verifies as the demo account ``voice_accounts`` gives it.
+    """
+    speakers = voice_accounts(clips, len(clips) if accounts is None else accounts)
+    clips = [clip for clip in clips if clip['speaker'] in speakers]
+    rng = np.random.default_rng(seed)
+    weights = dict(MIX) if clips else {kind: share for kind, share in MIX.items() if kind != 'voice'}
+    kinds = rng.choice(list(weights), size=count, p=np.array(list(weights.values())) / sum(weights.values()))
+    texts = iter(corpus.commands(count, seed))
+    transfers = iter(corpus.transfer_commands(count, seed + 1))
+    picks = rng.integers(max(len(clips), 1), size=count).tolist()
+    mix = []
+    for kind, pick in zip(kinds.tolist(), picks):
+        if kind == 'command':
+            mix.append({'method': 'POST', 'path': '/v1/command', 'json': {'text': next(texts)}})
+        elif kind == 'classify':
+            mix.append({'method': 'POST', 'path': '/v1/classify', 'json': {'text': next(texts)}})
+        elif kind == 'balance':
+            mix.append({'method': 'GET', 'path': '/v1/balance'})
+        elif kind == 'history':
+            mix.append({'method': 'GET', 'path': '/v1/history', 'query': {'count': 10}})
+        elif kind == 'transfer':
+            mix.append({'method': 'POST', 'path': '/v1/transfer', 'json': {'command': next(transfers)}})
+        else:
+            clip = clips[pick]
+            with open(clip['path'], 'rb') as f:
+                wav = f.read()
+            mix.append({'method': 'POST', 'path': '/v1/voice/verify', 'query': {'user': speakers[clip['speaker']]},
+                        'body_b64': base64.b64encode(wav).decode(), 'content_type': 'audio/wav'})
+    return mix
+
+
+def load_mix(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def encode(entry, host, token=None):
+    """Raw HTTP/1.1 request bytes for a mix entry"""
+    target = entry['path']
+    if entry.get('query'):
+        target += '?' + urlencode(entry['query'])
+    if 'json' in entry:
+        body, content_type = json.dumps(entry['json']).encode(), 'application/json'
+    elif 'body_b64' in entry:
+        body, content_type = base64.b64decode(entry['body_b64']), entry.get('content_type', 'application/octet-stream')
+    else:
+        body, content_type = b'', None
+    lines = [f"{entry['method']} {target} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    if content_type:
+        lines.append(f"Content-Type: {content_type}")
+    if token:
+        lines.append(f"Authorization: Bearer {token}")
+    lines.extend(f"{name}: {value}" for name, value in entry.get('headers', {}).items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+
+class Connection:
+    """One keep-alive client connection; reconnects when the server closes it"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def send(self, raw):
+        """Send raw request bytes; returns ``(status, body)``"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(raw)
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ')[1])
+        headers = dict(line.lower().split(': ', 1) for line in lines[1:] if line)
+        body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection') == 'close':
+            await self.close()
+        return status, body
+
+    async def request(self, entry, token=None):
+        status, body = await self.send(encode(entry, self.host, token))
+        return status, json.loads(body) if body else None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def login(host, port, accounts, pin):
+    """A token per demo account, logged in one at a time so the KDF pool never sheds"""
+    connection = Connection(host, port)
+    tokens = []
+    for i in range(accounts):
+        account = f"demo{i:03d}"
+        status, body = await connection.request({'method': 'POST', 'path': '/v1/login',
+                                                 'json': {'account': account, 'pin': pin}})
+        if status != 200:
+            raise RuntimeError(f"Login as {account} failed: {status} {body}")
+        tokens.append(body['token'])
+    await connection.close()
+    return tokens
+
+
+async def virtual_user(host, port, requests, offset, deadline, samples):
+    connection = Connection(host, port)
+    requests = requests[offset:] + requests[:offset]
+    clock = time.perf_counter
+    try:
+        while clock() < deadline:
+            for path, raw in requests:
+                start = clock()
+                try:
+                    status, _ = await connection.send(raw)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    await connection.close()
+                    status = 0
+                samples.append((path, status, clock() - start))
+                if clock() >= deadline:
+                    break
+    finally:
+        await connection.close()
+
+
+async def enroll(host, port, clips, tokens):
+    """Enroll each fixture speaker's first utterance on its demo account, with that account's token"""
+    connection = Connection(host, port)
+    speakers = voice_accounts(clips, len(tokens))
+    first = {}
+    for clip in clips:
+        first.setdefault(clip['speaker'], clip)
+    for (speaker, account), token in zip(speakers.items(), tokens):
+        with open(first[speaker]['path'], 'rb') as f:
+            wav = f.read()
+        entry = {'method': 'POST', 'path': '/v1/voice/enroll', 'query': {'user': account},
+                 'body_b64': base64.b64encode(wav).decode(), 'content_type': 'audio/wav'}
+        status, body = await connection.request(entry, token)
+        if status != 200:
+            raise RuntimeError(f"Enrolling {account} failed: {status} {body}")
+    await connection.close()
+
+
+async def run_level(host, port, mix, concurrency, duration, tokens):
+    samples = []
+    users = [tokens[i % len(tokens)] for i in range(concurrency)]
+    # Encoded up front: building WAV bodies on the clock would count as server latency
+    encoded = {token: [(entry['path'], encode(entry, host, token)) for entry in mix] for token in set(users)}
+    step = max(len(mix) // concurrency, 1)
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(host, port, encoded[token], i * step % len(mix), deadline, samples)
+                           for i, token in enumerate(users)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    latencies = np.array([seconds for _, _, seconds in samples]) * 1000
+    statuses = np.array([status for _, status, _ in samples])
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0, 0, 0)
+    return {
+        'requests': len(samples),
+        'rps': len(samples) / elapsed,
+        'p50_ms': float(p50), 'p90_ms': float(p90), 'p99_ms': float(p99),
+        'max_ms': float(latencies.max()) if len(latencies) else 0.0,
+        'shed': int((statuses == 503).sum()),
+        'errors': int(((statuses >= 400) & (statuses != 503) | (statuses == 0)).sum()),
+    }
+
+
+def by_route(samples):
+    routes = {}
+    for path, _, seconds in samples:
+        routes.setdefault(path, []).append(seconds * 1000)
+    return {path: {'requests': len(ms), 'p50_ms': float(np.percentile(ms, 50)),
+                   'p99_ms': float(np.percentile(ms, 99))}
+            for path, ms in sorted(routes.items())}
+
+
+def start_server(accounts, pin, voice_dir, extra):
+    """Run api_server.py on a free port; returns ``(process, host, port)``"""
+    command = [sys.executable, os.path.join(ROOT, "api_server.py"), "--port", "0",
+               "--demo-accounts", str(accounts), "--demo-pin", pin, "--voice-dir", voice_dir,
+               # Some fixture clips fail verification; keep those from locking the demo users out
+               "--voice-attempts", str(10**9)] + extra
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("listening on"):
+            # Keep reading so the server never blocks on a full stdout pipe
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            address = urlsplit(line.split()[-1])
+            return process, address.hostname, address.port
+    raise RuntimeError("API server exited before listening")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="a running server; started for the run if unset")
+    parser.add_argument("--mix", default=None, help="JSONL mix to replay (generated if unset)")
+    parser.add_argument("--save-mix", default=None, help="write the generated mix here and exit")
+    parser.add_argument("--requests", type=int, default=2000, help="size of a generated mix")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per concurrency level")
+    parser.add_argument("--accounts", type=int, default=32, help="demo accounts the users log in as")
+    parser.add_argument("--pin", default="1234")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "voice-banking-fixtures"),
+                        help="fixture WAV corpus for voice requests")
+    parser.add_argument("--no-voice", action="store_true", help="leave voice verification out of the mix")
+    parser.add_argument("--server-args", default="", help="extra api_server.py arguments, e.g. '--workers 8'")
+    parser.add_argument("--by-route", action="store_true", help="also print latency per route")
+    parser.add_argument("--output", default=None, help="write the curve as JSON")
+    args = parser.parse_args()
+
+    clips = [] if args.no_voice or args.mix else corpus.write_wav_corpus(args.fixtures)
+    mix = load_mix(args.mix) if args.mix else make_mix(args.requests, clips, accounts=args.accounts)
+    if args.save_mix:
+        with open(args.save_mix, 'w') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in mix)
+        print(f"wrote {len(mix)} requests to {args.save_mix}")
+        return
+    # Voice logins need the PIN too; it is added here so mix files never hold it
+    for entry in mix:
+        if entry['path'] == '/v1/voice/verify':
+            entry.setdefault('headers', {'X-PIN': args.pin})
+
+    process = None
+    with tempfile.TemporaryDirectory() as voice_dir:
+        if args.url:
+            address = urlsplit(args.url)
+            host, port = address.hostname, address.port
+        else:
+            process, host, port = start_server(args.accounts, args.pin, voice_dir, args.server_args.split())
+        try:
+            tokens = asyncio.run(login(host, port, args.accounts, args.pin))
+            if clips:
+                asyncio.run(enroll(host, port, clips, tokens))
+            print(f"{len(mix)} requests in the mix, {args.duration:g}s per level against {host}:{port}")
+            print(f"{'users':>6} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} "
+                  f"{'p99 ms':>8} {'max ms':>8} {'shed':>6} {'errors':>7}")
+            curve = []
+            for concurrency in args.concurrency:
+                samples, elapsed = asyncio.run(run_level(host, port, mix, concurrency, args.duration, tokens))
+                level = {'concurrency': concurrency, **summarize(samples, elapsed), 'routes': by_route(samples)}
+                curve.append(level)
+                print(f"{concurrency:>6} {level['requests']:>9} {level['rps']:>9.0f} {level['p50_ms']:>8.2f} "
+                      f"{level['p90_ms']:>8.2f} {level['p99_ms']:>8.2f} {level['max_ms']:>8.1f} "
+                      f"{level['shed']:>6} {level['errors']:>7}")
+                if args.by_route:
+                    for path, stats in level['routes'].items():
+                        print(f"{'':>6} {path:<22} {stats['requests']:>8} "
+                              f"p50 {stats['p50_ms']:>7.2f}  p99 {stats['p99_ms']:>7.2f}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'mix': args.mix or 'generated', 'duration': args.duration, 'curve': curve}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
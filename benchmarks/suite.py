@@ -0,0 +1,366 @@
+"""Benchmark suite: end-to-end voice-banking workloads, JSON results and baseline checks.
+
+Drives TransactionProcessor (classify_intent, extract_transfer_details,
+extract_pin_from_speech, process_transfer with and without risk checks,
+show_transactions),
+VoiceAuthenticator (enroll/authenticate) and the full voice-command
+pipeline with generated corpora. Audio workloads read a fixture WAV
+corpus and transcribe with a stub STT, so no microphone, network or
+model is involved.
+
+Each workload runs in a fresh interpreter, so its peak RSS is its own.
+Every result has throughput, p50/p99 latency and peak memory. With
+``--baseline`` a workload fails if its throughput or p50 is more than
+``--tolerance`` worse than the baseline, its p99 more than
+``--p99-tolerance`` worse, or its peak memory more than ``--tolerance``
+higher. Workloads registered with wider bands (the threaded,
+sleep-based voice pipeline) use the wider of the two. Any failure makes
+the run exit with status 1. Workloads run at a different size than the
+baseline are not compared.
+
+``--repeat N`` runs each workload N times and reports the median of
+each metric; record baselines that way so a lucky run does not become
+the bar. With ``--only``, ``--save-baseline`` updates just those
+workloads in an existing baseline file.
+
+    python -m benchmarks.suite --size 10000 --output results.json
+    python -m benchmarks.suite --size 10000 --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --size 10000 --repeat 5 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --only classify_intent extract_pin --size 10000000
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import corpus
+from utils.audio import AudioClip
+from utils.ledger import RECORD_DTYPE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK = 100000
+ACCOUNT = 'bench'
+WORKLOADS = {}
+# Workload -> (tolerance, p99_tolerance) floors for noisy workloads
+TOLERANCES = {}
+
+
+def workload(name, tolerance=None, p99_tolerance=None):
+    def register(fn):
+        WORKLOADS[name] = fn
+        if tolerance is not None or p99_tolerance is not None:
+            TOLERANCES[name] = (tolerance or 0.0, p99_tolerance or 0.0)
+        return fn
+    return register
+
+
+def per_call(fn, batches, total):
+    """Call ``fn`` on every item; returns per-call latencies (ns) and wall seconds"""
+    latencies = np.empty(total, dtype=np.int64)
+    clock = time.perf_counter_ns
+    i = 0
+    start = clock()
+    for batch in batches:
+        for item in batch:
+            t = clock()
+            fn(item)
+            latencies[i] = clock() - t
+            i += 1
+    return latencies[:i], (clock() - start) / 1e9
+
+
+def chunked(generate, size, seed):
+    """Generate a corpus ``CHUNK`` items at a time so 10M-item runs stay small"""
+    for n, start in enumerate(range(0, size, CHUNK)):
+        yield generate(min(CHUNK, size - start), seed + n)
+
+
+def processor(funds=10**12, risk_limits=None):
+    from utils.credentials import CredentialService
+    from utils.transaction_processor import TransactionProcessor
+
+    # Cheap KDF: no workload logs in, and a 32 MiB scrypt would set every peak RSS
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10), risk_limits=risk_limits)
+    processor.open_account(ACCOUNT, '1234', funds)
+    return processor
+
+
+def load_audio(fixtures):
+    clips = corpus.write_wav_corpus(fixtures)
+    return clips, [AudioClip.from_wav(item['path']) for item in clips]
+
+
+@workload('classify_intent')
+def classify_intent(size, fixtures, audio_cap):
+    classify = processor().classify_intent
+    return per_call(classify, chunked(corpus.commands, size, 1), size)
+
+
+@workload('extract_transfer')
+def extract_transfer(size, fixtures, audio_cap):
+    extract = processor().extract_transfer_details
+    return per_call(extract, chunked(corpus.transfer_commands, size, 2), size)
+
+
+@workload('extract_pin')
+def extract_pin(size, fixtures, audio_cap):
+    extract = processor().extract_pin_from_speech
+    return per_call(extract, chunked(corpus.pin_phrases, size, 3), size)
+
+
+@workload('process_transfer')
+def process_transfer(size, fixtures, audio_cap):
+    bank = processor()
+    return per_call(lambda command: bank.process_transfer(command, ACCOUNT),
+                    chunked(corpus.transfer_commands, size, 4), size)
+
+
+@workload('process_transfer_risk')
+def process_transfer_risk(size, fixtures, audio_cap):
+    from utils.risk import UNLIMITED
+
+    # Every window is kept and checked, but nothing is vetoed, so this is
+    # process_transfer plus the full cost of the risk checks
+    bank = processor(risk_limits=UNLIMITED)
+    return per_call(lambda command: bank.process_transfer(command, ACCOUNT),
+                    chunked(corpus.transfer_commands, size, 4), size)
+
+
+@workload('show_transactions')
+def show_transactions(size, fixtures, audio_cap):
+    # History of ``size`` records, then bounded reads of the latest few
+    bank = processor()
+    names = [ACCOUNT] + corpus.NAMES + [f"Transfer to {name}" for name in corpus.NAMES]
+    for start in range(0, size, CHUNK):
+        index = np.arange(start, min(start + CHUNK, size))
+        rows = np.zeros(len(index), dtype=RECORD_DTYPE)
+        rows['ts'] = int(time.time()) - size + index
+        rows['amount'] = 100 + index % 5000
+        rows['balance'] = 10**14 - index
+        rows['account'] = 0
+        rows['counterparty'] = 1 + index % len(corpus.NAMES)
+        rows['description'] = 1 + len(corpus.NAMES) + index % len(corpus.NAMES)
+        bank.transactions.extend_rows(rows, names)
+    calls = min(size, 100000)
+    return per_call(lambda count: bank.show_transactions(count, ACCOUNT), [[5, 10] * (calls // 2)], calls)
+
+
+def fresh(clip, n):
+    """A copy of ``clip`` with its first samples set from ``n``: a new digest, as a new recording has"""
+    data = bytearray(clip.data)
+    data[:4] = n.to_bytes(4, 'little')
+    return AudioClip(data, clip.sample_rate, clip.sample_width, clip.channels)
+
+
+def authenticator():
+    from utils.voice_authentication import VoiceAuthenticator
+
+    return VoiceAuthenticator(state_dir=tempfile.mkdtemp(), legacy_file=None)
+
+
+@workload('voice_enroll')
+def voice_enroll(size, fixtures, audio_cap):
+    _, audio = load_audio(fixtures)
+    auth = authenticator()
+    count = min(size, audio_cap)
+    return per_call(lambda i: auth.enroll_user(f"user{i}", fresh(audio[i % len(audio)], i)), [range(count)], count)
+
+
+@workload('voice_authenticate')
+def voice_authenticate(size, fixtures, audio_cap):
+    clips, audio = load_audio(fixtures)
+    auth = authenticator()
+    enrolled = set()
+    for item, clip in zip(clips, audio):
+        if item['speaker'] not in enrolled:
+            auth.enroll_user(item['speaker'], clip)
+            enrolled.add(item['speaker'])
+    count = min(size, audio_cap)
+    return per_call(lambda i: auth.authenticate_user(clips[i % len(clips)]['speaker'], fresh(audio[i % len(audio)], i)),
+                    [range(count)], count)
+
+
+# Latency is time queued behind every other job on threads with sleeping
+# stages, so it follows scheduling noise; runs swing by a third or more
+@workload('voice_command_e2e', tolerance=0.5, p99_tolerance=2.0)
+def voice_command_e2e(size, fixtures, audio_cap):
+    """Clip -> stub STT -> intent -> execution through the CommandPipeline"""
+    from utils.pipeline import CommandPipeline
+    from utils.sessions import SessionManager
+
+    clips, audio = load_audio(fixtures)
+    bank = processor()
+    session = SessionManager(bank).get(None)
+    session.login(ACCOUNT, '1234')
+    pipeline = CommandPipeline(corpus.StubSTT.for_corpus(clips, audio).transcribe, bank.classify_intent)
+    # Drop the clip digest: the corpus repeats clips, which would dedupe repeated transfers
+    handler = lambda intent, text, request_id: session.execute(intent, text)
+
+    # Every job is submitted up front, so latency includes time queued behind the others
+    count = min(size, audio_cap)
+    start = time.perf_counter()
+    jobs = [pipeline.submit(clip=audio[i % len(audio)], handler=handler) for i in range(count)]
+    for job in jobs:
+        job.wait()
+    wall = time.perf_counter() - start
+    failed = [job for job in jobs if job.status != 'done']
+    if failed:
+        raise RuntimeError(f"{len(failed)} pipeline jobs failed: {failed[0].error!r}")
+    return np.array([job.elapsed * 1e9 for job in jobs], dtype=np.int64), wall
+
+
+def run_workload(name, size, fixtures, audio_cap):
+    """Run one workload in this process and summarize it"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        latencies, wall = WORKLOADS[name](size, fixtures, audio_cap)
+    p50, p99 = np.percentile(latencies, [50, 99]) / 1000 if len(latencies) else (0.0, 0.0)
+    return {
+        'size': size,
+        'ops': len(latencies),
+        'seconds': round(wall, 4),
+        'throughput': round(len(latencies) / wall, 1) if wall else 0.0,
+        'p50_us': round(float(p50), 2),
+        'p99_us': round(float(p99), 2),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_isolated(name, size, fixtures, audio_cap):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--worker", name, "--size", str(size),
+         "--fixtures", fixtures, "--audio-cap", str(audio_cap)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return {'size': size, 'error': result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_repeated(name, size, fixtures, audio_cap, repeat):
+    """Median of each metric over ``repeat`` isolated runs"""
+    runs = [run_isolated(name, size, fixtures, audio_cap) for _ in range(repeat)]
+    for result in runs:
+        if 'error' in result:
+            return result
+    if repeat == 1:
+        return runs[0]
+    result = {key: round(float(np.median([run[key] for run in runs])), 4 if key == 'seconds' else 2)
+              for key in ('seconds', 'throughput', 'p50_us', 'p99_us', 'peak_rss_mib')}
+    return dict(size=size, ops=runs[0]['ops'], runs=repeat, **result)
+
+
+def write_results(path, document):
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+
+def compare(results, baseline, tolerance, p99_tolerance):
+    """Regression messages for ``results`` against a baseline document"""
+    regressions = []
+    for name, result in results.items():
+        floor, p99_floor = TOLERANCES.get(name, (0.0, 0.0))
+        tolerance_for, p99_tolerance_for = max(tolerance, floor), max(p99_tolerance, p99_floor)
+        base = baseline.get('results', {}).get(name)
+        if 'error' in result:
+            regressions.append(f"{name}: {result['error']}")
+            continue
+        if base is None or base.get('size') != result['size'] or 'error' in base:
+            continue
+        checks = [
+            ('throughput', result['throughput'] < base['throughput'] * (1 - tolerance_for)),
+            ('p50_us', result['p50_us'] > base['p50_us'] * (1 + tolerance_for)),
+            ('p99_us', result['p99_us'] > base['p99_us'] * (1 + p99_tolerance_for)),
+            ('peak_rss_mib', result['peak_rss_mib'] > base['peak_rss_mib'] * (1 + tolerance_for)),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{name}: {metric} {base[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10000, help="corpus size per workload (1k-10M)")
+    parser.add_argument("--audio-cap", type=int, default=2000, help="max clips per audio workload")
+    parser.add_argument("--only", nargs="+", choices=sorted(WORKLOADS), help="run these workloads only")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "voice-banking-bench-fixtures"),
+                        help="fixture WAV corpus directory, generated on first use")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--p99-tolerance", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per workload; metrics are the median")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_workload(args.worker, args.size, args.fixtures, args.audio_cap)))
+        return
+
+    corpus.write_wav_corpus(args.fixtures)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'workload':<20} {'ops':>10} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak MiB':>9}")
+    for name in args.only or WORKLOADS:
+        result = results[name] = run_repeated(name, args.size, args.fixtures, args.audio_cap, args.repeat)
+        if 'error' in result:
+            print(f"{name:<20} failed: {result['error']}")
+            continue
+        line = (f"{name:<20} {result['ops']:>10,} {result['throughput']:>12,.0f} {result['p50_us']:>10.1f} "
+                f"{result['p99_us']:>10.1f} {result['peak_rss_mib']:>9.1f}")
+        base = baseline.get('results', {}).get(name)
+        if base and base.get('size') == args.size and 'throughput' in base:
+            line += f"  ({result['throughput'] / base['throughput'] - 1:+.0%} ops/s vs baseline)"
+        print(line)
+
+    document = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'size': args.size,
+            'audio_cap': args.audio_cap,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        write_results(args.output, document)
+    if args.save_baseline:
+        if args.only and os.path.exists(args.save_baseline):
+            with open(args.save_baseline) as f:
+                saved = json.load(f)
+            saved['results'].update(results)
+            meta = {'created': document['meta']['created'], 'repeat': args.repeat}
+            saved['meta'].setdefault('updated', {}).update({name: meta for name in results})
+            document = saved
+        write_results(args.save_baseline, document)
+
+    if args.baseline:
+        regressions = compare(results, baseline, args.tolerance, args.p99_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
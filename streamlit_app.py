@@ -1,13 +1,15 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from datetime import datetime
 import os
-import tempfile
 
 from utils.voice_authentication import VoiceAuthenticator
 from utils.transaction_processor import TransactionProcessor
 from utils.realtime_recorder import RealTimeRecorder
+from utils.intent_model import TransformersIntentBackend
+from utils.stt import GoogleSTT, STTWorkerPool, WhisperSTT
+from utils.sessions import SessionManager
+from utils.pipeline import CommandPipeline
+from utils.metrics import REGISTRY, SamplingProfiler
 
 # Page configuration
 st.set_page_config(
@@ -17,12 +19,52 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize components
+# Initialize shared components: models, ledger and account store are built once
+# per deployment, everything user-specific lives in a per-session handle
 @st.cache_resource
 def load_components():
-    return VoiceAuthenticator(), TransactionProcessor(), RealTimeRecorder()
+    # Set INTENT_MODEL to a local model name to back up the keyword rules with a classifier
+    intent_model = os.environ.get("INTENT_MODEL")
+    intent_backend = TransformersIntentBackend(intent_model) if intent_model else None
+    processor = TransactionProcessor(ledger_dir="ledger_data", intent_backend=intent_backend)
+    
+    # Set STT_ENGINE=whisper to transcribe offline in a warm worker pool
+    stt_backend = None
+    if os.environ.get("STT_ENGINE") == "whisper":
+        stt_backend = STTWorkerPool(WhisperSTT, workers=int(os.environ.get("STT_WORKERS", "2")),
+                                    model_name=os.environ.get("WHISPER_MODEL", "base"))
+        stt_backend.warm()
+    else:
+        stt_backend = GoogleSTT()
+    
+    # Voice commands run as background jobs: record, transcribe, classify, execute
+    pipeline = CommandPipeline(stt_backend.transcribe, processor.classify_intent,
+                               stt_workers=int(os.environ.get("STT_THREADS", "4")))
+    
+    sessions = SessionManager(
+        processor,
+        recorder_factory=lambda: RealTimeRecorder(stt_backend=stt_backend),
+        idle_timeout=int(os.environ.get("SESSION_IDLE_TIMEOUT", "900")),
+    )
+    return VoiceAuthenticator(), processor, sessions, pipeline
+
+voice_auth, transaction_processor, sessions, pipeline = load_components()
 
-voice_auth, transaction_processor, recorder = load_components()
+# Accounts allowed to see the metrics page (comma-separated)
+METRICS_ADMINS = set(os.environ.get("METRICS_ADMINS", "user123").split(","))
+
+@st.cache_resource
+def load_profiler():
+    # Samples the pipeline stage threads only, and only while switched on
+    return SamplingProfiler(thread_prefixes=("record-", "transcribe-", "classify-", "execute-"))
+
+JOB_STATUS = {
+    'queued': "⏳ Waiting in queue...",
+    'recording': "🎵 Listening for command... (stops when you finish speaking)",
+    'transcribing': "📝 Transcribing...",
+    'classifying': "🧠 Understanding command...",
+    'executing': "⚙️ Executing...",
+}
 
 # Session state initialization
 if 'authenticated' not in st.session_state:
@@ -31,6 +73,20 @@ if 'current_user' not in st.session_state:
     st.session_state.current_user = None
 if 'voice_enrolled' not in st.session_state:
     st.session_state.voice_enrolled = False
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = sessions.new_session_id()
+if 'auth_token' not in st.session_state:
+    st.session_state.auth_token = None
+
+session = sessions.get(st.session_state.session_id)
+
+# Every rerun checks the signed session token (microseconds), never the PIN;
+# an expired or revoked token requires a fresh login
+if st.session_state.authenticated and not session.resume(st.session_state.auth_token):
+    st.session_state.authenticated = False
+    st.session_state.current_user = None
+    st.session_state.auth_token = None
+    st.warning("⏱️ Your session expired. Please login again.")
 
 def main():
     st.title("🏦 Voice-Activated Banking System")
@@ -40,9 +96,11 @@ def main():
     st.sidebar.title("Navigation")
     
     if not st.session_state.authenticated:
-        menu = ["Voice Enrollment", "Login", "About"]
+        menu = ["Login", "About"]
     else:
-        menu = ["Banking Dashboard", "Voice Transactions", "Account Settings", "Logout"]
+        menu = ["Banking Dashboard", "Voice Transactions", "Voice Enrollment", "Account Settings", "Logout"]
+        if st.session_state.current_user in METRICS_ADMINS:
+            menu.insert(-1, "Metrics")
     
     choice = st.sidebar.selectbox("Menu", menu)
     
@@ -56,6 +114,8 @@ def main():
         show_voice_transactions()
     elif choice == "Account Settings":
         show_account_settings()
+    elif choice == "Metrics":
+        show_metrics()
     elif choice == "About":
         show_about()
     elif choice == "Logout":
@@ -65,23 +125,34 @@ def show_voice_enrollment():
     st.header("🎤 Voice Enrollment")
     st.info("Enroll your voice for secure biometric authentication")
     
-    user_id = st.text_input("User ID", value="user123")
+    if not st.session_state.authenticated:
+        st.warning("Please login first")
+        return
+    
+    # Only the logged-in account can be enrolled, and only after the PIN is
+    # re-entered, so an open session alone cannot replace a voiceprint
+    user_id = st.session_state.current_user
+    st.markdown(f"Enrolling account **{user_id}**")
+    pin = st.text_input("Confirm your PIN", type="password", key="enroll_pin")
     
     if st.button("Start Voice Enrollment"):
+        with st.spinner("🔍 Checking PIN..."):
+            pin_ok = bool(pin) and transaction_processor.credentials.check(user_id, pin)
+        if not pin_ok:
+            st.error("❌ PIN is incorrect")
+            return
+        
         st.info("🎙️ Please speak the phrase: **'My voice is my password'** clearly into your microphone")
         st.warning("Make sure your microphone is working and you're in a quiet environment")
         
         with st.spinner("🎵 Recording in progress... (4 seconds)"):
-            # Use a fixed filename in temp directory
-            temp_dir = tempfile.gettempdir()
-            audio_file = os.path.join(temp_dir, "enrollment.wav")
-            audio_file = recorder.record_audio(duration=4, filename=audio_file)
+            clip = session.recorder.record_clip(duration=4)
             
-        if audio_file and os.path.exists(audio_file):
+        if clip is not None:
             st.success("✅ Recording completed! Processing voice print...")
             
             with st.spinner("🔍 Creating voice embedding..."):
-                success = voice_auth.enroll_user(user_id, audio_file)
+                success = voice_auth.enroll_user(user_id, clip)
                 
             if success:
                 st.success("✅ Voice enrollment successful! Your voice print has been saved.")
@@ -105,41 +176,49 @@ def show_login():
     
     with col1:
         st.subheader("Voice Authentication")
+        if not voice_auth.calibrated:
+            st.warning("Voice matching is not calibrated on real recordings yet; "
+                       "your PIN is what secures this login.")
         user_id = st.text_input("User ID", value="user123", key="login_id")
+        voice_pin = st.text_input("PIN", type="password", key="voice_pin")
         
         if st.button("Authenticate with Voice"):
-            if user_id not in voice_auth.voice_profiles:
-                st.error("❌ User not enrolled. Please complete voice enrollment first.")
-                return
-                
             st.info("🎙️ Please speak: **'My voice is my password'** for authentication")
             
             with st.spinner("🔍 Verifying voice print..."):
-                temp_dir = tempfile.gettempdir()
-                audio_file = os.path.join(temp_dir, "auth.wav")
-                audio_file = recorder.record_audio(duration=4, filename=audio_file)
+                clip = session.recorder.record_clip(duration=4)
                 
-            if audio_file and os.path.exists(audio_file):
-                verified, similarity = voice_auth.authenticate_user(user_id, audio_file)
-                if verified:
+            if clip is not None:
+                verified, similarity = voice_auth.authenticate_user(user_id, clip)
+                # The PIN is always checked, and a failure never says which
+                # factor was wrong or how close the voice came
+                pin_ok = transaction_processor.credentials.check(user_id, voice_pin)
+                token = session.login(user_id, voice_pin) if verified and pin_ok else None
+                if token:
                     st.session_state.authenticated = True
                     st.session_state.current_user = user_id
+                    st.session_state.auth_token = token
                     st.success(f"✅ Voice authentication successful! Similarity: {similarity:.2%}")
                     st.balloons()
                 else:
-                    st.error(f"❌ Voice authentication failed. Similarity: {similarity:.2%}")
+                    st.error("❌ Voice authentication failed. New to voice login? "
+                             "Log in with your PIN and enroll under Voice Enrollment.")
             else:
                 st.error("❌ Recording failed during authentication")
     
     with col2:
         st.subheader("Manual Login (Fallback)")
         manual_user = st.text_input("Username", value="user123", key="manual_user")
-        manual_pin = st.text_input("PIN", type="password", value="1234", key="manual_pin")
+        manual_pin = st.text_input("PIN", type="password", key="manual_pin")
         
         if st.button("Manual Login"):
-            if manual_user == "user123" and manual_pin == "1234":
+            # The PIN is checked in the credential worker pool
+            with st.spinner("🔍 Checking PIN..."):
+                token = session.login(manual_user, manual_pin)
+            if token:
                 st.session_state.authenticated = True
                 st.session_state.current_user = manual_user
+                st.session_state.auth_token = token
                 st.success("✅ Manual login successful!")
             else:
                 st.error("❌ Invalid credentials")
@@ -151,14 +230,22 @@ def show_dashboard():
         st.warning("Please login first")
         return
     
+    # Charting libraries load with the first dashboard view, not at app start
+    import pandas as pd
+    import plotly.express as px
+    
+    account_id = session.account_id
+    dashboard = transaction_processor.dashboard
+    account_txns = session.recent_transactions(10)
+    total_transactions = dashboard.count(account_id)
+    
     # Account summary
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Account Balance", f"₹{transaction_processor.account_balance}")
+        st.metric("Account Balance", f"₹{session.get_balance()}")
     
     with col2:
-        total_transactions = len(transaction_processor.transactions)
         st.metric("Total Transactions", total_transactions)
     
     with col3:
@@ -167,18 +254,33 @@ def show_dashboard():
     
     # Recent transactions
     st.subheader("Recent Transactions")
-    if transaction_processor.transactions:
-        df = pd.DataFrame(transaction_processor.transactions)
-        st.dataframe(df.tail(10), use_container_width=True)
+    if account_txns:
+        df = pd.DataFrame(account_txns)
+        st.dataframe(df, use_container_width=True)
     else:
         st.info("No transactions yet")
     
-    # Transaction chart
-    if transaction_processor.transactions:
+    # Transaction chart, downsampled to a fixed number of points
+    if total_transactions:
         st.subheader("Transaction History")
-        df = pd.DataFrame(transaction_processor.transactions)
-        fig = px.line(df, x='date', y='balance_after', title='Account Balance Over Time')
+        ts, balances = dashboard.balance_series(account_id, points=500)
+        fig = px.line(x=pd.to_datetime(ts, unit='s'), y=balances,
+                      labels={'x': 'date', 'y': 'balance_after'},
+                      title='Account Balance Over Time')
         st.plotly_chart(fig, use_container_width=True)
+        
+        daily = dashboard.daily_totals(account_id, days=30)
+        daily_df = pd.DataFrame.from_dict(daily, orient='index')
+        st.subheader("Daily Activity (last 30 days)")
+        st.bar_chart(daily_df[['debit', 'credit']])
+        
+        # Spending rollups, answered from precomputed totals
+        st.subheader("Top Recipients This Month")
+        top = transaction_processor.top_recipients(5, 'this month', account_id=account_id)
+        if top:
+            st.table(pd.DataFrame(top, columns=['Recipient', 'Sent (₹)']))
+        else:
+            st.info("No transfers this month")
 
 def show_voice_transactions():
     st.header("🎤 Voice Transactions")
@@ -195,6 +297,7 @@ def show_voice_transactions():
         "💸 **'Transfer [amount] to [recipient]'** - Send money",
         "💰 **'Check balance'** - View account balance", 
         "📋 **'Show transactions'** - View transaction history",
+        "📊 **'How much did I send to John this month?'** - Spending by recipient and period",
         "🔐 **'Change PIN'** - Update your security PIN using voice"
     ]
     
@@ -204,39 +307,35 @@ def show_voice_transactions():
     # Voice command interface
     st.subheader("Voice Command Interface")
     
-    if st.button("🎤 Start Voice Command"):
+    job = pipeline.get(st.session_state.get('command_job'))
+    busy = job is not None and not job.done
+    
+    if st.button("🎤 Start Voice Command", disabled=busy):
         st.info("🎙️ Speak your banking command clearly...")
-        
-        with st.spinner("🎵 Listening for command... (6 seconds)"):
-            temp_dir = tempfile.gettempdir()
-            audio_file = os.path.join(temp_dir, "command.wav")
-            audio_file = recorder.record_audio(duration=6, filename=audio_file)
-            
-        if audio_file and os.path.exists(audio_file):
-            command_text = recorder.speech_to_text(audio_file)
-            
-            if command_text and command_text != "Could not understand audio":
-                st.success(f"🎯 Command recognized: **'{command_text}'**")
-                
-                # Process command
-                intent = transaction_processor.classify_intent(command_text)
-                
-                if intent == 'transfer':
-                    response = transaction_processor.process_transfer(command_text)
-                elif intent == 'balance':
-                    response = transaction_processor.check_balance()
-                elif intent == 'transactions':
-                    response = transaction_processor.show_transactions()
-                elif intent == 'change_pin':
-                    response = "Please use 'Account Settings' for voice PIN change feature"
-                else:
-                    response = "Sorry, I didn't understand that command. Try: 'Transfer 500 to John', 'Check balance', or 'Show transactions'"
-                
-                st.info(f"🤖 {response}")
-            else:
-                st.error("❌ Could not understand voice command. Please try again.")
-        else:
-            st.error("❌ Recording failed. Please check your microphone.")
+        recorder = session.recorder
+        job = pipeline.submit(source=lambda: recorder.record_command(max_duration=6),
+                              handler=session.execute)
+        st.session_state.command_job = job.id
+        busy = True
+    
+    if job is None:
+        return
+    if busy:
+        # Poll the job: the page reruns until it finishes, so the rest of the UI stays live
+        st.info(JOB_STATUS.get(job.status, job.status))
+        job.wait(0.3)
+        st.rerun()
+    
+    if job.error is None:
+        st.success(f"🎯 Command recognized: **'{job.text}'**")
+        st.info(f"🤖 {job.response}")
+    elif job.stage == 'recording':
+        st.error("❌ No speech detected. Please check your microphone and try again.")
+    elif job.stage == 'transcribing':
+        st.error("❌ Could not understand voice command. Please try again.")
+    else:
+        st.error(f"❌ Error processing command: {job.error}")
+    st.caption(f"Processed in {job.elapsed:.1f}s")
 
 def show_voice_pin_change():
     """Voice-based PIN change interface"""
@@ -256,35 +355,35 @@ def show_voice_pin_change():
         st.info("🎙️ **Step 1/3:** Please speak your **CURRENT** 4-digit PIN...")
         
         with st.spinner("Recording current PIN..."):
-            temp_dir = tempfile.gettempdir()
-            current_pin_audio = os.path.join(temp_dir, "current_pin.wav")
-            current_pin_audio = recorder.record_audio(duration=4, filename=current_pin_audio)
+            current_pin_audio = session.recorder.record_clip(duration=4)
         
-        if current_pin_audio and os.path.exists(current_pin_audio):
+        if current_pin_audio is not None:
+            # Transcribe in the background while the next PIN is being recorded
+            current_pin_job = pipeline.submit(clip=current_pin_audio)
             st.success("✅ Current PIN recorded!")
             
             st.info("🎙️ **Step 2/3:** Please speak your **NEW** 4-digit PIN...")
             with st.spinner("Recording new PIN..."):
-                new_pin_audio = os.path.join(temp_dir, "new_pin.wav")
-                new_pin_audio = recorder.record_audio(duration=4, filename=new_pin_audio)
+                new_pin_audio = session.recorder.record_clip(duration=4)
             
-            if new_pin_audio and os.path.exists(new_pin_audio):
+            if new_pin_audio is not None:
+                new_pin_job = pipeline.submit(clip=new_pin_audio)
                 st.success("✅ New PIN recorded!")
                 
                 st.info("🎙️ **Step 3/3:** Please **CONFIRM** your new 4-digit PIN...")
                 with st.spinner("Recording PIN confirmation..."):
-                    confirm_pin_audio = os.path.join(temp_dir, "confirm_pin.wav")
-                    confirm_pin_audio = recorder.record_audio(duration=4, filename=confirm_pin_audio)
+                    confirm_pin_audio = session.recorder.record_clip(duration=4)
                 
-                if confirm_pin_audio and os.path.exists(confirm_pin_audio):
+                if confirm_pin_audio is not None:
+                    confirm_pin_job = pipeline.submit(clip=confirm_pin_audio)
                     st.success("✅ PIN confirmation recorded!")
                     
-                    # Process all audio files
+                    # Collect the transcriptions, which have been running concurrently
                     with st.spinner("🔍 Processing PIN change..."):
-                        # Convert audio to text
-                        current_pin_text = recorder.speech_to_text(current_pin_audio)
-                        new_pin_text = recorder.speech_to_text(new_pin_audio)
-                        confirm_pin_text = recorder.speech_to_text(confirm_pin_audio)
+                        pin_jobs = [current_pin_job, new_pin_job, confirm_pin_job]
+                        for job in pin_jobs:
+                            job.wait()
+                        current_pin_text, new_pin_text, confirm_pin_text = [job.text for job in pin_jobs]
                         
                         if all([current_pin_text, new_pin_text, confirm_pin_text]):
                             st.write(f"**Recognized:**")
@@ -309,8 +408,9 @@ def show_voice_pin_change():
                                 st.error(f"❌ PINs don't match. New: {new_digits}, Confirm: {confirm_digits}")
                             else:
                                 # Verify current PIN and change
-                                if transaction_processor.hash_pin(current_digits) == transaction_processor.users['user123']['pin']:
-                                    transaction_processor.users['user123']['pin'] = transaction_processor.hash_pin(new_digits)
+                                if session.change_pin(current_digits, new_digits):
+                                    # The change revoked the old token; keep this session's new one
+                                    st.session_state.auth_token = session.token
                                     st.success(f"✅ PIN successfully changed to: {new_digits}")
                                     st.balloons()
                                 else:
@@ -347,7 +447,8 @@ def show_account_settings():
     
     if st.button("Change PIN Manually"):
         if old_pin and new_pin:
-            if transaction_processor.change_pin_manual(old_pin, new_pin):
+            if session.change_pin(old_pin, new_pin):
+                st.session_state.auth_token = session.token
                 st.success("✅ PIN changed successfully!")
             else:
                 st.error("❌ Current PIN is incorrect")
@@ -369,6 +470,86 @@ def show_account_settings():
             st.session_state.voice_enrolled = True
             st.rerun()
 
+def show_metrics():
+    st.header("📈 Metrics")
+    
+    if st.session_state.current_user not in METRICS_ADMINS:
+        st.warning("Metrics are available to administrators only")
+        return
+    
+    import pandas as pd
+    
+    def latency_table(name, label):
+        rows = []
+        for labels, histogram in REGISTRY.series(name):
+            summary = histogram.summary()
+            rows.append({
+                label: labels.get(label, ''),
+                'count': summary['count'],
+                'p50 (ms)': summary['p50'] * 1000,
+                'p95 (ms)': summary['p95'] * 1000,
+                'p99 (ms)': summary['p99'] * 1000,
+                'max (ms)': summary['max'] * 1000,
+            })
+        return pd.DataFrame(rows)
+    
+    # Where voice-command time goes: per stage, queued before each, end to end
+    st.subheader("Voice Command Stages")
+    stages = latency_table('voice_stage_seconds', 'stage')
+    if stages.empty:
+        st.info("No voice commands processed yet")
+    else:
+        st.dataframe(stages, use_container_width=True)
+        st.caption("Time waiting in each stage's queue")
+        st.dataframe(latency_table('voice_queue_wait_seconds', 'stage'), use_container_width=True)
+        st.caption("End to end, submit to finish")
+        st.dataframe(latency_table('voice_command_seconds', 'outcome'), use_container_width=True)
+    
+    st.subheader("Speech-to-Text")
+    stt = latency_table('stt_request_seconds', 'backend')
+    if not stt.empty:
+        st.dataframe(stt, use_container_width=True)
+    
+    st.subheader("Counters")
+    counters = [
+        {'metric': name, **labels, 'value': metric.value}
+        for name, family in REGISTRY.snapshot().items() if family['type'] != 'histogram'
+        for labels, metric in REGISTRY.series(name)
+    ]
+    if counters:
+        st.dataframe(pd.DataFrame(counters), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download Prometheus text", REGISTRY.to_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+    with col2:
+        st.download_button("Download JSON", REGISTRY.to_json(),
+                           file_name="metrics.json", mime="application/json")
+    
+    # Sampling profiler over the pipeline threads, off unless started here
+    st.subheader("Profiler")
+    profiler = load_profiler()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Start", disabled=profiler.running):
+            profiler.start()
+            st.rerun()
+    with col2:
+        if st.button("Stop", disabled=not profiler.running):
+            profiler.stop()
+            st.rerun()
+    with col3:
+        if st.button("Reset"):
+            profiler.reset()
+    
+    st.write(f"{'Running' if profiler.running else 'Stopped'} - {profiler.samples} samples")
+    if profiler.samples:
+        st.dataframe(pd.DataFrame(profiler.top(20), columns=['function', 'self', 'total']),
+                     use_container_width=True)
+        st.download_button("Download collapsed stacks", profiler.collapsed(),
+                           file_name="profile.folded", mime="text/plain")
+
 def show_about():
     st.header("About Voice Banking System")
     st.markdown("""
@@ -383,6 +564,7 @@ def show_about():
     - **"Transfer 500 to John"** - Send money to recipient
     - **"Check balance"** - View account balance
     - **"Show transactions"** - View transaction history
+    - **"How much did I send to John this month?"** - Spending summaries
     - **"Change PIN"** - Update security PIN using voice
     
     ### Technology Stack:
@@ -395,12 +577,15 @@ def show_about():
     - Voice biometric authentication
     - PIN-based fallback authentication
     - Secure voice profile storage
-    - Encrypted PIN storage
+    - Salted scrypt PIN hashes, checked off the UI thread
+    - Signed, expiring session tokens
     """)
 
 def logout():
+    session.logout()
     st.session_state.authenticated = False
     st.session_state.current_user = None
+    st.session_state.auth_token = None
     st.success("✅ Logged out successfully!")
     st.rerun()
 
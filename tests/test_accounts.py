@@ -0,0 +1,123 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from utils.accounts import AccountStore
+from utils.ledger import Ledger
+
+
+def test_reopening_returns_the_balance_in_rupees():
+    store = AccountStore(Ledger())
+    assert store.open_account("alice", 10000) == Decimal("10000.00")
+    assert store.open_account("alice", 5) == Decimal("10000.00")
+
+
+def test_internal_transfers_write_a_credit_leg():
+    ledger = Ledger()
+    store = AccountStore(ledger)
+    store.open_account("alice", 100)
+    store.open_account("bob", 50)
+    assert store.transfer("alice", "bob", "30.25") == (True, Decimal("69.75"))
+    assert store.balance("bob") == Decimal("80.25")
+    debit, credit = ledger.last(2)
+    assert (debit['type'], debit['account'], debit['counterparty']) == ('debit', "alice", "bob")
+    assert (credit['type'], credit['account'], credit['counterparty']) == ('credit', "bob", "alice")
+    assert credit['amount'] == Decimal("30.25") and credit['balance_after'] == Decimal("80.25")
+    # An external recipient only gets the debit leg
+    store.transfer("alice", "john", 10)
+    assert [record['type'] for record in ledger] == ['debit', 'credit', 'debit']
+
+
+def test_unknown_accounts_raise_key_error():
+    store = AccountStore(Ledger())
+    store.open_account("alice", 100)
+    with pytest.raises(KeyError):
+        store.transfer("mallory", "alice", 10)
+    with pytest.raises(KeyError):
+        store.balance("mallory")
+    assert store.balance("alice") == Decimal("100.00")
+
+
+def test_opposite_transfers_do_not_deadlock_and_conserve_money():
+    store = AccountStore(Ledger(), shards=64)
+    # Different shards, so each transfer takes two locks
+    assert store._shard("alice") != store._shard("bob")
+    store.open_account("alice", 1000)
+    store.open_account("bob", 1000)
+    start = threading.Barrier(2)
+
+    def send(source, recipient):
+        start.wait()
+        for _ in range(2000):
+            store.transfer(source, recipient, 1)
+
+    threads = [threading.Thread(target=send, args=pair, daemon=True)
+               for pair in (("alice", "bob"), ("bob", "alice"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads), "transfers deadlocked"
+
+    assert store.balance("alice") + store.balance("bob") == Decimal("2000.00")
+    # Every successful transfer wrote both legs, and the final rows agree with the balances
+    ledger = store.ledger
+    assert len(ledger) % 2 == 0
+    assert ledger.last(1, account="alice")[0]['balance_after'] == store.balance("alice")
+    assert ledger.last(1, account="bob")[0]['balance_after'] == store.balance("bob")
+
+
+def batch_store(**balances):
+    store = AccountStore(Ledger())
+    for account, balance in balances.items():
+        store.open_account(account, balance)
+    return store
+
+
+def test_batch_tracks_each_source_separately():
+    store = batch_store(alice=100, bob=50)
+    result = store.transfer_batch(["alice", "bob", "alice", "carol"], ["john"] * 4, [30, 20, 40, 5])
+    assert result['status'].tolist() == ['aborted', 'aborted', 'aborted', 'unknown_account']
+    assert result['committed'] == 0
+    result = store.transfer_batch(["alice", "bob", "alice"], ["john"] * 3, [30, 20, 40])
+    assert result['committed'] == 3
+    assert result['balance_after'].tolist() == [7000, 3000, 3000]
+    assert (store.balance("alice"), store.balance("bob")) == (Decimal("30.00"), Decimal("30.00"))
+
+
+def test_atomic_batch_aborts_on_insufficient_funds():
+    store = batch_store(alice=100, bob=100)
+    result = store.transfer_batch(["alice", "bob", "alice"], ["john"] * 3, [60, 10, 60])
+    assert result['committed'] == 0
+    assert result['status'].tolist() == ['aborted', 'aborted', 'insufficient_funds']
+    assert result['balance_after'].tolist() == [-1, -1, -1]
+    assert (store.balance("alice"), store.balance("bob")) == (Decimal("100.00"), Decimal("100.00"))
+    assert len(store.ledger) == 0
+
+
+def test_non_atomic_batch_skips_short_items_and_continues():
+    store = batch_store(alice=100)
+    result = store.transfer_batch(["alice"] * 4, ["john"] * 4, [60, 60, 30, 20], atomic=False)
+    assert result['status'].tolist() == ['ok', 'insufficient_funds', 'ok', 'insufficient_funds']
+    assert result['balance_after'].tolist() == [4000, -1, 1000, -1]
+    assert store.balance("alice") == Decimal("10.00")
+    assert [record['amount'] for record in store.ledger] == [60, 30]
+
+
+def test_batch_credits_land_after_the_debits():
+    # bob is paid by alice and pays john in the same batch; his debit is
+    # checked against his opening balance, not the incoming credit
+    store = batch_store(alice=100, bob=0)
+    result = store.transfer_batch(["alice", "bob"], ["bob", "john"], [50, 30], atomic=False)
+    assert result['status'].tolist() == ['ok', 'insufficient_funds']
+    assert (store.balance("alice"), store.balance("bob")) == (Decimal("50.00"), Decimal("50.00"))
+
+    store = batch_store(alice=100, bob=40)
+    result = store.transfer_batch(["alice", "bob"], ["bob", "john"], [50, 30])
+    assert result['status'].tolist() == ['ok', 'ok']
+    assert result['balance_after'].tolist() == [5000, 1000]
+    assert store.balance("bob") == Decimal("60.00")
+    credit = store.ledger.last(1, account="bob")[0]
+    assert (credit['type'], credit['balance_after']) == ('credit', Decimal("60.00"))
+    assert store.balance("alice") + store.balance("bob") == Decimal("110.00")
@@ -0,0 +1,33 @@
+from utils.analytics import SpendingAnalytics
+from utils.dashboard_view import DashboardView
+from utils.ledger import Ledger
+
+
+def test_bulk_day_without_accounts_is_ignored():
+    ledger = Ledger()
+    analytics = SpendingAnalytics(ledger)
+    # More rows than the per-row path handles, none of them tied to an account
+    ledger.extend([{'type': 'debit', 'amount': 1, 'description': 'x', 'balance_after': 0}] * 20)
+    assert len(ledger) == 20
+    assert analytics.by_counterparty('user123') == {}
+
+
+def test_rollups_and_dashboard_agree_on_the_day():
+    ledger = Ledger()
+    analytics = SpendingAnalytics(ledger)
+    dashboard = DashboardView(ledger)
+    ledger.extend([{'type': 'debit', 'amount': 5, 'description': 'Transfer to john', 'balance_after': 95,
+                    'account': 'alice', 'counterparty': 'john'}] * 20)
+    assert analytics.sent_to('alice', 'john') == 100
+    assert sum(day['debit'] for day in dashboard.daily_totals('alice').values()) == 100
+
+
+def test_unknown_names_have_no_spending():
+    ledger = Ledger()
+    analytics = SpendingAnalytics(ledger)
+    # A debit without a counterparty is stored under id -1, the same id an unknown name looks up
+    ledger.extend([{'type': 'debit', 'amount': '750.50', 'description': 'Fee', 'balance_after': 0,
+                    'account': 'alice'}])
+    assert analytics.sent_to('alice', 'nobody') == 0
+    assert analytics.by_counterparty('nobody') == {}
+    assert DashboardView(ledger).daily_totals('nobody') == {}
@@ -0,0 +1,116 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import voice
+from utils.api import BankingAPI, Request
+from utils.credentials import CredentialService
+from utils.transaction_processor import TransactionProcessor
+from utils.voice_authentication import VoiceAuthenticator
+
+SPEAKER = 200
+
+
+def wav(seed):
+    return voice(SPEAKER, 1.5, np.random.default_rng(seed)).wav_bytes()
+
+
+@pytest.fixture
+def api(tmp_path):
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10))
+    processor.open_account("alice", "4321", 500)
+    api = BankingAPI(processor, VoiceAuthenticator(state_dir=str(tmp_path), legacy_file=None))
+    yield api
+    asyncio.run(api.close())
+
+
+def call(api, method, path, query=None, headers=None, body=b''):
+    request = Request(method, path, query or {}, headers or {}, body, True)
+    return asyncio.run(api._handle(request))
+
+
+def login(api, pin="4321"):
+    status, payload, _ = call(api, 'POST', '/v1/login', headers={'content-type': 'application/json'},
+                              body=f'{{"account": "alice", "pin": "{pin}"}}'.encode())
+    assert status == 200, payload
+    return {'authorization': f"Bearer {payload['token']}"}
+
+
+def test_enroll_needs_a_token(api):
+    status, _, _ = call(api, 'POST', '/v1/voice/enroll', {'user': 'alice'}, body=wav(1))
+    assert status == 401
+    assert "alice" not in api.voice.voice_profiles
+
+
+def test_enroll_only_the_tokens_account(api):
+    status, _, _ = call(api, 'POST', '/v1/voice/enroll', {'user': 'bob'}, login(api), wav(1))
+    assert status == 403
+
+
+def test_replacing_a_voiceprint_needs_the_pin(api):
+    auth = login(api)
+    assert call(api, 'POST', '/v1/voice/enroll', headers=auth, body=wav(1))[0] == 200
+    assert call(api, 'POST', '/v1/voice/enroll', headers=auth, body=wav(2))[0] == 409
+    assert call(api, 'POST', '/v1/voice/enroll', headers={**auth, 'x-pin': '0000'}, body=wav(2))[0] == 401
+    assert call(api, 'POST', '/v1/voice/enroll', headers={**auth, 'x-pin': '4321'}, body=wav(2))[0] == 200
+
+
+def verify(api, pin=None, seed=2, speaker=SPEAKER):
+    headers = {'x-pin': pin} if pin else {}
+    body = voice(speaker, 1.5, np.random.default_rng(seed)).wav_bytes()
+    return call(api, 'POST', '/v1/voice/verify', {'user': 'alice'}, headers, body)
+
+
+def test_voice_login_needs_voice_and_pin(api):
+    api.voice.enroll_user("alice", voice(SPEAKER, 1.5, np.random.default_rng(1)))
+    assert verify(api)[0] == 401
+    status, payload, _ = verify(api, "4321")
+    assert status == 200 and payload['authenticated']
+    assert api.processor.credentials.check_token(payload['token']) == "alice"
+
+
+@pytest.mark.parametrize("pin, speaker", [("0000", SPEAKER), ("4321", 203)])
+def test_failed_voice_login_reveals_nothing(api, pin, speaker):
+    api.voice.enroll_user("alice", voice(SPEAKER, 1.5, np.random.default_rng(1)))
+    status, payload, _ = verify(api, pin, speaker=speaker)
+    assert status == 200
+    assert payload == {'user': 'alice', 'authenticated': False}
+
+
+def test_failed_voice_logins_are_rate_limited(api):
+    api.voice.enroll_user("alice", voice(SPEAKER, 1.5, np.random.default_rng(1)))
+    for _ in range(api.voice_attempts):
+        assert not verify(api, "0000")[1]['authenticated']
+    status, _, headers = verify(api, "4321")
+    assert status == 429 and dict(headers)['Retry-After']
+    # Once the failures age out, the right voice and PIN get in again
+    api.voice_lockout = 0
+    assert verify(api, "4321")[1]['authenticated']
+
+
+def test_verify_never_opens_accounts(api):
+    api.voice.enroll_user("mallory", voice(SPEAKER, 1.5, np.random.default_rng(1)))
+    status, payload, _ = call(api, 'POST', '/v1/voice/verify', {'user': 'mallory'}, {'x-pin': '1234'}, wav(2))
+    assert status == 200 and not payload['authenticated']
+    assert 'token' not in payload
+    assert not api.processor.accounts.has_account("mallory")
+
+
+def test_voice_routes_are_off_without_an_authenticator():
+    api = BankingAPI(TransactionProcessor(credentials=CredentialService(n=2**10)))
+    try:
+        assert call(api, 'POST', '/v1/voice/verify', {'user': 'alice'}, body=wav(1))[0] == 404
+    finally:
+        asyncio.run(api.close())
+
+
+def test_malformed_json_is_a_400_when_recording(tmp_path):
+    api = BankingAPI(TransactionProcessor(credentials=CredentialService(n=2**10)),
+                     record=str(tmp_path / "mix.jsonl"))
+    try:
+        status, _, _ = call(api, 'POST', '/v1/classify', headers={'content-type': 'application/json'},
+                            body=b'{"text": ')
+        assert status == 400
+    finally:
+        asyncio.run(api.close())
@@ -0,0 +1,72 @@
+import pytest
+
+from utils.credentials import CredentialService, _b64, hash_pin, record_params, verify_pin
+
+
+@pytest.fixture
+def service():
+    service = CredentialService(n=2**10)
+    service.set_pin("alice", "4321")
+    yield service
+    service.shutdown()
+
+
+def test_pin_records_are_salted_scrypt():
+    first, second = hash_pin("4321", n=2**10), hash_pin("4321", n=2**10)
+    assert first.startswith("scrypt$") and first != second
+    assert record_params(first) == (2**10, 8, 1)
+    assert verify_pin("4321", first) and verify_pin("4321", second)
+    assert not verify_pin("1234", first)
+    assert not verify_pin("4321", "plain$4321")
+
+
+def test_set_and_check_pin(service):
+    assert "alice" in service
+    assert service.check("alice", "4321")
+    assert not service.check("alice", "1234")
+    assert service.verify("alice", "4321").result(timeout=5)
+    # Unknown accounts are rejected, not raised
+    assert not service.check("mallory", "4321")
+
+
+def test_change_pin_needs_the_old_pin_and_revokes_tokens(service):
+    token = service.login("alice", "4321")
+    assert not service.change_pin("alice", "0000", "9999")
+    assert service.check_token(token) == "alice"
+    assert service.change_pin("alice", "4321", "9999")
+    assert service.check("alice", "9999") and not service.check("alice", "4321")
+    assert service.check_token(token) is None
+
+
+def test_tokens_verify_until_revoked(service):
+    assert service.login("alice", "0000") is None
+    token = service.login("alice", "4321")
+    assert service.check_token(token) == "alice"
+    other = service.issue_token("alice")
+    service.revoke("alice", token)
+    assert service.check_token(token) is None
+    assert service.check_token(other) == "alice"
+
+
+def test_expired_tokens_are_rejected():
+    service = CredentialService(n=2**10, token_ttl=-1)
+    try:
+        assert service.check_token(service.issue_token("alice")) is None
+    finally:
+        service.shutdown()
+
+
+def test_tampered_tokens_are_rejected(service):
+    token = service.issue_token("alice")
+    account, expires, nonce, signature = token.split('.')
+    forged_account = f"{_b64(b'bob')}.{expires}.{nonce}.{signature}"
+    extended = f"{account}.{int(expires) + 3600}.{nonce}.{signature}"
+    bad_signature = f"{account}.{expires}.{nonce}.{'A' * len(signature)}"
+    for forged in (forged_account, extended, bad_signature, token[:-1], "", "garbage", None):
+        assert service.check_token(forged) is None
+    # A token signed with another service's secret is not accepted either
+    stranger = CredentialService(n=2**10)
+    try:
+        assert stranger.check_token(token) is None
+    finally:
+        stranger.shutdown()
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+
+from utils.credentials import CredentialService
+from utils.entities import EntityParser
+from utils.transaction_processor import TransactionProcessor
+
+
+@pytest.fixture(scope="module")
+def parse():
+    return EntityParser().parse
+
+
+@pytest.mark.parametrize("text, amount, recipient", [
+    ("transfer 1,500.50 to john please", Decimal("1500.50"), "john"),
+    ("send five hundred and twenty rupees to mary", Decimal("520"), "mary"),
+    ("pay two lakh to the landlord", Decimal("200000"), "landlord"),
+    ("transfer ten point five to bob", Decimal("10.5"), "bob"),
+    ("transfer one point five lakh to john", Decimal("150000"), "john"),
+    ("send 1.5 lakh to john", Decimal("150000"), "john"),
+    ("send two point two five thousand to john", Decimal("2250"), "john"),
+])
+def test_amounts_and_recipients(parse, text, amount, recipient):
+    entities = parse(text)
+    assert (entities.amount, entities.recipient) == (amount, recipient)
+
+
+def test_pin_digits(parse):
+    assert parse("my pin is one two three four").digits == "1234"
+    assert parse("twenty five").digits == "25"
+
+
+@pytest.mark.parametrize("text", ["transfer ²3 to john", "send ٣٠٠ to john", "pay ₹²5 to john"])
+def test_non_ascii_digits_are_not_numbers(parse, text):
+    entities = parse(text)
+    assert entities.amount is None
+    assert entities.recipient == "john"
+
+
+def test_non_ascii_digits_do_not_break_a_batch():
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10))
+    result = processor.process_transfers_batch(["transfer ²3 to john", "transfer 5 to john"], atomic=False)
+    assert result['status'].tolist() == ['invalid', 'ok']
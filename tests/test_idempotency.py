@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+
+from utils.accounts import AccountStore
+from utils.idempotency import DedupeIndex
+from utils.ledger import Ledger
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def counter():
+    calls = []
+    return calls, lambda: calls.append(1) or len(calls)
+
+
+def test_a_key_runs_once_until_it_expires():
+    clock = Clock()
+    index = DedupeIndex(window=60, clock=clock)
+    calls, operation = counter()
+    assert index.run("k", operation) == (1, False)
+    clock.now += 59
+    assert index.run("k", operation) == (1, True)
+    clock.now += 1
+    assert "k" not in index
+    assert index.run("k", operation) == (2, False)
+    assert len(calls) == 2
+
+
+def test_capacity_drops_the_oldest_key():
+    index = DedupeIndex(window=60, capacity=2, clock=Clock())
+    calls, operation = counter()
+    for key in ("a", "b", "c"):
+        index.run(key, operation)
+    assert len(index) == 2 and "a" not in index
+    assert index.run("a", operation) == (4, False)
+
+
+def test_a_failed_run_can_be_retried():
+    def fail():
+        raise RuntimeError("ledger write failed")
+
+    index = DedupeIndex(clock=Clock())
+    with pytest.raises(RuntimeError):
+        index.run("k", fail)
+    assert index.run("k", lambda: "ok") == ("ok", False)
+
+
+def test_retried_transfer_is_applied_once_until_the_key_expires():
+    clock = Clock()
+    store = AccountStore(Ledger())
+    store.dedupe = DedupeIndex(window=60, clock=clock)
+    store.open_account("alice", 100)
+
+    assert store.transfer("alice", "john", 10, idempotency_key="req-1") == (True, Decimal("90.00"))
+    assert store.transfer("alice", "john", 10, idempotency_key="req-1") == (True, Decimal("90.00"))
+    assert store.balance("alice") == Decimal("90.00")
+    assert len(store.ledger) == 1
+    # Keys are per source account
+    store.open_account("bob", 100)
+    assert store.transfer("bob", "john", 10, idempotency_key="req-1") == (True, Decimal("90.00"))
+    assert len(store.ledger) == 2
+
+    clock.now += 60
+    assert store.transfer("alice", "john", 10, idempotency_key="req-1") == (True, Decimal("80.00"))
+    assert store.balance("alice") == Decimal("80.00")
+    assert len(store.ledger) == 3
@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.bench_import import SCENARIOS, profile
+
+
+@pytest.fixture(scope="module")
+def startup():
+    # Whatever the bare interpreter imports is not charged to a scenario
+    _, modules, _ = profile("pass")
+    return {name for _, name in modules}
+
+
+@pytest.mark.parametrize("label", list(SCENARIOS))
+def test_heavy_dependencies_load_lazily(label, startup, record_property):
+    statement, forbidden = SCENARIOS[label]
+    total, modules, loaded = profile(statement, startup)
+    record_property("import_ms", total / 1000)
+    slowest = ", ".join(f"{name} {cumulative / 1000:.1f} ms" for cumulative, name in sorted(modules)[-3:])
+    print(f"{label}: {total / 1000:.1f} ms ({slowest})")
+    unexpected = sorted(name for name in forbidden if name in loaded)
+    assert not unexpected, f"{label} loaded {', '.join(unexpected)} eagerly ({total / 1000:.1f} ms)"
@@ -0,0 +1,37 @@
+import pytest
+
+from utils.intent import IntentMatcher
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher()
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("transfer 500 to john", "transfer"),
+    ("pay john 200", "transfer"),
+    ("please send money to mary", "transfer"),
+    ("check my balance", "balance"),
+    ("show last 5 transactions", "transactions"),
+    ("change my pin", "change_pin"),
+    ("how much did i spend on groceries", "spending"),
+    ("good morning", "unknown"),
+])
+def test_classifies_plain_commands(matcher, text, intent):
+    assert matcher.classify(text)[0] == intent
+
+
+def test_pin_fee_is_not_a_transfer(matcher):
+    # The rule-order misroute the matcher replaced: a bare "pay" must not
+    # outweigh the topic of the sentence
+    intent, confidence = matcher.classify("pay my PIN fee")
+    assert intent == "change_pin"
+    assert confidence > 0.5
+
+
+def test_explicit_weights_from_config(tmp_path):
+    config = tmp_path / "keywords.json"
+    config.write_text('{"transfer": [["pay", 0.25], "send"], "bills": ["bill"]}')
+    matcher = IntentMatcher.from_config(str(config))
+    assert matcher.classify("pay the bill") == ("bills", 0.8)
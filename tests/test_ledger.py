@@ -0,0 +1,68 @@
+import os
+
+from utils.ledger import Ledger
+
+
+def record(i, account="alice"):
+    return {'type': 'debit', 'amount_minor': 100 * i, 'balance_minor': 10**6 - 100 * i,
+            'account': account, 'counterparty': "john", 'description': f"payment {i}", 'ts': 1_700_000_000 + i}
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith(Ledger.SEGMENT_PREFIX))
+
+
+def test_crash_mid_wal_keeps_the_complete_records(tmp_path):
+    ledger = Ledger(str(tmp_path), snapshot_interval=100)
+    ledger.extend([record(i) for i in range(1, 4)])
+    # The process dies while writing the fourth record: no snapshot, no close
+    with open(tmp_path / Ledger.WAL_FILE, 'a') as f:
+        f.write('{"seq": 3, "ts": 1700000004, "type": "deb')
+
+    recovered = Ledger(str(tmp_path))
+    assert len(recovered) == 3
+    assert [str(r['amount']) for r in recovered] == ["1.00", "2.00", "3.00"]
+    assert [r['description'] for r in recovered.last(3, account="alice")] == \
+        ["payment 1", "payment 2", "payment 3"]
+    # Recovery moved the replayed records into a segment and cleared the WAL
+    assert os.path.getsize(tmp_path / Ledger.WAL_FILE) == 0
+    recovered.append(record(4))
+    recovered.close()
+    assert len(Ledger(str(tmp_path))) == 4
+
+
+def test_reopen_after_a_snapshot_restores_state_and_replays_the_wal(tmp_path):
+    state = {'risk': [1, 2, 3]}
+    ledger = Ledger(str(tmp_path), snapshot_interval=100, state_provider=lambda: state)
+    ledger.extend([record(i) for i in range(1, 6)])
+    ledger.snapshot()
+    assert os.path.getsize(tmp_path / Ledger.WAL_FILE) == 0
+    # Appended after the snapshot, so only the WAL has these
+    ledger.extend([record(i, account="bob") for i in range(6, 8)])
+
+    recovered = Ledger(str(tmp_path))
+    assert recovered.state == state
+    assert len(recovered) == 7
+    assert [r['seq'] for r in recovered.last(5, account="alice")] == [0, 1, 2, 3, 4]
+    assert [r['seq'] for r in recovered.last(5, account="bob")] == [5, 6]
+    assert len(recovered.range(1_700_000_006, 1_700_000_008)) == 2
+
+
+def test_reopen_after_segment_rollover(tmp_path):
+    ledger = Ledger(str(tmp_path), segment_size=3, snapshot_interval=2)
+    for i in range(1, 11):
+        ledger.append(record(i))
+    ledger.close()
+    assert len(segments(tmp_path)) == 4
+
+    recovered = Ledger(str(tmp_path), segment_size=3, snapshot_interval=2)
+    assert [r['seq'] for r in recovered] == list(range(10))
+    assert recovered[-1]['balance_after'] == (10**6 - 1000) / 100
+    # New appends continue the last segment instead of rewriting earlier ones
+    recovered.append(record(11))
+    recovered.append(record(12))
+    recovered.close()
+    assert len(segments(tmp_path)) == 4
+    reopened = Ledger(str(tmp_path))
+    assert [r['seq'] for r in reopened] == list(range(12))
+    assert [r['description'] for r in reopened[-2:]] == ["payment 11", "payment 12"]
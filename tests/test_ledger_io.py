@@ -0,0 +1,29 @@
+from utils.credentials import CredentialService
+from utils.transaction_processor import DEFAULT_ACCOUNT, INITIAL_BALANCE, TransactionProcessor
+
+STATEMENT = """date,type,description,amount
+2026-01-02,debit,Rent,9000.00
+2026-01-03,credit,Salary,500.00
+2026-01-04,debit,Groceries,1250.50
+"""
+
+
+def test_statement_without_balances_runs_on_from_the_live_balance(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text(STATEMENT)
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10))
+    processor.import_transactions(str(path))
+    history = processor.transactions.last(3, account=DEFAULT_ACCOUNT)
+    assert [record['balance_after'] for record in history] == [1000, 1500, 249.5]
+    assert processor.accounts.balance(DEFAULT_ACCOUNT) == INITIAL_BALANCE - 9000 + 500 - 1250.5
+
+
+def test_balances_carry_across_chunks(tmp_path):
+    from utils.ledger import Ledger
+    from utils.ledger_io import import_ledger
+
+    path = tmp_path / "statement.csv"
+    path.write_text(STATEMENT)
+    ledger = Ledger()
+    import_ledger(ledger, str(path), account="alice", chunk_rows=1, opening=lambda name: 1000000)
+    assert [record['balance_after'] for record in ledger.last(3, account="alice")] == [1000, 1500, 249.5]
@@ -0,0 +1,47 @@
+import logging
+import pickle
+
+import numpy as np
+
+from benchmarks.corpus import voice
+from utils.profile_store import ProfileStore
+from utils.voice_authentication import VoiceAuthenticator
+
+
+def write_legacy(path, wav):
+    # The original VoiceAuthenticator kept no embedding, only the recording
+    profiles = {
+        'alice': {'enrolled_at': 1.0, 'audio_file': str(wav)},
+        'bob': {'enrolled_at': 2.0, 'audio_file': str(path.parent / "gone.wav")},
+        'carol': {'enrolled_at': 3.0, 'embedding': np.arange(13, dtype=np.float32)},
+    }
+    with open(path, 'wb') as f:
+        pickle.dump(profiles, f)
+
+
+def test_import_pickle_reembeds_and_reports_skipped(tmp_path, caplog):
+    legacy = tmp_path / "voice_profiles.pkl"
+    wav = voice(200, 1.5, np.random.default_rng(1)).save(str(tmp_path / "alice.wav"))
+    write_legacy(legacy, wav)
+    store = ProfileStore(str(tmp_path / "store"))
+
+    with caplog.at_level(logging.WARNING, logger="utils.profile_store"):
+        imported, skipped = store.import_pickle(str(legacy), embed=lambda path: np.ones(13))
+
+    assert imported == 2
+    assert skipped == ['bob']
+    assert "'bob'" in caplog.text
+    np.testing.assert_array_equal(store.get_embedding('alice'), np.ones(13))
+    np.testing.assert_array_equal(store.get_embedding('carol'), np.arange(13))
+    assert store.profiles['alice']['audio_file'] == str(wav)
+
+
+def test_authenticator_migrates_legacy_users(tmp_path):
+    legacy = tmp_path / "voice_profiles.pkl"
+    wav = voice(200, 1.5, np.random.default_rng(1)).save(str(tmp_path / "alice.wav"))
+    write_legacy(legacy, wav)
+
+    auth = VoiceAuthenticator(state_dir=str(tmp_path / "store"), legacy_file=str(legacy))
+    assert set(auth.voice_profiles) == {'alice', 'carol'}
+    verified, _ = auth.authenticate_user('alice', voice(200, 1.5, np.random.default_rng(2)))
+    assert verified
@@ -0,0 +1,77 @@
+import time
+
+from utils.credentials import CredentialService
+from utils.ledger import Ledger
+from utils.risk import UNLIMITED, RiskEngine
+from utils.transaction_processor import TransactionProcessor
+
+
+def bank(**limits):
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10),
+                                     risk_limits=UNLIMITED._replace(**limits) if limits else None)
+    for account in ("alice", "bob"):
+        processor.open_account(account, "1234", 10**6)
+    return processor
+
+
+def test_limits_are_opt_in():
+    processor = bank()
+    assert processor.risk is None
+    for _ in range(20):
+        assert processor.process_transfer("transfer 10 to john", "alice").startswith("✅")
+
+
+def test_recipient_limits_are_per_sender():
+    processor = bank(recipient_per_hour=2)
+    for _ in range(2):
+        assert processor.process_transfer("transfer 10 to john", "alice").startswith("✅")
+    assert processor.process_transfer("transfer 10 to john", "alice").startswith("🚫")
+    assert processor.process_transfer("transfer 10 to mary", "alice").startswith("✅")
+    assert processor.process_transfer("transfer 10 to john", "bob").startswith("✅")
+
+
+def test_batches_are_checked_item_by_item():
+    processor = bank(per_minute=3)
+    items = [{'amount': 10, 'recipient': 'john'}] * 5
+    result = processor.process_transfers_batch(items, "alice", atomic=False)
+    assert result['status'].tolist() == ['ok'] * 3 + ['blocked'] * 2
+    assert processor.accounts.balance("alice") == 10**6 - 30
+    # The committed items now count too
+    result = processor.process_transfers_batch(items[:1], "alice", atomic=False)
+    assert result['status'].tolist() == ['blocked']
+
+
+def test_atomic_batch_with_a_blocked_item_aborts():
+    processor = bank(daily_amount=100)
+    items = [{'amount': 60, 'recipient': 'john'}, {'amount': 60, 'recipient': 'mary'}]
+    result = processor.process_transfers_batch(items, "alice")
+    assert result['committed'] == 0
+    assert result['status'].tolist() == ['aborted', 'blocked']
+    assert processor.accounts.balance("alice") == 10**6
+
+
+def test_pair_windows_survive_a_snapshot(tmp_path):
+    processor = TransactionProcessor(ledger_dir=str(tmp_path), credentials=CredentialService(n=2**10),
+                                     risk_limits=UNLIMITED._replace(recipient_per_hour=1))
+    processor.open_account("alice", "1234", 1000)
+    assert processor.process_transfer("transfer 10 to john", "alice").startswith("✅")
+    processor.transactions.snapshot()
+    processor.transactions.close()
+
+    reopened = TransactionProcessor(ledger_dir=str(tmp_path), credentials=CredentialService(n=2**10),
+                                    risk_limits=UNLIMITED._replace(recipient_per_hour=1))
+    reopened.open_account("alice", "1234", 1000)
+    assert ("alice", "john") in reopened.risk._pairs
+    assert reopened.process_transfer("transfer 10 to john", "alice").startswith("🚫")
+
+
+def test_idle_pairs_are_dropped():
+    now = [time.time()]
+    ledger = Ledger()
+    engine = RiskEngine(ledger, UNLIMITED, clock=lambda: now[0])
+    ledger.extend([{'type': 'debit', 'amount_minor': 100, 'balance_minor': 0, 'account': "alice",
+                    'counterparty': f"payee{i}", 'description': '', 'ts': int(now[0])} for i in range(3)])
+    assert len(engine.snapshot()['pairs']) == 3
+    now[0] += 2 * 86400
+    assert engine.snapshot()['pairs'] == []
+    assert engine.check_minor("alice", "payee0", 100).allowed
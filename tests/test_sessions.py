@@ -0,0 +1,28 @@
+import pytest
+
+from utils.credentials import CredentialService
+from utils.sessions import SessionManager
+from utils.transaction_processor import TransactionProcessor
+
+
+@pytest.fixture
+def manager():
+    processor = TransactionProcessor(credentials=CredentialService(n=2**10))
+    processor.open_account("alice", "4321", 500)
+    return SessionManager(processor)
+
+
+def test_login_requires_the_pin(manager):
+    session = manager.get("s1")
+    assert session.login("alice", "1234") is None
+    assert not session.authenticated
+    token = session.login("alice", "4321")
+    assert token and session.account_id == "alice"
+    assert manager.processor.credentials.check_token(token) == "alice"
+
+
+def test_login_never_opens_accounts(manager):
+    session = manager.get("s1")
+    assert session.login("mint1", "1234") is None
+    assert not manager.processor.accounts.has_account("mint1")
+    assert "mint1" not in manager.processor.credentials
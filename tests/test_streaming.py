@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from utils.audio import AudioClip
+from utils.realtime_recorder import RealTimeRecorder
+from utils.streaming import BufferedSTT, EnergyVAD, stream_transcribe, wav_chunks
+
+SAMPLE_RATE = 16000
+LEAD, SPEECH, TAIL = 0.5, 1.0, 1.5
+
+
+@pytest.fixture(scope="module")
+def command_wav(tmp_path_factory):
+    """Quiet lead-in, one second of voiced harmonics, then silence"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SPEECH * SAMPLE_RATE)) / SAMPLE_RATE
+    speech = 0.3 * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t))
+    samples = np.concatenate([rng.normal(scale=0.002, size=int(LEAD * SAMPLE_RATE)), speech,
+                              rng.normal(scale=0.002, size=int(TAIL * SAMPLE_RATE))])
+    return AudioClip.from_samples(samples, SAMPLE_RATE).save(str(tmp_path_factory.mktemp("wav") / "command.wav"))
+
+
+class ScriptedSTT:
+    """Returns a fixed transcript and remembers every clip it was given"""
+
+    def __init__(self, text="check balance"):
+        self.text = text
+        self.clips = []
+
+    def __call__(self, clip):
+        self.clips.append(clip)
+        return self.text
+
+
+def vad_events(chunks, vad):
+    elapsed, events = 0.0, []
+    for chunk in chunks:
+        state = vad.update(chunk)
+        elapsed += vad.chunk_ms(chunk) / 1000
+        if state in ('start', 'end'):
+            events.append((state, elapsed))
+    return events
+
+
+def test_vad_finds_one_segment(command_wav):
+    events = vad_events(wav_chunks(command_wav), EnergyVAD(SAMPLE_RATE))
+    assert [state for state, _ in events] == ['start', 'end']
+    (_, start), (_, end) = events
+    assert LEAD <= start <= LEAD + 0.1
+    # End is declared after end_silence_ms of quiet following the speech
+    assert LEAD + SPEECH + 0.5 <= end <= LEAD + SPEECH + 0.6
+
+
+def test_final_transcript_and_captured_utterance(command_wav):
+    stt = ScriptedSTT()
+    events = list(stream_transcribe(wav_chunks(command_wav), BufferedSTT(stt, SAMPLE_RATE), EnergyVAD(SAMPLE_RATE)))
+    assert [event.kind for event in events] == ['final']
+    final = events[0]
+    assert final.text == "check balance"
+    # Pre-roll + speech + end silence, and none of the trailing quiet after that
+    assert SPEECH + 0.5 <= final.clip.duration <= SPEECH + 0.5 + 0.3
+    assert len(stt.clips) == 1
+
+
+def test_partials_arrive_before_the_final(command_wav):
+    backend = BufferedSTT(ScriptedSTT(), SAMPLE_RATE, partial_interval=0.25)
+    events = list(stream_transcribe(wav_chunks(command_wav), backend, EnergyVAD(SAMPLE_RATE)))
+    assert [event.kind for event in events] == ['partial', 'final']
+    assert events[0].text == events[1].text == "check balance"
+
+
+def test_silence_gives_an_empty_final():
+    quiet = AudioClip.from_samples(np.random.default_rng(1).normal(scale=0.002, size=2 * SAMPLE_RATE), SAMPLE_RATE)
+    events = list(stream_transcribe(wav_chunks(quiet), BufferedSTT(ScriptedSTT(), SAMPLE_RATE),
+                                    EnergyVAD(SAMPLE_RATE), no_speech_timeout=1.0))
+    assert events == [('final', '', None)]
+
+
+def test_recorder_runs_offline_from_a_wav(command_wav):
+    recorder = RealTimeRecorder()
+    partials = []
+    backend = BufferedSTT(ScriptedSTT("transfer 500 to john"), SAMPLE_RATE, partial_interval=0.25)
+    events = list(recorder.stream_command(backend, chunks=wav_chunks(command_wav)))
+    assert events[-1].text == "transfer 500 to john"
+    assert events[-1].clip.sample_rate == SAMPLE_RATE
+
+    text, clip = RealTimeRecorder().listen_for_command(
+        BufferedSTT(ScriptedSTT("check balance"), SAMPLE_RATE, partial_interval=0.25),
+        on_partial=partials.append, chunks=wav_chunks(command_wav))
+    assert (text, partials) == ("check balance", ["check balance"])
+    assert clip is not None
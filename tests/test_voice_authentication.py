@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from benchmarks.corpus import SAMPLE_RATE, voice
+from utils.audio import AudioClip
+from utils.voice_authentication import VoiceAuthenticator
+
+# Speakers outside the ranges the shipped background and threshold were fitted on
+ENROLLED, OTHER = 200, 203
+
+
+@pytest.fixture
+def auth(tmp_path):
+    auth = VoiceAuthenticator(state_dir=str(tmp_path), legacy_file=None)
+    assert auth.enroll_user("alice", voice(ENROLLED, 1.5, np.random.default_rng(1)))
+    return auth
+
+
+def test_same_speaker_is_accepted(auth):
+    verified, similarity = auth.authenticate_user("alice", voice(ENROLLED, 1.5, np.random.default_rng(2)))
+    assert verified, similarity
+
+
+def test_other_speaker_is_rejected(auth):
+    verified, similarity = auth.authenticate_user("alice", voice(OTHER, 1.5, np.random.default_rng(2)))
+    assert not verified, similarity
+
+
+@pytest.mark.parametrize("scale", [0.003, 0.03, 0.3])
+def test_white_noise_is_rejected(auth, scale):
+    noise = np.random.default_rng(3).normal(scale=scale, size=int(1.5 * SAMPLE_RATE))
+    verified, similarity = auth.authenticate_user("alice", AudioClip.from_samples(noise, SAMPLE_RATE))
+    assert not verified, similarity
+
+
+def test_calibration_is_persisted_and_reindexes(tmp_path, auth):
+    rng = np.random.default_rng(4)
+    background = [voice(speaker, 1.0, rng) for speaker in range(300, 320)]
+    held_out = [(speaker, voice(speaker, 1.0, rng)) for speaker in range(320, 332) for _ in range(2)]
+    result = auth.calibrate(background, held_out, far=0.05)
+    assert result['far'] <= 0.05
+    assert auth.threshold == result['threshold']
+
+    reloaded = VoiceAuthenticator(state_dir=str(tmp_path), legacy_file=None)
+    assert reloaded.threshold == result['threshold']
+    assert reloaded.calibrated
+    np.testing.assert_allclose(reloaded.background_mean, auth.background_mean)
+    probe = voice(ENROLLED, 1.5, np.random.default_rng(2))
+    assert reloaded.authenticate_user("alice", probe)[1] == pytest.approx(auth.authenticate_user("alice", probe)[1])
+
+
+def test_uncalibrated_authenticator_warns(tmp_path, caplog):
+    with caplog.at_level("WARNING", logger="utils.voice_authentication"):
+        auth = VoiceAuthenticator(state_dir=str(tmp_path), legacy_file=None)
+    assert not auth.calibrated
+    assert "not calibrated" in caplog.text
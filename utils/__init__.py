@@ -1,5 +1,28 @@
-from .voice_authentication import VoiceAuthenticator
-from .transaction_processor import TransactionProcessor
-from .realtime_recorder import RealTimeRecorder
+import importlib
 
-__all__ = ['VoiceAuthenticator', 'TransactionProcessor', 'RealTimeRecorder']
\ No newline at end of file
+# Public name -> submodule; each is imported on first attribute access, so
+# ``import utils`` stays cheap and loads no audio, numpy or model code
+_LAZY = {
+    'VoiceAuthenticator': '.voice_authentication',
+    'TransactionProcessor': '.transaction_processor',
+    'RealTimeRecorder': '.realtime_recorder',
+    'Ledger': '.ledger',
+    'IntentMatcher': '.intent',
+    'SessionManager': '.sessions',
+    'BankingAPI': '.api',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
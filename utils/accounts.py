@@ -0,0 +1,314 @@
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .idempotency import DedupeIndex
+from .money import MINOR_UNITS, from_minor, to_minor
+from .risk import TransferBlocked
+
+# Per-item outcomes reported by AccountStore.transfer_batch
+BATCH_STATUSES = np.array(['ok', 'invalid', 'unknown_account', 'insufficient_funds', 'aborted', 'blocked'])
+OK, INVALID, UNKNOWN_ACCOUNT, INSUFFICIENT_FUNDS, ABORTED, BLOCKED = range(len(BATCH_STATUSES))
+
+
+class AccountStore:
+    """Multi-account balances with sharded locks and ordered two-party transfers.
+
+    Each account maps to one of ``shards`` locks. A transfer between two
+    internal accounts takes both shard locks in ascending shard order, so
+    concurrent transfers in opposite directions can never deadlock. Every
+    transfer is written to the ledger as a debit leg on the source account
+    and, when the recipient is an internal account, a credit leg on the
+    recipient.
+
+    Balances are held as integer minor units (``balances`` maps account id
+    to paise), so all arithmetic is exact. Amounts passed in are rupees in
+    any form ``money.to_minor`` accepts; balances are returned as Decimals.
+
+    Transfers given an idempotency key are remembered per source account in
+    a DedupeIndex for ``dedupe_window`` seconds; a retried key returns the
+    original result without touching balances or the ledger.
+
+    With a ``risk`` engine, each ``transfer`` that has the funds is checked
+    under the source account's lock and a veto raises
+    ``risk.TransferBlocked``; ``transfer_batch`` checks its items in input
+    order and marks vetoed ones ``blocked``.
+    """
+
+    def __init__(self, ledger, shards=64, dedupe_window=600.0, dedupe_capacity=100000, risk=None):
+        self.ledger = ledger
+        self.risk = risk
+        self.balances = {}
+        self.dedupe = DedupeIndex(dedupe_window, dedupe_capacity)
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._accounts_lock = threading.Lock()
+
+    def open_account(self, account_id, initial_balance=0):
+        """Open an account, restoring its balance from the ledger if it has history"""
+        with self._accounts_lock:
+            if account_id in self.balances:
+                return from_minor(self.balances[account_id])
+            recent = self.ledger.last(1, account=account_id)
+            balance = to_minor(recent[0]['balance_after'] if recent else initial_balance)
+            self.balances[account_id] = balance
+            return from_minor(balance)
+
+    def has_account(self, account_id):
+        return account_id in self.balances
+
+    def balance(self, account_id):
+        with self._lock_for(account_id):
+            return from_minor(self.balances[account_id])
+
+    def set_balance(self, account_id, balance):
+        balance = to_minor(balance)
+        with self._lock_for(account_id):
+            self.balances[account_id] = balance
+
+    def transfer(self, source, recipient, amount, description=None, idempotency_key=None):
+        """Debit ``source`` and credit ``recipient`` if it is an internal account.
+
+        Returns ``(success, balance)`` where balance is the source balance
+        after the transfer, or the unchanged balance on insufficient funds.
+        A repeated ``idempotency_key`` returns the first call's result.
+        """
+        if idempotency_key is None:
+            return self._transfer(source, recipient, amount, description)
+        result, _ = self.dedupe.run(
+            (source, idempotency_key),
+            lambda: self._transfer(source, recipient, amount, description),
+        )
+        return result
+
+    def _transfer(self, source, recipient, amount, description):
+        amount = to_minor(amount)
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+        if source not in self.balances:
+            raise KeyError(f"Unknown account: {source}")
+
+        internal = recipient in self.balances and recipient != source
+        locks = self._ordered_locks(source, recipient if internal else None)
+        for lock in locks:
+            lock.acquire()
+        try:
+            balance = self.balances[source]
+            if amount > balance:
+                return False, from_minor(balance)
+            if self.risk is not None:
+                decision = self.risk.check_minor(source, recipient, amount)
+                if not decision.allowed:
+                    raise TransferBlocked(decision)
+
+            ts = int(time.time())
+            balance -= amount
+            records = [{
+                'type': 'debit',
+                'amount_minor': amount,
+                'description': description or f'Transfer to {recipient}',
+                'balance_minor': balance,
+                'account': source,
+                'counterparty': recipient,
+                'ts': ts
+            }]
+
+            if internal:
+                credited = self.balances[recipient] + amount
+                records.append({
+                    'type': 'credit',
+                    'amount_minor': amount,
+                    'description': f'Transfer from {source}',
+                    'balance_minor': credited,
+                    'account': recipient,
+                    'counterparty': source,
+                    'ts': ts
+                })
+            # Both legs go to the ledger in one write, before any balance
+            # moves, so a failed write leaves balances matching the ledger
+            self.ledger.extend(records)
+            self.balances[source] = balance
+            if internal:
+                self.balances[recipient] = credited
+            return True, from_minor(balance)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def transfer_batch(self, sources, recipients, amounts, atomic=True):
+        """Validate and commit many transfers with one lock acquisition.
+
+        Funds are checked per source account with a vectorized running
+        balance (grouped cumulative sum) over the opening balances; credits
+        to internal recipients land after all debits. With ``atomic=True``
+        nothing is committed unless every item passes, otherwise each item
+        succeeds or fails on its own in input order.
+
+        Returns ``{'committed', 'status', 'balance_after'}`` where status is
+        an array of names from ``BATCH_STATUSES`` and balance_after is an
+        int64 array with the source balance in minor units after each
+        committed item (-1 otherwise).
+
+        With a risk engine, items are checked under the locks before funds
+        are, so a vetoed item is ``blocked`` and never debited. Each item
+        that passes counts against the limits of the items after it, even
+        if it then fails for funds.
+        """
+        n = len(amounts)
+        codes = np.full(n, OK, dtype=np.int8)
+        balance_after = np.full(n, -1, dtype=np.int64)
+        amounts = self._minor_amounts(amounts, codes)
+
+        codes[amounts <= 0] = INVALID
+        for i, (source, recipient) in enumerate(zip(sources, recipients)):
+            if recipient is None:
+                codes[i] = INVALID
+            elif source not in self.balances:
+                codes[i] = UNKNOWN_ACCOUNT
+
+        account_ids = sorted({s for s in sources if s in self.balances})
+        internal = {r for r in recipients if r in self.balances}
+        locks = [self._locks[shard] for shard in
+                 sorted({self._shard(a) for a in internal.union(account_ids)})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            if self.risk is not None:
+                checked = np.flatnonzero(codes == OK).tolist()
+                amount_list = amounts.tolist()
+                decisions = self.risk.check_many([(sources[i], recipients[i], amount_list[i]) for i in checked])
+                for i, decision in zip(checked, decisions):
+                    if not decision.allowed:
+                        codes[i] = BLOCKED
+
+            account_index = {account_id: i for i, account_id in enumerate(account_ids)}
+            group = np.fromiter((account_index.get(s, -1) for s in sources), dtype=np.int64, count=n)
+            # Trailing zero slot catches group -1 (unknown or invalid items)
+            opening = np.array([self.balances[a] for a in account_ids] + [0], dtype=np.int64)
+
+            valid = codes == OK
+            debits = np.where(valid, amounts, 0)
+            # Stable sort by account keeps input order inside each group
+            order = np.argsort(group, kind='stable')
+            sorted_group = group[order]
+            running = np.cumsum(debits[order])
+            starts = np.searchsorted(sorted_group, sorted_group, side='left')
+            group_offset = np.where(starts > 0, running[starts - 1], 0)
+            spent = running - group_offset
+            remaining = np.empty(n, dtype=np.int64)
+            remaining[order] = opening[sorted_group] - spent
+
+            short = valid & (remaining < 0)
+            if short.any():
+                if atomic:
+                    codes[short] = INSUFFICIENT_FUNDS
+                else:
+                    # Past the first shortfall an account's balance depends on
+                    # which items were skipped, so settle those groups in order
+                    for g in np.unique(group[short]):
+                        members = np.flatnonzero(group == g)
+                        first = members[np.argmax(short[members])]
+                        balance = remaining[first] + debits[first]
+                        for i in members[members >= first]:
+                            if not valid[i]:
+                                continue
+                            if amounts[i] > balance:
+                                codes[i] = INSUFFICIENT_FUNDS
+                            else:
+                                balance -= amounts[i]
+                                remaining[i] = balance
+
+            committed = codes == OK
+            if atomic and not committed.all():
+                codes[committed] = ABORTED
+                committed[:] = False
+
+            balance_after[committed] = remaining[committed]
+            self._commit_batch(sources, recipients, amounts, balance_after, committed, internal)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        return {
+            'committed': int(committed.sum()),
+            'status': BATCH_STATUSES[codes],
+            'balance_after': balance_after,
+        }
+
+    def _minor_amounts(self, amounts, codes):
+        """Amounts as int64 minor units; unparseable items are marked INVALID"""
+        array = np.asarray(amounts) if not isinstance(amounts, np.ndarray) else amounts
+        if array.dtype.kind in 'iu':
+            return array.astype(np.int64) * MINOR_UNITS
+        if array.dtype.kind == 'U':
+            # Parsed commands: whole-rupee digit strings convert in one call
+            try:
+                return array.astype(np.int64) * MINOR_UNITS
+            except ValueError:
+                pass
+        minor = np.zeros(len(amounts), dtype=np.int64)
+        for i, amount in enumerate(amounts):
+            try:
+                minor[i] = to_minor(amount)
+            except ValueError:
+                codes[i] = INVALID
+        return minor
+
+    def _commit_batch(self, sources, recipients, amounts, balance_after, committed, internal):
+        indices = np.flatnonzero(committed)
+        if not len(indices):
+            return
+        ts = int(time.time())
+        amount_list = amounts.tolist()
+        balance_list = balance_after.tolist()
+
+        records = []
+        credits = []
+        updated = {}
+        for i in indices.tolist():
+            source = sources[i]
+            recipient = recipients[i]
+            updated[source] = balance_list[i]
+            records.append({
+                'type': 'debit',
+                'amount_minor': amount_list[i],
+                'description': f'Transfer to {recipient}',
+                'balance_minor': balance_list[i],
+                'account': source,
+                'counterparty': recipient,
+                'ts': ts
+            })
+            if recipient in internal and recipient != source:
+                credits.append(i)
+
+        for i in credits:
+            source = sources[i]
+            recipient = recipients[i]
+            credited = updated.get(recipient, self.balances[recipient]) + amount_list[i]
+            updated[recipient] = credited
+            records.append({
+                'type': 'credit',
+                'amount_minor': amount_list[i],
+                'description': f'Transfer from {source}',
+                'balance_minor': credited,
+                'account': recipient,
+                'counterparty': source,
+                'ts': ts
+            })
+        # Balances move only once the ledger write has succeeded
+        self.ledger.extend(records)
+        self.balances.update(updated)
+
+    def _shard(self, account_id):
+        # crc32 rather than hash() so shard assignment is stable across runs
+        return zlib.crc32(str(account_id).encode()) % len(self._locks)
+
+    def _lock_for(self, account_id):
+        return self._locks[self._shard(account_id)]
+
+    def _ordered_locks(self, source, recipient=None):
+        shards = {self._shard(source)}
+        if recipient is not None:
+            shards.add(self._shard(recipient))
+        return [self._locks[shard] for shard in sorted(shards)]
@@ -0,0 +1,224 @@
+import heapq
+import re
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from .ledger import DEBIT, DayClock
+from .money import from_minor
+
+# Spoken period -> function of today returning the [first, end) date range
+PERIODS = {
+    'today': lambda today: (today, today + timedelta(days=1)),
+    'yesterday': lambda today: (today - timedelta(days=1), today),
+    'this week': lambda today: (today - timedelta(days=today.weekday()), today + timedelta(days=1)),
+    'last week': lambda today: (today - timedelta(days=today.weekday() + 7),
+                                today - timedelta(days=today.weekday())),
+    'this month': lambda today: (today.replace(day=1), today + timedelta(days=1)),
+    'last month': lambda today: ((today.replace(day=1) - timedelta(days=1)).replace(day=1),
+                                 today.replace(day=1)),
+    'this year': lambda today: (today.replace(month=1, day=1), today + timedelta(days=1)),
+    'last year': lambda today: (today.replace(year=today.year - 1, month=1, day=1),
+                                today.replace(month=1, day=1)),
+}
+PERIOD_PATTERN = re.compile(r'\b(' + '|'.join(sorted(PERIODS, key=len, reverse=True)) + r')\b')
+SPENDING_RECIPIENT_PATTERN = re.compile(r'\b(?:to|for)\s+([a-z]+(?:\s+[a-z]+)*)')
+# Trailing words a recipient name never ends with ("to john so far", "to john in total")
+_FILLER = re.compile(r'\s+(?:in|during|so|far|total|overall|altogether|until|now)\b.*$')
+
+
+class _Totals:
+    __slots__ = ('sent', 'received', 'count')
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.count = 0
+
+    def add(self, sent, received, count):
+        self.sent += sent
+        self.received += received
+        self.count += count
+
+
+class _AccountRollup:
+    """All-time, daily and monthly totals for one account, per counterparty"""
+
+    def __init__(self):
+        self.by_counterparty = {}
+        self.days = {}
+        self.months = {}
+
+    def add(self, day, month, counterparty, sent, received, count):
+        for buckets in (self.by_counterparty, self.days.setdefault(day, {}),
+                        self.months.setdefault(month, {})):
+            totals = buckets.get(counterparty)
+            if totals is None:
+                totals = buckets[counterparty] = _Totals()
+            totals.add(sent, received, count)
+
+
+class SpendingAnalytics:
+    """Precomputed rollups for spend-by-recipient and period questions.
+
+    Subscribes to the ledger and folds every appended row into per-account
+    totals by counterparty, kept all-time and per calendar day and month.
+    A period query adds whole-month buckets plus the day buckets at its
+    ragged edges, so "how much did I send to John this month" reads at
+    most a few dozen small dicts regardless of how many rows the ledger
+    holds. Amounts are exact minor units internally and Decimals out.
+    """
+
+    def __init__(self, ledger):
+        self._ledger = ledger
+        self._accounts = {}
+        self._lock = threading.Lock()
+        self._days = DayClock()
+        ledger.subscribe(self._on_rows, replay=True)
+
+    def sent_to(self, account_id, counterparty, period=None):
+        """Total sent from ``account_id`` to ``counterparty`` over ``period``"""
+        counterparty_id = self._ledger.name_id(counterparty)
+        # -1 is both "never seen" and the id of rows without a counterparty
+        if counterparty_id < 0:
+            return from_minor(0)
+        totals = self._collect(account_id, period).get(counterparty_id)
+        return from_minor(totals.sent if totals else 0)
+
+    def by_counterparty(self, account_id, period=None):
+        """``{counterparty: {'sent', 'received', 'count'}}`` over ``period``"""
+        name = self._ledger.name
+        return {
+            name(counterparty): {'sent': from_minor(totals.sent), 'received': from_minor(totals.received),
+                                 'count': totals.count}
+            for counterparty, totals in self._collect(account_id, period).items()
+        }
+
+    def top_recipients(self, account_id, k=5, period=None):
+        """The ``k`` counterparties ``account_id`` sent the most to, as ``(name, amount)``"""
+        collected = self._collect(account_id, period)
+        top = heapq.nlargest(k, ((totals.sent, counterparty) for counterparty, totals in collected.items()
+                                 if totals.sent > 0 and counterparty >= 0))
+        return [(self._ledger.name(counterparty), from_minor(sent)) for sent, counterparty in top]
+
+    def period_totals(self, account_id, bucket='month', periods=12):
+        """Sent/received/count for the last ``periods`` days or months, oldest first"""
+        rollup = self._rollup(account_id)
+        today = date.today()
+        if bucket == 'day':
+            keys = [(today - timedelta(days=n)).toordinal() for n in range(periods - 1, -1, -1)]
+            labels = [date.fromordinal(key).isoformat() for key in keys]
+            source = rollup.days if rollup else {}
+        elif bucket == 'month':
+            current = today.year * 12 + today.month - 1
+            keys = list(range(current - periods + 1, current + 1))
+            labels = [f"{key // 12:04d}-{key % 12 + 1:02d}" for key in keys]
+            source = rollup.months if rollup else {}
+        else:
+            raise ValueError(f"Unknown bucket: {bucket!r}")
+
+        result = []
+        with self._lock:
+            for key, label in zip(keys, labels):
+                totals = _Totals()
+                for counterparty_totals in source.get(key, {}).values():
+                    totals.add(counterparty_totals.sent, counterparty_totals.received, counterparty_totals.count)
+                result.append({'period': label, 'sent': from_minor(totals.sent),
+                               'received': from_minor(totals.received), 'count': totals.count})
+        return result
+
+    def _rollup(self, account_id):
+        account = self._ledger.name_id(account_id)
+        return self._accounts.get(account) if account >= 0 else None
+
+    def _collect(self, account_id, period):
+        """Counterparty id -> _Totals for ``period`` (None for all time)"""
+        rollup = self._rollup(account_id)
+        if rollup is None:
+            return {}
+        with self._lock:
+            if period is None:
+                return dict(rollup.by_counterparty)
+            first, end = PERIODS[period](date.today())
+            collected = {}
+            for buckets in self._buckets(rollup, first, end):
+                for counterparty, totals in buckets.items():
+                    merged = collected.get(counterparty)
+                    if merged is None:
+                        merged = collected[counterparty] = _Totals()
+                    merged.add(totals.sent, totals.received, totals.count)
+            return collected
+
+    def _buckets(self, rollup, first, end):
+        """Month buckets for whole months in [first, end), day buckets for the rest"""
+        day = first
+        while day < end:
+            month_end = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            if day.day == 1 and month_end <= end:
+                buckets = rollup.months.get(day.year * 12 + day.month - 1)
+                day = month_end
+            else:
+                buckets = rollup.days.get(day.toordinal())
+                day += timedelta(days=1)
+            if buckets:
+                yield buckets
+
+    def _on_rows(self, rows):
+        with self._lock:
+            ts = rows['ts']
+            start = 0
+            while start < len(rows):
+                day = self._days.at(int(ts[start]))
+                stop = start + int(np.searchsorted(ts[start:], self._days.end))
+                self._add_day(day, rows[start:stop])
+                start = stop
+
+    def _add_day(self, day, rows):
+        day_key = day.toordinal()
+        month_key = day.year * 12 + day.month - 1
+        if len(rows) <= 16:
+            for _, amount, _, account, counterparty, _, kind in rows.tolist():
+                if account >= 0:
+                    sent, received = (amount, 0) if kind == DEBIT else (0, amount)
+                    self._account(account).add(day_key, month_key, counterparty, sent, received, 1)
+            return
+
+        # Bulk: one exact int64 sum per (account, counterparty) pair of the day
+        rows = rows[rows['account'] >= 0]
+        if not len(rows):
+            return
+        keys = (rows['account'].astype(np.int64) << 32) | (rows['counterparty'].astype(np.int64) & 0xFFFFFFFF)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        debit = rows['type'][order] == DEBIT
+        amounts = rows['amount'][order]
+        starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+        sent = np.add.reduceat(np.where(debit, amounts, 0), starts)
+        received = np.add.reduceat(np.where(debit, 0, amounts), starts)
+        counts = np.diff(np.r_[starts, len(keys)])
+        for key, s, r, c in zip(keys[starts].tolist(), sent.tolist(), received.tolist(), counts.tolist()):
+            counterparty = key & 0xFFFFFFFF
+            self._account(key >> 32).add(day_key, month_key,
+                                         counterparty if counterparty != 0xFFFFFFFF else -1, s, r, c)
+
+    def _account(self, account):
+        rollup = self._accounts.get(account)
+        if rollup is None:
+            rollup = self._accounts[account] = _AccountRollup()
+        return rollup
+
+
+def parse_spending_query(text):
+    """Pull ``(period, recipient, top)`` out of a spoken spending question"""
+    text = text.lower()
+    match = PERIOD_PATTERN.search(text)
+    period = match.group(1) if match else None
+    if match:
+        text = text[:match.start()] + text[match.end():]
+    top = bool(re.search(r'\b(?:top|most|biggest)\b', text))
+    recipient = None
+    match = SPENDING_RECIPIENT_PATTERN.search(text)
+    if match:
+        recipient = _FILLER.sub('', match.group(1)).strip() or None
+    return period, recipient, top
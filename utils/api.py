@@ -0,0 +1,430 @@
+import asyncio
+import base64
+import json
+import queue
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from .audio import AudioClip
+from .intent_model import MicroBatcher
+from .metrics import REGISTRY
+from .sessions import SessionManager
+
+Request = namedtuple('Request', ['method', 'path', 'query', 'headers', 'body', 'keep_alive'])
+
+# Batch sizes are counts, not seconds
+BATCH_BUCKETS = tuple(2 ** k for k in range(10))
+MAX_HEAD = 16 * 1024
+
+
+class HTTPError(Exception):
+    """An error response: ``status`` and a message for the JSON body"""
+
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers
+
+
+class BankingAPI:
+    """Headless HTTP/JSON front end to TransactionProcessor and VoiceAuthenticator.
+
+    A plain asyncio HTTP/1.1 server: connections are kept alive (and
+    pipelined requests answered in order) until the client closes, asks
+    for ``Connection: close`` or sits idle for ``keepalive_timeout``.
+    Ledger and intent work runs on a pool of ``workers`` threads, voice
+    work on a separate pool of ``voice_workers`` so slow embeddings cannot
+    hold up balance reads, and PIN checks on the credential service's own
+    pool. Single
+    ``/v1/classify`` and ``/v1/command`` requests are batched into one
+    ``classify_many`` call per ``batch_delay`` window.
+
+    Load is shed rather than queued: past ``max_inflight`` requests a new
+    request gets 503 with ``Retry-After``, past ``max_connections`` a new
+    connection gets 503 and is closed, and a saturated credential pool
+    turns logins into 503 as well. Bodies over ``max_body`` get 413.
+
+    Endpoints (JSON unless noted; ``Authorization: Bearer <token>`` where
+    marked *):
+
+    - ``POST /v1/login`` ``{"account", "pin"}`` -> ``{"token"}``
+    - ``POST /v1/logout`` *
+    - ``POST /v1/classify`` ``{"text"}`` or ``{"texts": [...]}``
+    - ``POST /v1/command`` * ``{"text", "request_id"?}``: classify and execute
+    - ``POST /v1/transfer`` * ``{"command", "request_id"?}``
+    - ``GET /v1/balance`` *, ``GET /v1/history?count=10`` *
+    - ``POST /v1/voice/enroll`` * with a WAV body enrolls the token's
+      account; replacing an existing voiceprint also needs ``X-PIN``
+    - ``POST /v1/voice/verify?user=...`` with a WAV body and the account
+      PIN in ``X-PIN``: a matching voice and PIN get a token for that
+      account if it exists (accounts are never opened here). A failure
+      says only ``authenticated: false``, never the score, and after
+      ``voice_attempts`` failures in ``voice_lockout`` seconds a user gets
+      429 until the oldest failure ages out
+    - voice routes answer 404 unless the API was given a VoiceAuthenticator
+    - ``GET /metrics`` (Prometheus text), ``GET /healthz``
+
+    ``close`` stops accepting, drops idle connections and lets running
+    requests finish before the worker pools stop.
+
+    With ``record`` set to a file, every ``/v1/`` request except login and
+    logout is appended to it as a JSON line, the mix format the load
+    generator replays (``benchmarks/loadgen.py``).
+    """
+
+    def __init__(self, processor, voice=None, workers=4, voice_workers=2, max_inflight=256, max_connections=1024,
+                 max_body=4 * 1024 * 1024, keepalive_timeout=30, batch_size=64, batch_delay=0.002,
+                 record=None, voice_attempts=5, voice_lockout=300.0):
+        self.processor = processor
+        self.voice = voice
+        self.sessions = SessionManager(processor, idle_timeout=processor.credentials.token_ttl)
+        self.max_inflight = max_inflight
+        self.max_connections = max_connections
+        self.max_body = max_body
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.voice_executor = ThreadPoolExecutor(max_workers=voice_workers, thread_name_prefix="api-voice")
+        self.voice_attempts = voice_attempts
+        self.voice_lockout = voice_lockout
+        # user_id -> monotonic times of recent failed verifications (touched on the loop thread only)
+        self._voice_failures = {}
+        batch_sizes = REGISTRY.histogram('api_batch_size', "Items per batched call",
+                                         buckets=BATCH_BUCKETS, batch='classify')
+
+        def classify_batch(texts):
+            batch_sizes.observe(len(texts))
+            return processor.classify_many(texts)
+
+        self.classifier = MicroBatcher(classify_batch, batch_size, batch_delay)
+        self.routes = {
+            ('POST', '/v1/login'): self._login,
+            ('POST', '/v1/logout'): self._logout,
+            ('POST', '/v1/classify'): self._classify,
+            ('POST', '/v1/command'): self._command,
+            ('POST', '/v1/transfer'): self._transfer,
+            ('GET', '/v1/balance'): self._balance,
+            ('GET', '/v1/history'): self._history,
+            ('POST', '/v1/voice/enroll'): self._enroll,
+            ('POST', '/v1/voice/verify'): self._verify_voice,
+            ('GET', '/metrics'): self._metrics,
+            ('GET', '/healthz'): self._health,
+        }
+        self._record = open(record, 'a') if record else None
+        self._inflight = 0
+        self._connections = 0
+        self._server = None
+        self._closing = False
+        self._idle = set()
+        self._latency = {path: REGISTRY.histogram('api_request_seconds', "HTTP request handling time",
+                                                  route=path)
+                         for _, path in self.routes}
+        self._inflight_gauge = REGISTRY.gauge('api_inflight_requests', "Requests being handled")
+        self._connections_gauge = REGISTRY.gauge('api_open_connections', "Open client connections")
+        self._shed = {reason: REGISTRY.counter('api_shed_total', "Requests and connections refused under load",
+                                               reason=reason)
+                      for reason in ('requests', 'connections', 'credentials')}
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Listen on ``host:port`` (0 picks a free port); returns the bound ``(host, port)``"""
+        self._server = await asyncio.start_server(self._serve, host, port, limit=MAX_HEAD,
+                                                  backlog=self.max_connections)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting, let running requests finish, then stop the workers"""
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        # Idle keep-alive connections are dropped now, busy ones after their response
+        for writer in list(self._idle):
+            writer.close()
+        while self._inflight or self._connections:
+            await asyncio.sleep(0.01)
+        self.executor.shutdown(wait=True)
+        self.voice_executor.shutdown(wait=True)
+        if self._record is not None:
+            self._record.close()
+
+    async def _serve(self, reader, writer):
+        if self._connections >= self.max_connections:
+            self._shed['connections'].inc()
+            writer.write(_response(503, {'error': "Too many connections"}, False, (('Retry-After', '1'),)))
+            await _close(writer)
+            return
+        self._connections += 1
+        self._connections_gauge.set(self._connections)
+        try:
+            while not self._closing:
+                self._idle.add(writer)
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(431, {'error': "Request head too large"}, False))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                finally:
+                    self._idle.discard(writer)
+                try:
+                    request = await self._read_request(head, reader)
+                except HTTPError as e:
+                    writer.write(_response(e.status, {'error': str(e)}, False))
+                    break
+                status, payload, headers = await self._handle(request)
+                keep_alive = request.keep_alive and not self._closing
+                writer.write(_response(status, payload, keep_alive, headers))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections -= 1
+            self._connections_gauge.set(self._connections)
+            await _close(writer)
+
+    async def _read_request(self, head, reader):
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ')
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "Malformed request")
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, "Send a Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, f"Body over {self.max_body} bytes")
+        body = await reader.readexactly(length) if length else b''
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        path, _, query = target.partition('?')
+        return Request(method, path, dict(parse_qsl(query)), headers, body, keep_alive)
+
+    async def _handle(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            return 404, {'error': f"No route for {request.method} {request.path}"}, ()
+        if self._inflight >= self.max_inflight:
+            self._shed['requests'].inc()
+            return 503, {'error': "Server is busy"}, (('Retry-After', '1'),)
+        self._inflight += 1
+        self._inflight_gauge.set(self._inflight)
+        start = time.perf_counter()
+        try:
+            if self._record is not None and request.path.startswith('/v1/') \
+                    and request.path not in ('/v1/login', '/v1/logout'):
+                self._record_request(request)
+            return (200, await handler(request), ())
+        except HTTPError as e:
+            return e.status, {'error': str(e)}, e.headers
+        except queue.Full as e:
+            self._shed['credentials'].inc()
+            return 503, {'error': str(e)}, (('Retry-After', '1'),)
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}, ()
+        finally:
+            self._inflight -= 1
+            self._inflight_gauge.set(self._inflight)
+            self._latency[request.path].observe(time.perf_counter() - start)
+
+    def _record_request(self, request):
+        entry = {'method': request.method, 'path': request.path, 'query': request.query}
+        if request.body and request.headers.get('content-type', '').startswith('application/json'):
+            try:
+                entry['json'] = json.loads(request.body)
+            except ValueError:
+                raise HTTPError(400, "Body is not valid JSON")
+        elif request.body:
+            entry['body_b64'] = base64.b64encode(request.body).decode()
+            entry['content_type'] = request.headers.get('content-type', 'application/octet-stream')
+        self._record.write(json.dumps(entry) + '\n')
+
+    def _run(self, fn, *args, executor=None):
+        return asyncio.get_running_loop().run_in_executor(executor or self.executor, fn, *args)
+
+    def _session(self, request):
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            raise HTTPError(401, "Missing bearer token")
+        session = self.sessions.get(token)
+        if not session.resume(token):
+            self.sessions.release(token)
+            raise HTTPError(401, "Token is expired or revoked")
+        return session
+
+    async def _login(self, request):
+        body = _json(request)
+        account, pin = _field(body, 'account'), _field(body, 'pin')
+        credentials = self.processor.credentials
+        # Never wait for a credential slot: a full pool is a 503, not a stalled loop
+        if not await asyncio.wrap_future(credentials.verify(account, str(pin), timeout=0)):
+            raise HTTPError(401, "Wrong account or PIN")
+        token = credentials.issue_token(account)
+        self.sessions.get(token).resume(token)
+        return {'token': token, 'account': account, 'expires_in': credentials.token_ttl}
+
+    async def _logout(self, request):
+        session = self._session(request)
+        token = session.token
+        session.logout()
+        self.sessions.release(token)
+        return {'logged_out': True}
+
+    async def _classify(self, request):
+        body = _json(request)
+        if 'texts' in body:
+            texts = body['texts']
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise HTTPError(400, "'texts' must be a list of strings")
+            scored = await self._run(self.processor.classify_many, texts)
+            return {'results': [{'intent': intent, 'confidence': confidence} for intent, confidence in scored]}
+        intent, confidence = await asyncio.wrap_future(self.classifier.submit(_field(body, 'text')))
+        return {'intent': intent, 'confidence': confidence}
+
+    async def _command(self, request):
+        session = self._session(request)
+        body = _json(request)
+        text = _field(body, 'text')
+        intent, _ = await asyncio.wrap_future(self.classifier.submit(text))
+        response = await self._run(session.execute, intent, text, body.get('request_id'))
+        return {'intent': intent, 'response': response}
+
+    async def _transfer(self, request):
+        session = self._session(request)
+        body = _json(request)
+        response = await self._run(session.execute, 'transfer', _field(body, 'command'),
+                                   body.get('request_id'))
+        return {'response': response}
+
+    async def _balance(self, request):
+        session = self._session(request)
+        return {'account': session.account_id, 'balance': await self._run(session.get_balance)}
+
+    async def _history(self, request):
+        session = self._session(request)
+        try:
+            count = min(int(request.query.get('count', 10)), 1000)
+        except ValueError:
+            raise HTTPError(400, "'count' must be an integer")
+        return {'transactions': await self._run(session.recent_transactions, count)}
+
+    async def _enroll(self, request):
+        session = self._session(request)
+        user_id, clip = self._voice_request(request, session.account_id)
+        if user_id in self.voice.voice_profiles:
+            # Replacing a voiceprint needs the PIN again, not just a token
+            pin = request.headers.get('x-pin')
+            if not pin:
+                raise HTTPError(409, "Voice already enrolled; send the PIN in X-PIN to replace it")
+            if not await asyncio.wrap_future(self.processor.credentials.verify(user_id, str(pin), timeout=0)):
+                raise HTTPError(401, "Wrong PIN")
+        return {'user': user_id, 'enrolled': await self._run(self.voice.enroll_user, user_id, clip,
+                                                                   executor=self.voice_executor)}
+
+    async def _verify_voice(self, request):
+        user_id, clip = self._voice_request(request)
+        pin = request.headers.get('x-pin')
+        if not pin:
+            raise HTTPError(401, "Voice login needs the account PIN in X-PIN")
+        failures = self._voice_failures.get(user_id)
+        now = time.monotonic()
+        while failures and failures[0] <= now - self.voice_lockout:
+            failures.popleft()
+        if failures is not None and not failures:
+            del self._voice_failures[user_id]
+        elif failures is not None and len(failures) >= self.voice_attempts:
+            retry = int(failures[0] + self.voice_lockout - now) + 1
+            raise HTTPError(429, "Too many failed voice logins", (('Retry-After', str(retry)),))
+
+        authenticated, similarity = await self._run(self.voice.authenticate_user, user_id, clip,
+                                                    executor=self.voice_executor)
+        # The PIN is checked either way, so a reply never says which factor failed
+        pin_ok = await asyncio.wrap_future(self.processor.credentials.verify(user_id, str(pin), timeout=0))
+        if not (authenticated and pin_ok and self.processor.accounts.has_account(user_id)):
+            self._voice_failures.setdefault(user_id, deque()).append(time.monotonic())
+            return {'user': user_id, 'authenticated': False}
+        self._voice_failures.pop(user_id, None)
+        token = self.processor.credentials.issue_token(user_id)
+        self.sessions.get(token).resume(token)
+        return {'user': user_id, 'authenticated': True, 'similarity': float(similarity), 'token': token}
+
+    def _voice_request(self, request, account_id=None):
+        if self.voice is None:
+            raise HTTPError(404, "Voice authentication is not enabled")
+        user_id = request.query.get('user', account_id)
+        if not user_id:
+            raise HTTPError(400, "Missing 'user' query parameter")
+        if account_id is not None and user_id != account_id:
+            raise HTTPError(403, "A token can only enroll its own account")
+        try:
+            return user_id, AudioClip.from_wav(request.body)
+        except Exception:
+            raise HTTPError(400, "Body is not a WAV file")
+
+    async def _metrics(self, request):
+        return _Text(REGISTRY.to_prometheus(), 'text/plain; version=0.0.4')
+
+    async def _health(self, request):
+        return {'ok': True, 'inflight': self._inflight, 'connections': self._connections}
+
+
+class _Text(str):
+    """A non-JSON response body"""
+
+    def __new__(cls, text, content_type):
+        self = super().__new__(cls, text)
+        self.content_type = content_type
+        return self
+
+
+def _json(request):
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        raise HTTPError(400, "Body is not valid JSON")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    return body
+
+
+def _field(body, name):
+    value = body.get(name)
+    if value is None or value == '':
+        raise HTTPError(400, f"Missing {name!r}")
+    return value
+
+
+def _response(status, payload, keep_alive, headers=()):
+    if isinstance(payload, _Text):
+        body, content_type = payload.encode(), payload.content_type
+    else:
+        body = json.dumps(payload, default=str, ensure_ascii=False).encode()
+        content_type = 'application/json; charset=utf-8'
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def _close(writer):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
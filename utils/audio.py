@@ -0,0 +1,106 @@
+import hashlib
+import io
+import wave
+
+import numpy as np
+
+
+class AudioClip:
+    """Captured PCM audio held in memory.
+
+    ``data`` is the raw little-endian PCM bytes exactly as the microphone
+    produced them. ``samples`` and ``to_audio_data`` wrap that same buffer
+    without copying, so one capture can go through speech-to-text, embedding
+    extraction and optional archival with no temp file. A WAV file is only
+    written when ``save`` is called.
+    """
+
+    __slots__ = ('data', 'sample_rate', 'sample_width', 'channels', '_digest')
+
+    def __init__(self, data, sample_rate, sample_width=2, channels=1):
+        self.data = bytes(data) if not isinstance(data, bytes) else data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self._digest = None
+
+    @classmethod
+    def from_audio_data(cls, audio):
+        """Wrap a ``speech_recognition.AudioData`` capture"""
+        return cls(audio.frame_data, audio.sample_rate, audio.sample_width)
+
+    @classmethod
+    def from_wav(cls, source):
+        """Load from a WAV path, bytes or file object"""
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        with wave.open(source, 'rb') as wav:
+            return cls(wav.readframes(wav.getnframes()), wav.getframerate(),
+                       wav.getsampwidth(), wav.getnchannels())
+
+    @classmethod
+    def from_samples(cls, samples, sample_rate):
+        """Build a 16-bit mono clip from float samples in [-1, 1] or int16 samples"""
+        samples = np.asarray(samples)
+        if samples.dtype != np.int16:
+            samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        return cls(samples.astype('<i2', copy=False).tobytes(), sample_rate)
+
+    def __len__(self):
+        return len(self.data) // (self.sample_width * self.channels)
+
+    @property
+    def duration(self):
+        return len(self) / self.sample_rate
+
+    @property
+    def digest(self):
+        """SHA-256 of the PCM data and format, used as a cache key"""
+        if self._digest is None:
+            h = hashlib.sha256(self.data)
+            h.update(f"{self.sample_rate}:{self.sample_width}:{self.channels}".encode())
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def samples(self):
+        """Read-only int16 view of the buffer (mono clips), no copy"""
+        if self.sample_width != 2:
+            raise ValueError("samples() needs 16-bit PCM")
+        samples = np.frombuffer(self.data, dtype='<i2')
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels)
+        return samples
+
+    def to_float32(self, sample_rate=None):
+        """Mono float32 samples in [-1, 1], linearly resampled if ``sample_rate`` differs"""
+        samples = self.samples()
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        samples = samples.astype(np.float32) / 32768.0
+        if sample_rate is None or sample_rate == self.sample_rate or not len(samples):
+            return samples
+        count = int(round(len(samples) * sample_rate / self.sample_rate))
+        positions = np.arange(count, dtype=np.float64) * (self.sample_rate / sample_rate)
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+    def to_audio_data(self):
+        """``speech_recognition.AudioData`` sharing this clip's buffer"""
+        import speech_recognition as sr
+        return sr.AudioData(self.data, self.sample_rate, self.sample_width)
+
+    def wav_bytes(self):
+        buffer = io.BytesIO()
+        self._write_wav(buffer)
+        return buffer.getvalue()
+
+    def save(self, path):
+        """Archive the clip as a WAV file"""
+        self._write_wav(path)
+        return path
+
+    def _write_wav(self, target):
+        with wave.open(target, 'wb') as wav:
+            wav.setnchannels(self.channels)
+            wav.setsampwidth(self.sample_width)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(self.data)
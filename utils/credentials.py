@@ -0,0 +1,213 @@
+import base64
+import hashlib
+import hmac
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import REGISTRY
+
+# scrypt cost: 2**15 x 8 x 128 bytes = 32 MiB and roughly 80 ms per hash
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+TOKEN_TTL = 900
+
+
+def hash_pin(pin, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, salt=None):
+    """Salted scrypt record for ``pin``: ``scrypt$n$r$p$salt$key`` (base64 fields)"""
+    salt = os.urandom(SALT_BYTES) if salt is None else salt
+    key = _scrypt(pin, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(key)}"
+
+
+def verify_pin(pin, record):
+    """Check ``pin`` against a ``hash_pin`` record; the final comparison is constant-time"""
+    try:
+        scheme, n, r, p, salt, key = record.split('$')
+        n, r, p = int(n), int(r), int(p)
+        salt, key = _unb64(salt), _unb64(key)
+    except ValueError:
+        return False
+    if scheme != 'scrypt':
+        return False
+    return hmac.compare_digest(_scrypt(pin, salt, n, r, p), key)
+
+
+def record_params(record):
+    """``(n, r, p)`` a record was hashed with"""
+    _, n, r, p, _, _ = record.split('$')
+    return int(n), int(r), int(p)
+
+
+def _scrypt(pin, salt, n, r, p):
+    # hashlib.scrypt releases the GIL, so pool threads hash in parallel
+    with _KDF_SECONDS.time():
+        return hashlib.scrypt(str(pin).encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=2 * 128 * r * n + 2 ** 20, dklen=KEY_BYTES)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+_KDF_SECONDS = REGISTRY.histogram('pin_kdf_seconds', "Time per PIN key derivation")
+
+
+class CredentialService:
+    """PIN credentials with a memory-hard KDF, verified off the caller's thread.
+
+    Each account's PIN is stored as a salted scrypt record; salts are
+    random per account and per PIN change. Hashing and verification run in
+    a pool of ``workers`` threads (scrypt releases the GIL), so a login
+    costs the UI thread a wait on a future rather than CPU time, and at
+    most ``workers`` hashes, each using ``128 * r * n`` bytes, run at once.
+    At most ``max_pending`` are queued or running; past that ``verify``
+    blocks up to ``timeout`` seconds and then raises ``queue.Full``.
+    Unknown accounts are checked against a dummy record so they take as
+    long as a wrong PIN. Records hashed with other KDF parameters are
+    rehashed on the next successful login.
+
+    A successful login issues a session token: an HMAC-signed account id
+    and expiry, valid for ``token_ttl`` seconds. ``check_token`` costs
+    microseconds, so reruns and later requests present the token instead
+    of verifying the PIN again. Live tokens are kept per account so a PIN
+    change or logout can revoke them.
+    """
+
+    def __init__(self, workers=2, max_pending=32, token_ttl=TOKEN_TTL, secret=None,
+                 n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+        self.params = (n, r, p)
+        self.token_ttl = token_ttl
+        self._secret = secret or secrets.token_bytes(32)
+        self._records = {}
+        self._tokens = {}
+        self._dummy = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kdf")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._verifications = {
+            result: REGISTRY.counter('pin_verifications_total', "PIN checks by outcome", result=result)
+            for result in ('accepted', 'rejected', 'unknown_account')
+        }
+
+    def __contains__(self, account_id):
+        return account_id in self._records
+
+    def hash_pin(self, pin):
+        return hash_pin(pin, *self.params)
+
+    def set_pin(self, account_id, pin, timeout=None):
+        """Store a new record for ``account_id``, hashed in the pool"""
+        record = self._submit(self.hash_pin, pin, timeout=timeout).result()
+        with self._lock:
+            self._records[account_id] = record
+
+    def verify(self, account_id, pin, timeout=None):
+        """Queue a PIN check; returns a Future resolving to True or False"""
+        return self._submit(self._verify, account_id, pin, timeout=timeout)
+
+    def check(self, account_id, pin, timeout=None):
+        """Blocking ``verify``"""
+        return self.verify(account_id, pin, timeout).result()
+
+    def change_pin(self, account_id, old_pin, new_pin, timeout=None):
+        """Replace the PIN if ``old_pin`` is right; revokes the account's tokens"""
+        changed = self._submit(self._change, account_id, old_pin, new_pin, timeout=timeout).result()
+        if changed:
+            self.revoke(account_id)
+        return changed
+
+    def login(self, account_id, pin, timeout=None):
+        """Verify a PIN and issue a session token; None if the PIN is wrong"""
+        if not self.check(account_id, pin, timeout):
+            return None
+        return self.issue_token(account_id)
+
+    def issue_token(self, account_id):
+        expires = int(time.time()) + self.token_ttl
+        payload = f"{_b64(account_id.encode())}.{expires}.{secrets.token_urlsafe(8)}"
+        token = f"{payload}.{self._sign(payload)}"
+        with self._lock:
+            self._tokens.setdefault(account_id, set()).add(token)
+        return token
+
+    def check_token(self, token):
+        """The account a live token was issued for, or None"""
+        try:
+            payload, signature = token.rsplit('.', 1)
+            account, expires, _ = payload.split('.')
+            account_id = _unb64(account).decode()
+            expires = int(expires)
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(self._sign(payload), signature):
+            return None
+        if expires < time.time():
+            self.revoke(token=token, account_id=account_id)
+            return None
+        with self._lock:
+            if token not in self._tokens.get(account_id, ()):
+                return None
+        return account_id
+
+    def revoke(self, account_id, token=None):
+        """Revoke one token, or every token of ``account_id``"""
+        with self._lock:
+            if token is None:
+                self._tokens.pop(account_id, None)
+            else:
+                self._tokens.get(account_id, set()).discard(token)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _submit(self, fn, *args, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise queue.Full("Credential pool is saturated")
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda done: self._slots.release())
+        return future
+
+    def _verify(self, account_id, pin):
+        record = self._records.get(account_id)
+        if record is None:
+            # Spend the same time as a real check so unknown accounts don't stand out
+            verify_pin(pin, self._dummy_record())
+            self._verifications['unknown_account'].inc()
+            return False
+        if not verify_pin(pin, record):
+            self._verifications['rejected'].inc()
+            return False
+        self._verifications['accepted'].inc()
+        if record_params(record) != self.params:
+            rehashed = self.hash_pin(pin)
+            with self._lock:
+                if self._records.get(account_id) == record:
+                    self._records[account_id] = rehashed
+        return True
+
+    def _change(self, account_id, old_pin, new_pin):
+        if not self._verify(account_id, old_pin):
+            return False
+        record = self.hash_pin(new_pin)
+        with self._lock:
+            self._records[account_id] = record
+        return True
+
+    def _dummy_record(self):
+        if self._dummy is None:
+            self._dummy = self.hash_pin(secrets.token_hex(8))
+        return self._dummy
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self._secret, payload.encode(), hashlib.sha256).digest()[:16])
@@ -0,0 +1,211 @@
+import threading
+
+import numpy as np
+
+from .ledger import DEBIT, DayClock
+from .money import MINOR_UNITS
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns selected indices"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        px, py = x[previous], y[previous]
+        area = np.abs((px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x, y, threshold):
+    """Keep the min and max point of each bucket; returns selected indices"""
+    n = len(x)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+    buckets = threshold // 2
+    usable = n - n % buckets
+    blocks = y[:usable].reshape(buckets, -1)
+    offsets = np.arange(buckets) * blocks.shape[1]
+    picks = np.concatenate([offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)])
+    if usable < n:
+        picks = np.append(picks, n - 1)
+    return np.unique(picks)
+
+
+class _AccountColumns:
+    """Growable typed columns plus O(1) aggregates for one account"""
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.ts = np.empty(capacity, dtype=np.int64)
+        self.amount = np.empty(capacity, dtype=np.int64)
+        self.balance = np.empty(capacity, dtype=np.int64)
+        self.daily = {}
+        self.total_debit = 0
+        self.total_credit = 0
+        self._days = DayClock()
+
+    def append(self, ts, amount, balance, is_debit):
+        """Append one ledger row (minor units)"""
+        if self.size == len(self.ts):
+            self._grow(self.size + 1)
+        i = self.size
+        self.ts[i] = ts
+        self.amount[i] = -amount if is_debit else amount
+        self.balance[i] = balance
+        self.size += 1
+
+        totals = self._totals_for(ts)
+        if is_debit:
+            totals['debit'] += amount
+            self.total_debit += amount
+        else:
+            totals['credit'] += amount
+            self.total_credit += amount
+        totals['count'] += 1
+        totals['closing_balance'] = balance
+
+    def extend(self, rows):
+        """Append a block of ledger rows (minor units, sorted timestamps)"""
+        n = len(rows)
+        end = self.size + n
+        if end > len(self.ts):
+            self._grow(end)
+        ts = rows['ts']
+        is_debit = rows['type'] == DEBIT
+        self.ts[self.size:end] = ts
+        self.amount[self.size:end] = np.where(is_debit, -rows['amount'], rows['amount'])
+        self.balance[self.size:end] = rows['balance']
+        self.size = end
+
+        # Ledger timestamps are non-decreasing, so each day is one contiguous run
+        debits = np.where(is_debit, rows['amount'], 0)
+        credits = rows['amount'] - debits
+        start = 0
+        while start < n:
+            totals = self._totals_for(int(ts[start]))
+            stop = start + int(np.searchsorted(ts[start:], self._days.end))
+            debit = int(debits[start:stop].sum())
+            credit = int(credits[start:stop].sum())
+            totals['debit'] += debit
+            totals['credit'] += credit
+            totals['count'] += stop - start
+            totals['closing_balance'] = int(rows['balance'][stop - 1])
+            self.total_debit += debit
+            self.total_credit += credit
+            start = stop
+
+    def _totals_for(self, ts):
+        """Daily totals dict for the day containing ``ts``, cached until midnight"""
+        self._days.at(ts)
+        label = self._days.label
+        totals = self.daily.get(label)
+        if totals is None:
+            totals = self.daily[label] = {'debit': 0, 'credit': 0, 'count': 0, 'closing_balance': 0}
+        return totals
+
+    def _grow(self, needed):
+        capacity = max(2 * len(self.ts), needed)
+        for name in ('ts', 'amount', 'balance'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+
+class DashboardView:
+    """Incrementally maintained columnar view of the ledger for the dashboard.
+
+    Each account gets typed timestamp, signed amount and balance columns,
+    appended as the ledger reports new rows. Daily totals and the latest
+    balance are updated per appended block, and charts are downsampled to
+    a fixed point budget, so a rerun costs the same whether the account has
+    ten transactions or ten million. Amounts are kept in exact minor units
+    and converted to float rupees only for charting.
+    """
+
+    def __init__(self, ledger):
+        self._ledger = ledger
+        self._accounts = {}
+        self._lock = threading.Lock()
+        ledger.subscribe(self._on_rows, replay=True)
+
+    def count(self, account_id):
+        columns = self._columns(account_id)
+        return columns.size if columns else 0
+
+    def daily_totals(self, account_id, days=None):
+        """``{day: {'debit', 'credit', 'count', 'closing_balance'}}`` in rupees, newest last"""
+        columns = self._columns(account_id)
+        if columns is None:
+            return {}
+        with self._lock:
+            items = list(columns.daily.items())
+        items = items[-days:] if days else items
+        return {
+            day: {'debit': totals['debit'] / MINOR_UNITS, 'credit': totals['credit'] / MINOR_UNITS,
+                  'count': totals['count'], 'closing_balance': totals['closing_balance'] / MINOR_UNITS}
+            for day, totals in items
+        }
+
+    def totals(self, account_id):
+        columns = self._columns(account_id)
+        if columns is None:
+            return {'debit': 0.0, 'credit': 0.0, 'count': 0}
+        return {'debit': columns.total_debit / MINOR_UNITS, 'credit': columns.total_credit / MINOR_UNITS,
+                'count': columns.size}
+
+    def balance_series(self, account_id, points=500, method='lttb'):
+        """Downsampled ``(timestamps, balances)`` arrays for charting, balances in rupees"""
+        columns = self._columns(account_id)
+        if columns is None or not columns.size:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        with self._lock:
+            ts = columns.ts[:columns.size]
+            balance = columns.balance[:columns.size] / MINOR_UNITS
+            pick = lttb if method == 'lttb' else minmax
+            selected = pick(ts.astype(np.float64), balance, points)
+            return ts[selected].copy(), balance[selected]
+
+    def _columns(self, account_id):
+        account = self._ledger.name_id(account_id)
+        return self._accounts.get(account) if account >= 0 else None
+
+    def _on_rows(self, rows):
+        with self._lock:
+            if len(rows) <= 16:
+                for ts, amount, balance, account, _, _, kind in rows.tolist():
+                    if account >= 0:
+                        self._account_columns(account).append(ts, amount, balance, kind == DEBIT)
+                return
+            accounts = rows['account']
+            if (accounts == accounts[0]).all():
+                groups = [(int(accounts[0]), rows)]
+            else:
+                order = np.argsort(accounts, kind='stable')
+                sorted_accounts = accounts[order]
+                bounds = np.flatnonzero(np.diff(sorted_accounts)) + 1
+                groups = zip(sorted_accounts[np.r_[0, bounds]].tolist(),
+                             (rows[group] for group in np.split(order, bounds)))
+            for account, block in groups:
+                if account >= 0:
+                    self._account_columns(account).extend(block)
+
+    def _account_columns(self, account):
+        columns = self._accounts.get(account)
+        if columns is None:
+            columns = self._accounts[account] = _AccountColumns()
+        return columns
@@ -0,0 +1,253 @@
+import re
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+# What a transcript says: amount as a Decimal, currency code, lowercased
+# recipient and every spoken number as a digit string (for PINs)
+Entities = namedtuple('Entities', ['amount', 'currency', 'recipient', 'digits'])
+NO_ENTITIES = Entities(None, None, None, '')
+
+UNITS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4,
+    'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+}
+UNIT_DIGITS = {word: str(value) for word, value in UNITS.items()}
+TEENS = {
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
+    'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+}
+TENS = {
+    'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50,
+    'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90,
+}
+SCALES = {'thousand': 1000, 'lakh': 100000, 'lakhs': 100000, 'million': 1000000, 'crore': 10000000}
+CURRENCIES = {
+    'rupees': 'INR', 'rupee': 'INR', 'rs': 'INR', 'inr': 'INR', '₹': 'INR',
+    'dollars': 'USD', 'dollar': 'USD', 'usd': 'USD', '$': 'USD',
+}
+# Words that end a recipient name: "to john please", "to mary for dinner"
+STOPWORDS = frozenset({
+    'please', 'now', 'today', 'tomorrow', 'tonight', 'immediately', 'asap', 'right', 'away',
+    'quickly', 'urgently', 'thanks', 'thank', 'you', 'from', 'via', 'using', 'with', 'on',
+    'at', 'by', 'in', 'of', 'this', 'that', 'account', 'money', 'a', 'an', 'my',
+})
+
+# Word kinds for the walk
+_NUMBER, _NUMERAL, _JOINER, _CURRENCY, _TO, _FOR, _THE, _STOP = range(8)
+_KINDS = dict.fromkeys(STOPWORDS, _STOP)
+_KINDS.update(dict.fromkeys(CURRENCIES, _CURRENCY))
+_KINDS.update(dict.fromkeys(UNITS, _NUMBER))
+_KINDS.update(dict.fromkeys(TEENS, _NUMBER))
+_KINDS.update(dict.fromkeys(TENS, _NUMBER))
+_KINDS.update(dict.fromkeys(SCALES, _NUMBER))
+_KINDS.update({'hundred': _NUMBER, 'and': _JOINER, 'point': _JOINER, 'to': _TO, 'for': _FOR, 'the': _THE})
+
+# Word -> (kind, value) inside a spoken number
+_NUMBER_WORDS = {}
+_NUMBER_WORDS.update((word, ('unit', value)) for word, value in UNITS.items())
+_NUMBER_WORDS.update((word, ('teen', value)) for word, value in TEENS.items())
+_NUMBER_WORDS.update((word, ('tens', value)) for word, value in TENS.items())
+_NUMBER_WORDS.update((word, ('scale', value)) for word, value in SCALES.items())
+_NUMBER_WORDS['hundred'] = ('hundred', 100)
+_NUMBER_WORDS['and'] = ('and', 0)
+_NUMBER_WORDS['point'] = ('point', 0)
+
+# Stripped from the ends of words: "john," "four."
+_PUNCTUATION = '.,!?;:"\'()'
+# A written number: digits with optional 1,500 / 1,50,000 grouping and decimals.
+# ASCII digits only: str.isdigit() and \d also accept "²" or "٣", which Decimal rejects
+NUMERAL_PATTERN = re.compile(r'\d+(?:,\d{2,3})*(?:\.\d+)?', re.ASCII)
+DIGITS = frozenset('0123456789')
+
+
+class EntityParser:
+    """Single-pass extractor of transfer and PIN entities from a transcript.
+
+    Each lowercased transcript is split into words once and walked left
+    to right with one dict lookup per word. The same pass reads the first
+    amount (digits such as ``1,500.50`` or spoken compounds such as "five
+    hundred and twenty", "two lakh", "ten point five"), the first currency
+    word or symbol, the name after "to" (or "for" when there is no "to")
+    up to a filler like "please", and every number as digits for PIN
+    entry ("one two three four" -> ``'1234'``, "twenty five" -> ``'25'``).
+
+    Results are cached per parser by transcript, since speech-to-text
+    output for a voice-banking vocabulary repeats; ``parse_many`` maps a
+    batch through the same cache, so repeats within and across batches
+    are parsed once.
+    """
+
+    def __init__(self, cache_size=16384):
+        # parse(text) -> Entities, behind this parser's own cache
+        self.parse = lru_cache(maxsize=cache_size)(_parse)
+
+    def parse_many(self, texts):
+        """Parse a batch of transcripts, in order"""
+        return list(map(self.parse, texts))
+
+    def cache_info(self):
+        return self.parse.cache_info()
+
+
+def _parse(text):
+    amount = currency = recipient = for_recipient = None
+    digits = []
+    run = []          # a number being read: an optional numeral, then number words
+    name = None       # words of the recipient being read
+    name_kind = None  # _TO or _FOR while a name is being read
+    kinds = _KINDS
+    text = text.lower()
+    if '-' in text:
+        text = text.replace('-', ' ')
+    for word in text.split():
+        kind = kinds.get(word)
+        if kind is None and not word.isalpha():
+            word = word.strip(_PUNCTUATION)
+            kind = kinds.get(word)
+            if kind is None and word and not word.isalpha():
+                first = word[0]
+                if first == '₹' or first == '$':
+                    if currency is None:
+                        currency = CURRENCIES[first]
+                    word = word[1:]
+                    first = word[:1]
+                if first in DIGITS:
+                    if not (word.isascii() and word.isdigit()):
+                        word = NUMERAL_PATTERN.match(word).group().replace(',', '')
+                    kind = _NUMERAL
+                elif not word:
+                    continue
+        if kind is None:
+            if run:
+                amount = _read_run(run, digits, amount)
+                run = []
+            if name_kind is not None and word:
+                name.append(word)
+            continue
+        # Anything but a plain word ends the name being read; "the" may open it
+        if name_kind is not None:
+            if kind == _THE and not name:
+                continue
+            if name:
+                if name_kind == _TO:
+                    recipient = ' '.join(name)
+                else:
+                    for_recipient = ' '.join(name)
+            name_kind = None
+        if kind == _NUMERAL:
+            # A numeral starts a new number; scale words may follow ("5 lakh")
+            if run:
+                amount = _read_run(run, digits, amount)
+            run = [word]
+            continue
+        if kind == _NUMBER or (kind == _JOINER and run):
+            run.append(word)
+            continue
+        if run:
+            amount = _read_run(run, digits, amount)
+            run = []
+        if kind == _TO:
+            if recipient is None:
+                name_kind, name = _TO, []
+        elif kind == _FOR:
+            if for_recipient is None:
+                name_kind, name = _FOR, []
+        elif kind == _CURRENCY and currency is None:
+            currency = CURRENCIES[word]
+    if run:
+        amount = _read_run(run, digits, amount)
+    if name:
+        if name_kind == _TO:
+            recipient = ' '.join(name)
+        elif name_kind == _FOR:
+            for_recipient = ' '.join(name)
+    if amount is None and currency is None and recipient is None and for_recipient is None:
+        return NO_ENTITIES
+    return Entities(amount, currency, recipient or for_recipient, ''.join(digits))
+
+
+def _read_run(run, digits, amount):
+    """Add the number(s) in ``run`` to ``digits``; the amount, set from them if still None"""
+    if len(run) == 1 and run[0][0] in DIGITS:
+        value = run[0]
+        digits.append(value.replace('.', ''))
+        return Decimal(value) if amount is None else amount
+    if all(word in UNIT_DIGITS for word in run):
+        # Digit by digit, as PINs are read out
+        value = ''.join([UNIT_DIGITS[word] for word in run])
+        digits.append(value)
+        return Decimal(value) if amount is None else amount
+    while run[-1] in ('and', 'point'):
+        run.pop()
+    values = _spoken_number(run)
+    value = ''.join(map(str, values))
+    digits.append(value.replace('.', ''))
+    if amount is None:
+        amount = Decimal(str(values[0]) if len(values) == 1 else value)
+    return amount
+
+
+def _spoken_number(words):
+    """Values of a number run, usually one: "two thousand five hundred and twenty" -> [2520]
+
+    The run is number words, optionally after a numeral ("1.5 lakh"). It
+    holds several numbers when it cannot be one, as in digit by digit
+    "one two three" or "nineteen ninety".
+    """
+    values = []
+    total = 0
+    small = None       # value below the last scale word, None before any number
+    last = None        # kind of the previous word
+    fraction = None    # decimal digits after "point"
+    for word in words:
+        if word[0] in DIGITS:
+            small, last = Decimal(word), 'numeral'
+            continue
+        kind, value = _NUMBER_WORDS[word]
+        if fraction is not None:
+            if kind == 'unit':
+                fraction.append(str(value))
+                continue
+            if kind == 'scale':
+                # "one point five lakh": the scale multiplies the whole decimal
+                if fraction:
+                    small = Decimal(f"{small}.{''.join(fraction)}")
+                fraction = None
+            else:
+                # "ten point five twenty" ends the fraction; start over
+                values.append(Decimal(f"{total + (small or 0)}.{''.join(fraction)}"))
+                total, small, last, fraction = 0, None, None, None
+        if kind == 'unit':
+            if last in (None, 'scale', 'hundred', 'and') or (last == 'tens' and small % 10 == 0):
+                small = value if small is None else small + value
+            else:
+                values.append(total + small)
+                total, small = 0, value
+        elif kind == 'teen' or kind == 'tens':
+            if last in (None, 'scale', 'hundred', 'and') and (small is None or small % 100 == 0):
+                small = value if small is None else small + value
+            else:
+                values.append(total + small)
+                total, small = 0, value
+        elif kind == 'hundred':
+            if last is None or last == 'hundred' or last == 'scale' and not small:
+                small = 100 if small is None else small + 100
+            else:
+                small = (small or 1) * 100
+        elif kind == 'scale':
+            total += (small or 1) * value
+            small = 0
+        elif kind == 'point':
+            if last is None or last == 'and':
+                continue
+            fraction = []
+        last = kind
+    value = total + (small or 0)
+    if fraction:
+        value = Decimal(f"{value}.{''.join(fraction)}")
+    elif isinstance(value, Decimal) and value == value.to_integral_value():
+        value = int(value)
+    values.append(value)
+    return values
+
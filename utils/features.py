@@ -0,0 +1,154 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .audio import AudioClip
+from .cache import LRUCache
+
+
+def _hz_to_mel(frequencies):
+    """Slaney mel scale: linear below 1 kHz, logarithmic above"""
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    mels = frequencies / (200.0 / 3)
+    log_region = frequencies >= 1000.0
+    mels[log_region] = 15.0 + np.log(frequencies[log_region] / 1000.0) / (np.log(6.4) / 27.0)
+    return mels
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    frequencies = mels * (200.0 / 3)
+    log_region = mels >= 15.0
+    frequencies[log_region] = 1000.0 * np.exp((np.log(6.4) / 27.0) * (mels[log_region] - 15.0))
+    return frequencies
+
+
+def mel_filterbank(sample_rate, n_fft, n_mels, fmin=0.0, fmax=None):
+    """Slaney-normalized triangular mel filters, shape ``(n_mels, 1 + n_fft // 2)``"""
+    fmax = sample_rate / 2 if fmax is None else fmax
+    fft_freqs = np.linspace(0, sample_rate / 2, 1 + n_fft // 2)
+    mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel([fmin])[0], _hz_to_mel([fmax])[0], n_mels + 2))
+    widths = np.diff(mel_freqs)
+    ramps = mel_freqs[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / widths[:-1, None]
+    upper = ramps[2:] / widths[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, None]
+    return weights.astype(np.float32)
+
+
+def dct_matrix(n_out, n_in):
+    """Orthonormal DCT-II as a ``(n_out, n_in)`` matrix"""
+    n = np.arange(n_in)
+    k = np.arange(n_out)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+class FeatureExtractor:
+    """Vectorized MFCC voice embeddings with a content-hash memo.
+
+    Defaults follow ``librosa.feature.mfcc`` (2048-point FFT, hop 512,
+    128 Slaney mel bands, dB with an 80 dB floor, orthonormal DCT-II), so
+    the mean-MFCC embedding matches what the notebook produced. The window,
+    mel filterbank and DCT matrices are built once. ``embed_batch`` frames
+    clips into shared frame matrices and runs one FFT and two matrix
+    products per group of clips.
+    """
+
+    def __init__(self, sample_rate=16000, n_mfcc=13, n_fft=2048, hop_length=512, n_mels=128,
+                 cache_size=4096, max_frames=256):
+        self.sample_rate = sample_rate
+        self.max_frames = max_frames
+        self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+        self.mel_basis = mel_filterbank(sample_rate, n_fft, n_mels)
+        self.dct = dct_matrix(n_mfcc, n_mels)
+        self.cache = LRUCache(cache_size)
+
+    def frames(self, samples):
+        """Centered, zero-padded frames as a strided ``(n_frames, n_fft)`` view"""
+        pad = self.n_fft // 2
+        padded = np.pad(samples, pad)
+        count = 1 + (len(padded) - self.n_fft) // self.hop_length
+        return np.lib.stride_tricks.as_strided(
+            padded, shape=(count, self.n_fft),
+            strides=(padded.strides[0] * self.hop_length, padded.strides[0]),
+            writeable=False,
+        )
+
+    def mfcc(self, samples):
+        """MFCC matrix of shape ``(n_mfcc, n_frames)`` for one signal"""
+        frames = self.frames(samples)
+        return self._mfcc_frames(frames, [0, len(frames)])[0].T
+
+    def embed(self, audio):
+        """Mean-MFCC embedding for one clip, memoized by audio hash"""
+        return self.embed_batch([audio])[0]
+
+    def embed_batch(self, clips):
+        """``(n, n_mfcc)`` embeddings for many clips with one FFT pass"""
+        clips = [c if isinstance(c, AudioClip) else AudioClip.from_wav(c) for c in clips]
+        embeddings = np.empty((len(clips), self.n_mfcc), dtype=np.float32)
+        missing = []
+        for i, clip in enumerate(clips):
+            cached = self.cache.get(clip.digest)
+            if cached is None:
+                missing.append(i)
+            else:
+                embeddings[i] = cached
+
+        # Stack clips into groups of about max_frames frames: one FFT call per
+        # group amortizes the per-call overhead while staying cache-sized
+        group, framed = [], []
+        for n, i in enumerate(missing):
+            group.append(i)
+            framed.append(self.frames(clips[i].to_float32(self.sample_rate)))
+            if sum(len(f) for f in framed) >= self.max_frames or n == len(missing) - 1:
+                offsets = np.cumsum([0] + [len(f) for f in framed])
+                per_clip = self._mfcc_frames(np.concatenate(framed), offsets)
+                for j, coefficients in zip(group, per_clip):
+                    embedding = coefficients.mean(axis=0)
+                    embeddings[j] = embedding
+                    self.cache.put(clips[j].digest, embedding)
+                group, framed = [], []
+        return embeddings
+
+    def _mfcc_frames(self, frames, offsets):
+        """MFCC rows for stacked frames, split into one array per clip"""
+        spectrum = np.fft.rfft(frames * self.window, n=self.n_fft, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        mel = power.astype(np.float32) @ self.mel_basis.T
+        log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+
+        parts = np.split(log_mel, offsets[1:-1])
+        # The 80 dB floor is relative to each clip's own peak
+        return [np.maximum(part, part.max() - 80.0) @ self.dct.T for part in parts]
+
+
+# Extractor owned by each archive worker process
+_worker_extractor = None
+
+
+def _init_worker(kwargs):
+    global _worker_extractor
+    _worker_extractor = FeatureExtractor(**kwargs)
+
+
+def _embed_paths(paths):
+    return _worker_extractor.embed_batch(paths)
+
+
+def embed_archive(paths, processes=None, batch_size=64, **kwargs):
+    """Embed a large list of WAV files across a process pool, in input order"""
+    paths = list(paths)
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    if not batches:
+        return np.zeros((0, kwargs.get('n_mfcc', 13)), dtype=np.float32)
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(kwargs,)) as pool:
+        return np.concatenate(list(pool.map(_embed_paths, batches)))
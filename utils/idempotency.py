@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import deque
+
+
+def idempotency_key(*parts):
+    """Stable key from a session id, audio digest, client token, ..."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class DedupeIndex:
+    """Bounded, time-windowed memory of operations already run, by key.
+
+    A dict maps each key to the outcome of its first run, and a ring (deque)
+    holds the keys in insertion order with their expiry time. Expiry pops
+    from the front of the ring, so lookups and expiry are O(1) amortized.
+    At most ``capacity`` keys are kept; past that the oldest are dropped
+    even if still inside ``window`` seconds.
+
+    ``run(key, operation)`` calls ``operation()`` the first time a key is
+    seen and returns the same result for every repeat. A repeat that
+    arrives while the first run is still in progress waits for it. If the
+    operation raises, the key is forgotten so the caller can retry.
+    """
+
+    def __init__(self, window=600.0, capacity=100000, clock=time.monotonic):
+        self.window = window
+        self.capacity = capacity
+        self._clock = clock
+        self._entries = {}
+        self._ring = deque()
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._expire(self._clock())
+            return key in self._entries
+
+    def run(self, key, operation):
+        """Run ``operation()`` at most once per key; returns ``(result, duplicate)``"""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                while entry.pending:
+                    self._settled.wait()
+                if entry.error is not None:
+                    raise entry.error
+                return entry.result, True
+            if len(self._ring) >= self.capacity:
+                self._drop_oldest()
+            entry = self._entries[key] = _Entry()
+            self._ring.append((now + self.window, key, entry))
+
+        try:
+            result = operation()
+        except BaseException as e:
+            with self._lock:
+                entry.error = e
+                entry.pending = False
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self._settled.notify_all()
+            raise
+        with self._lock:
+            entry.result = result
+            entry.pending = False
+            self._settled.notify_all()
+        return result, False
+
+    def _expire(self, now):
+        ring = self._ring
+        while ring and ring[0][0] <= now:
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        _, key, entry = self._ring.popleft()
+        # The key may have been forgotten (failed run) and stored again since
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+
+class _Entry:
+    __slots__ = ('pending', 'result', 'error')
+
+    def __init__(self):
+        self.pending = True
+        self.result = None
+        self.error = None
@@ -0,0 +1,87 @@
+import json
+import re
+
+# Keyword table: intent -> trigger phrases. A phrase weighs its word count,
+# so "check balance" outweighs a stray "pay"; a ``(phrase, weight)`` pair
+# sets the weight explicitly. "pay" is also how bills and fees are talked
+# about, so it weighs less than any topic word ("pay my PIN fee" is a PIN
+# request, not a transfer).
+DEFAULT_KEYWORDS = {
+    'transfer': ['transfer', 'send', ('pay', 0.5), 'send money'],
+    'balance': ['balance', 'check balance', 'account balance'],
+    'transactions': ['transaction', 'transactions', 'history', 'statement'],
+    'change_pin': ['pin', 'change pin', 'reset pin', 'update pin'],
+    'spending': ['how much', 'how much did i send', 'how much did i spend', 'how much have i sent',
+                 'spent', 'spend', 'spending', 'top recipients', 'sent to', 'summary'],
+}
+
+
+class IntentMatcher:
+    """Single-pass keyword intent classifier.
+
+    The keyword table is compiled into one regex alternation (longest
+    phrase first), so each lowercased transcript is scanned once. Every
+    match adds its phrase's weight (word count unless given) to that
+    intent's score; the best intent is returned with
+    ``confidence = best score / total score``. Ties go to the intent listed
+    first in the table.
+
+    Phrases are strings or ``(phrase, weight)`` pairs, in the table, in
+    ``add_keywords`` and in JSON config (as two-element lists).
+    """
+
+    def __init__(self, keywords=None):
+        self.keywords = {}
+        for intent, phrases in (keywords or DEFAULT_KEYWORDS).items():
+            self.keywords[intent] = list(phrases)
+        self._compile()
+
+    @classmethod
+    def from_config(cls, path):
+        """Build a matcher from a JSON file mapping intent -> phrases"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def add_keywords(self, intent, phrases):
+        """Extend the table (adding the intent if new) and recompile"""
+        self.keywords.setdefault(intent, []).extend(phrases)
+        self._compile()
+
+    def classify(self, text):
+        """Return ``(intent, confidence)``; ``('unknown', 0.0)`` if nothing matches"""
+        matches = self._findall(text.lower())
+        if not matches:
+            return 'unknown', 0.0
+        if len(matches) == 1:
+            return self._phrases[matches[0]][0], 1.0
+        scores = {}
+        for phrase in matches:
+            intent, weight = self._phrases[phrase]
+            scores[intent] = scores.get(intent, 0) + weight
+        best = max(scores, key=lambda intent: (scores[intent], -self._rank[intent]))
+        return best, scores[best] / sum(scores.values())
+
+    def classify_many(self, texts):
+        """Classify a batch of transcripts"""
+        classify = self.classify
+        return [classify(text) for text in texts]
+
+    def _compile(self):
+        self._rank = {intent: i for i, intent in enumerate(self.keywords)}
+        self._phrases = {}
+        for intent, phrases in self.keywords.items():
+            for phrase in phrases:
+                weight = None
+                if not isinstance(phrase, str):
+                    phrase, weight = phrase
+                phrase = ' '.join(phrase.lower().split())
+                # A phrase listed under two intents belongs to the first one
+                if phrase and phrase not in self._phrases:
+                    self._phrases[phrase] = (intent, weight if weight is not None else phrase.count(' ') + 1)
+        if not self._phrases:
+            self._findall = lambda text: []
+            return
+        # Longest phrase first so "change pin" wins over "pin" at the same position
+        ordered = sorted(self._phrases, key=len, reverse=True)
+        pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, ordered)) + r')\b')
+        self._findall = pattern.findall
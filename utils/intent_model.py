@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Natural-language descriptions the zero-shot model scores transcripts against
+INTENT_DESCRIPTIONS = {
+    'transfer': 'sending or transferring money to someone',
+    'balance': 'checking the account balance',
+    'transactions': 'showing transaction history or a statement',
+    'change_pin': 'changing or resetting the PIN',
+    'spending': 'asking how much was spent or sent to someone over a period',
+}
+
+
+class TransformersIntentBackend:
+    """Local CPU zero-shot intent model, loaded lazily on first use.
+
+    ``transformers`` (and ``torch``) are only imported when the first batch
+    is classified, so the app starts without paying for the model.
+    """
+
+    def __init__(self, model_name="typeform/distilbert-base-uncased-mnli",
+                 descriptions=None, min_score=0.5):
+        self.model_name = model_name
+        self.descriptions = descriptions or INTENT_DESCRIPTIONS
+        self.min_score = min_score
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        if self._pipeline is None:
+            with self._load_lock:
+                if self._pipeline is None:
+                    from transformers import pipeline
+                    self._pipeline = pipeline("zero-shot-classification", model=self.model_name, device=-1)
+                    logger.info("Intent model loaded: %s", self.model_name)
+        return self._pipeline
+
+    def predict_batch(self, texts):
+        """Return one ``(intent, score)`` per text"""
+        classifier = self.load()
+        labels = list(self.descriptions.values())
+        intents = {description: intent for intent, description in self.descriptions.items()}
+        outputs = classifier(list(texts), candidate_labels=labels)
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+
+        results = []
+        for output in outputs:
+            label, score = output['labels'][0], output['scores'][0]
+            if score < self.min_score:
+                results.append(('unknown', score))
+            else:
+                results.append((intents[label], score))
+        return results
+
+
+class MicroBatcher:
+    """Coalesces concurrent single requests into backend batches.
+
+    A worker thread waits for the first request, then keeps collecting
+    until ``max_batch`` requests are queued or ``max_latency`` seconds have
+    passed since that first request, and runs them as one batch.
+    """
+
+    def __init__(self, predict_batch, max_batch=32, max_latency=0.01):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = []
+        self._cond = threading.Condition()
+        self._worker = None
+
+    def submit(self, text):
+        """Queue one text and return a Future resolving to its prediction"""
+        future = Future()
+        with self._cond:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+            self._queue.append((text, future))
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.max_latency
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+
+            try:
+                results = self.predict_batch([text for text, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+class HybridIntentClassifier:
+    """Keyword rules first, model only for low-confidence transcripts.
+
+    Exposes the same ``classify``/``classify_many`` interface as
+    IntentMatcher. Model answers are cached by normalized transcript.
+    """
+
+    def __init__(self, matcher, backend, threshold=0.75, cache_size=4096,
+                 max_batch=32, max_latency=0.01):
+        self.matcher = matcher
+        self.backend = backend
+        self.threshold = threshold
+        self.cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(backend.predict_batch, max_batch, max_latency)
+
+    def classify(self, text):
+        intent, confidence = self.matcher.classify(text)
+        if confidence >= self.threshold:
+            return intent, confidence
+
+        key = self._normalize(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            result = self.batcher.submit(text).result()
+        except Exception as e:
+            logger.warning("Intent model error: %s", e)
+            return intent, confidence
+        self.cache.put(key, result)
+        return result
+
+    def classify_many(self, texts):
+        results = self.matcher.classify_many(texts)
+        pending = {}
+        for i, (text, (_, confidence)) in enumerate(zip(texts, results)):
+            if confidence >= self.threshold:
+                continue
+            key = self._normalize(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            keys = list(pending)
+            try:
+                predictions = self.backend.predict_batch(keys)
+            except Exception as e:
+                logger.warning("Intent model error: %s", e)
+                return results
+            for key, prediction in zip(keys, predictions):
+                self.cache.put(key, prediction)
+                for i in pending[key]:
+                    results[i] = prediction
+        return results
+
+    def _normalize(self, text):
+        return ' '.join(text.lower().split())
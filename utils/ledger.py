@@ -0,0 +1,641 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from .money import from_minor, to_minor
+
+# One fixed-width row per record: 37 bytes instead of a ~650-byte dict
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'),            # epoch seconds
+    ('amount', '<i8'),        # minor units
+    ('balance', '<i8'),       # minor units, account balance after this record
+    ('account', '<i4'),       # interned name ids, -1 when absent
+    ('counterparty', '<i4'),
+    ('description', '<i4'),
+    ('type', 'i1'),           # index into RECORD_TYPES
+])
+RECORD_TYPES = ('debit', 'credit')
+_TYPE_CODES = {name: code for code, name in enumerate(RECORD_TYPES)}
+DEBIT, CREDIT = _TYPE_CODES['debit'], _TYPE_CODES['credit']
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(ts):
+    """Display date for an epoch-second timestamp"""
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class DayClock:
+    """Local calendar day of epoch-second timestamps, cached until midnight.
+
+    Ledger timestamps are non-decreasing, so derived views folding rows in
+    append order only recompute the day when a row crosses midnight.
+    ``start`` and ``end`` bound the cached day and ``label`` is its
+    ``YYYY-MM-DD`` form.
+    """
+
+    __slots__ = ('day', 'label', 'start', 'end')
+
+    def __init__(self):
+        self.day = self.label = None
+        self.start = self.end = 0
+
+    def at(self, ts):
+        """The date containing ``ts``"""
+        if self.day is None or not self.start <= ts < self.end:
+            start = datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0)
+            self.day = start.date()
+            self.label = self.day.isoformat()
+            self.start = int(start.timestamp())
+            self.end = int((start + timedelta(days=1)).timestamp())
+        return self.day
+
+
+class Ledger:
+    """Append-only transaction ledger with a segment log, WAL and snapshots.
+
+    Records are held in memory as fixed-width ``RECORD_DTYPE`` rows in
+    append order: amounts and balances in integer minor units, integer
+    epoch-second timestamps, and account, counterparty and description
+    strings interned to ids. Account, counterparty and pair indexes are
+    int64 arrays of sequence numbers, and the timestamp column is sorted so
+    range queries bisect. When a directory is given, every append is
+    written to the write-ahead log first, then buffered into the active
+    segment file. A snapshot is taken every ``snapshot_interval`` appends:
+    segments are flushed, ``snapshot.json`` (with the ``state_provider``
+    state) is replaced atomically and the WAL is truncated. Snapshots bound
+    the WAL, not startup: the segments are the store, so recovery reads
+    every segment and then replays the WAL entries past their end.
+
+    The ledger behaves like a read-only list of dicts (``len``, iteration,
+    indexing and slicing) with ``date``, ``type``, ``amount``,
+    ``description``, ``balance_after``, ``account``, ``counterparty``,
+    ``ts`` and ``seq`` keys, amounts as exact Decimals; those dicts are
+    built on read. On disk each record is one JSON line with
+    ``amount_minor``/``balance_minor`` integers; older lines with float
+    amounts are converted on load.
+    """
+
+    WAL_FILE = "wal.log"
+    SNAPSHOT_FILE = "snapshot.json"
+    SEGMENT_PREFIX = "segment-"
+
+    def __init__(self, directory=None, segment_size=100000, snapshot_interval=10000,
+                 fsync=False, state_provider=None):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        self.state_provider = state_provider
+        self.state = {}
+
+        self._rows = np.empty(1024, dtype=RECORD_DTYPE)
+        self._size = 0
+        self._last_ts = None
+        self._names = []
+        self._name_ids = {}
+        self._by_account = {}
+        self._by_counterparty = {}
+        self._by_pair = {}
+
+        self._wal = None
+        self._segment = None
+        self._segment_index = 0
+        self._segment_count = 0
+        self._pending = []
+        self._since_snapshot = 0
+        self._lock = threading.RLock()
+        self._listeners = []
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._recover()
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        for start in range(0, self._size, 4096):
+            stop = min(start + 4096, self._size)
+            yield from self._materialize(range(start, stop), self._rows[start:stop])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            seqs = range(self._size)[index]
+            if seqs.step == 1:
+                return self._materialize(seqs, self._rows[seqs.start:seqs.stop])
+            seqs = np.arange(seqs.start, seqs.stop, seqs.step)
+            return self._materialize(seqs.tolist(), self._rows[seqs])
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("ledger index out of range")
+        return self._materialize([index], self._rows[index:index + 1])[0]
+
+    def append(self, record):
+        """Append a transaction record in O(1); returns the stored record"""
+        return self[self.extend([record])[0]]
+
+    def extend(self, records):
+        """Append many records under one lock and one WAL write.
+
+        Records carry ``type``, ``account``, ``counterparty``,
+        ``description`` and either ``amount``/``balance_after`` in rupees or
+        exact ``amount_minor``/``balance_minor`` integers; ``ts`` defaults to
+        now. Returns the range of sequence numbers assigned.
+        """
+        now = int(time.time())
+        with self._lock:
+            start = self._size
+            last_ts = self._last_ts
+            entries = []
+            for seq, record in enumerate(records, start):
+                entry = _normalize(record, now)
+                # Keep the timestamp column sorted so range queries can bisect
+                if last_ts is not None and entry['ts'] < last_ts:
+                    entry['ts'] = last_ts
+                last_ts = entry['ts']
+                entry['seq'] = seq
+                entries.append(entry)
+            if not entries:
+                return range(start, start)
+
+            # Write-ahead: the WAL has the records before they become visible
+            if self.directory:
+                self._write_wal(entries)
+            self._apply(entries)
+            rows = self._rows[start:self._size]
+            for listener in self._listeners:
+                listener(rows)
+
+            if self.directory:
+                self._pending.extend(entries)
+                self._since_snapshot += len(entries)
+                if self._since_snapshot >= self.snapshot_interval:
+                    self.snapshot()
+            return range(start, self._size)
+
+    def extend_rows(self, rows, names):
+        """Bulk-append ``RECORD_DTYPE`` rows, e.g. from an import.
+
+        The account, counterparty and description fields of ``rows`` index
+        into ``names`` (-1 for none) and are re-interned to ledger ids, so a
+        block carries its own small string dictionary. This skips the
+        per-record dicts of ``extend``: timestamps are clamped and indexes
+        built with array operations. With a directory the rows are written
+        straight to the segment files and flushed before they become
+        visible; a crash part-way through keeps a prefix of the block.
+        Returns the range of sequence numbers assigned.
+        """
+        if len(rows) and not np.isin(rows['type'], np.arange(len(RECORD_TYPES))).all():
+            raise ValueError("Unknown record type code in rows")
+        with self._lock:
+            start = self._size
+            if not len(rows):
+                return range(start, start)
+            block = np.array(rows, dtype=RECORD_DTYPE)
+            # The trailing -1 maps "no name" (-1) to itself
+            ids = np.array([self._intern(name) for name in names] + [-1], dtype=np.int32)
+            for field in ('account', 'counterparty', 'description'):
+                block[field] = ids[block[field]]
+            # extend stores a missing description as ''
+            description = block['description']
+            description[description < 0] = self._intern('')
+            ts = block['ts']
+            if self._last_ts is not None:
+                ts[0] = max(ts[0], self._last_ts)
+            np.maximum.accumulate(ts, out=ts)
+
+            if self.directory:
+                self.flush()
+                self._write_segments(block, start)
+            self._apply_block(block)
+            rows = self._rows[start:self._size]
+            for listener in self._listeners:
+                listener(rows)
+            return range(start, self._size)
+
+    def subscribe(self, listener, replay=False):
+        """Call ``listener(rows)`` with the ``RECORD_DTYPE`` rows of every append
+
+        With ``replay=True`` the listener first receives all existing rows,
+        atomically with registration so no append is missed in between.
+        Name ids in the rows resolve through ``name``.
+        """
+        with self._lock:
+            if replay and self._size:
+                listener(self._rows[:self._size])
+            self._listeners.append(listener)
+
+    def rows(self):
+        """All stored rows as a ``RECORD_DTYPE`` array view"""
+        return self._rows[:self._size]
+
+    def seqs(self, account=None, counterparty=None):
+        """Sequence numbers of one account's and/or counterparty's records, in order"""
+        seqs = self._index_for(account, counterparty)
+        return np.arange(self._size) if seqs is None else seqs.copy()
+
+    def name(self, name_id):
+        """String for an interned id, None for -1"""
+        return self._names[name_id] if name_id >= 0 else None
+
+    def name_id(self, name):
+        """Interned id for a string, -1 if it has never been stored"""
+        return self._name_ids.get(name, -1)
+
+    def last(self, count=5, account=None, counterparty=None):
+        """Return the last ``count`` records, optionally for one account or counterparty"""
+        if count <= 0:
+            return []
+        seqs = self._index_for(account, counterparty)
+        if seqs is None:
+            start = max(0, self._size - count)
+            return self._materialize(range(start, self._size), self._rows[start:self._size])
+        seqs = seqs[-count:]
+        return self._materialize(seqs.tolist(), self._rows[seqs])
+
+    def range(self, start=None, end=None, account=None, counterparty=None):
+        """Return records with ``start <= ts < end`` in O(log n + k)"""
+        start = self._to_epoch(start)
+        end = self._to_epoch(end)
+        timestamps = self._rows['ts'][:self._size]
+        seqs = self._index_for(account, counterparty)
+        if seqs is None:
+            lo = 0 if start is None else bisect_left(timestamps, start)
+            hi = self._size if end is None else bisect_left(timestamps, end)
+            return self._materialize(range(lo, hi), self._rows[lo:hi])
+
+        # Per-key sequence arrays are in append order, so their timestamps are sorted too
+        keyed = _KeyedTimestamps(seqs, timestamps)
+        lo = 0 if start is None else bisect_left(keyed, start)
+        hi = len(seqs) if end is None else bisect_left(keyed, end)
+        seqs = seqs[lo:hi]
+        return self._materialize(seqs.tolist(), self._rows[seqs])
+
+    def count_until(self, ts):
+        """Number of records with a timestamp at or before ``ts``"""
+        return bisect_right(self._rows['ts'][:self._size], self._to_epoch(ts))
+
+    def accounts(self):
+        return [self._names[name_id] for name_id in self._by_account]
+
+    def counterparties(self):
+        return [self._names[name_id] for name_id in self._by_counterparty]
+
+    def flush(self):
+        """Write buffered records to the active segment"""
+        if not self.directory or not self._pending:
+            return
+        with self._lock:
+            for entry in self._pending:
+                if self._segment is None or self._segment_count >= self.segment_size:
+                    self._roll_segment()
+                self._segment.write(json.dumps(entry) + "\n")
+                self._segment_count += 1
+            self._pending = []
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+
+    def snapshot(self):
+        """Flush segments, persist a snapshot and truncate the WAL"""
+        if not self.directory:
+            return False
+        with self._lock:
+            self.flush()
+            if self.state_provider is not None:
+                self.state = self.state_provider()
+            snapshot = {
+                'seq': self._size,
+                'segment': self._segment_index,
+                'segment_count': self._segment_count,
+                'state': self.state,
+                'taken_at': time.time(),
+            }
+            path = os.path.join(self.directory, self.SNAPSHOT_FILE)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+            if self._wal is not None:
+                self._wal.close()
+            self._wal = open(os.path.join(self.directory, self.WAL_FILE), 'w')
+            self._since_snapshot = 0
+        return True
+
+    def close(self):
+        if not self.directory:
+            return
+        self.snapshot()
+        for handle in (self._wal, self._segment):
+            if handle is not None:
+                handle.close()
+        self._wal = None
+        self._segment = None
+
+    def _apply(self, entries):
+        intern = self._intern
+        values = [
+            (entry['ts'], entry['amount_minor'], entry['balance_minor'], intern(entry['account']),
+             intern(entry['counterparty']), intern(entry['description']), _TYPE_CODES[entry['type']])
+            for entry in entries
+        ]
+        if len(values) <= 16:
+            # Per-transfer appends: plain Python beats numpy's per-call overhead
+            start = self._size
+            end = start + len(values)
+            self._reserve(end)
+            rows = self._rows
+            for seq, value in enumerate(values, start):
+                rows[seq] = value
+                account, counterparty = value[3], value[4]
+                if account >= 0:
+                    _index_seq(self._by_account, account, seq)
+                if counterparty >= 0:
+                    _index_seq(self._by_counterparty, counterparty, seq)
+                    if account >= 0:
+                        _index_seq(self._by_pair, (account << 32) | counterparty, seq)
+            self._size = end
+            self._last_ts = values[-1][0]
+            return
+
+        self._apply_block(np.array(values, dtype=RECORD_DTYPE))
+
+    def _apply_block(self, block):
+        """Store rows whose name fields are already ledger ids, and index them"""
+        start = self._size
+        end = start + len(block)
+        self._reserve(end)
+        self._rows[start:end] = block
+        self._size = end
+        self._last_ts = int(block['ts'][-1])
+        accounts = block['account']
+        counterparties = block['counterparty']
+        pairs = (accounts.astype(np.int64) << 32) | counterparties.astype(np.int64)
+        _index_keys(self._by_account, accounts, accounts >= 0, start)
+        _index_keys(self._by_counterparty, counterparties, counterparties >= 0, start)
+        _index_keys(self._by_pair, pairs, (accounts >= 0) & (counterparties >= 0), start)
+
+    def _reserve(self, size):
+        if size > len(self._rows):
+            grown = np.empty(max(2 * len(self._rows), size), dtype=RECORD_DTYPE)
+            grown[:self._size] = self._rows[:self._size]
+            self._rows = grown
+
+    def _intern(self, name):
+        if name is None:
+            return -1
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+
+    def _materialize(self, seqs, rows):
+        name = self.name
+        return [
+            {
+                'date': format_timestamp(ts),
+                'type': RECORD_TYPES[kind],
+                'amount': from_minor(amount),
+                'description': name(description),
+                'balance_after': from_minor(balance),
+                'account': name(account),
+                'counterparty': name(counterparty),
+                'ts': ts,
+                'seq': seq,
+            }
+            for seq, (ts, amount, balance, account, counterparty, description, kind)
+            in zip(seqs, rows.tolist())
+        ]
+
+    def _index_for(self, account, counterparty):
+        if account is not None and counterparty is not None:
+            account_id, counterparty_id = self.name_id(account), self.name_id(counterparty)
+            index = self._by_pair.get((account_id << 32) | counterparty_id) \
+                if account_id >= 0 and counterparty_id >= 0 else None
+        elif account is not None:
+            index = self._by_account.get(self.name_id(account))
+        elif counterparty is not None:
+            index = self._by_counterparty.get(self.name_id(counterparty))
+        else:
+            return None
+        return index.view() if index is not None else _NO_SEQS
+
+    def _to_epoch(self, value):
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, str):
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp()
+        return value
+
+    def _write_wal(self, records):
+        if self._wal is None:
+            self._wal = open(os.path.join(self.directory, self.WAL_FILE), 'a')
+        self._wal.write("".join(json.dumps(record) + "\n" for record in records))
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    def _write_segments(self, block, start):
+        """Append ledger-id rows to the segment files as JSON lines"""
+        names = [json.dumps(name) for name in self._names]
+        types = [json.dumps(kind) for kind in RECORD_TYPES]
+        seq = start
+        for offset in range(0, len(block), 65536):
+            chunk = block[offset:offset + 65536].tolist()
+            while chunk:
+                if self._segment is None or self._segment_count >= self.segment_size:
+                    self._roll_segment()
+                part = chunk[:self.segment_size - self._segment_count]
+                chunk = chunk[len(part):]
+                # Same keys and order as json.dumps of a _normalize entry
+                self._segment.write("".join(
+                    f'{{"seq": {seq + i}, "ts": {ts}, "type": {types[kind]}, '
+                    f'"account": {names[account] if account >= 0 else "null"}, '
+                    f'"counterparty": {names[counterparty] if counterparty >= 0 else "null"}, '
+                    f'"description": {names[description]}, '
+                    f'"amount_minor": {amount}, "balance_minor": {balance}}}\n'
+                    for i, (ts, amount, balance, account, counterparty, description, kind) in enumerate(part)
+                ))
+                seq += len(part)
+                self._segment_count += len(part)
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+    def _segment_path(self, index):
+        return os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{index:06d}.log")
+
+    def _roll_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment_index += 1
+        self._segment = open(self._segment_path(self._segment_index), 'a')
+        self._segment_count = 0
+
+    def _recover(self):
+        snapshot_path = os.path.join(self.directory, self.SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path) as f:
+                snapshot = json.load(f)
+            self.state = snapshot.get('state', {})
+
+        segments = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(".log")
+        )
+        for name in segments:
+            path = os.path.join(self.directory, name)
+            count = 0
+            good_bytes = 0
+            batch = []
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write at the tail; the WAL still has it
+                    record = json.loads(line)
+                    if record['seq'] == self._size + len(batch):
+                        batch.append(_normalize(record, 0))
+                        if len(batch) >= 65536:
+                            self._apply(batch)
+                            batch = []
+                    count += 1
+                    good_bytes += len(line)
+            if batch:
+                self._apply(batch)
+            if good_bytes < os.path.getsize(path):
+                os.truncate(path, good_bytes)
+            self._segment_index = int(name[len(self.SEGMENT_PREFIX):-len(".log")])
+            self._segment_count = count
+
+        if segments:
+            self._segment = open(self._segment_path(self._segment_index), 'a')
+
+        wal_path = os.path.join(self.directory, self.WAL_FILE)
+        if os.path.exists(wal_path):
+            with open(wal_path) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    if record['seq'] == self._size + len(self._pending):
+                        self._pending.append(_normalize(record, 0))
+            if self._pending:
+                self._apply(self._pending)
+
+        if self._pending:
+            self.snapshot()
+        if self._size:
+            logger.info("Ledger recovered: %d transactions", self._size)
+
+
+_NO_SEQS = np.empty(0, dtype=np.int64)
+
+
+def _normalize(record, default_ts):
+    """On-disk form of a record: integer minor units and epoch seconds"""
+    kind = record['type']
+    if kind not in _TYPE_CODES:
+        raise ValueError(f"Unknown record type: {kind!r}")
+    if 'amount_minor' in record:
+        amount, balance = int(record['amount_minor']), int(record['balance_minor'])
+    else:
+        amount, balance = to_minor(record['amount']), to_minor(record['balance_after'])
+    ts = record.get('ts')
+    return {
+        'seq': record.get('seq'),
+        'ts': default_ts if ts is None else int(ts),
+        'type': kind,
+        'account': record.get('account'),
+        'counterparty': record.get('counterparty'),
+        'description': record.get('description') or '',
+        'amount_minor': amount,
+        'balance_minor': balance,
+    }
+
+
+def _index_seq(index, key, seq):
+    seqs = index.get(key)
+    if seqs is None:
+        seqs = index[key] = _SeqIndex()
+    seqs.append(seq)
+
+
+def _index_keys(index, keys, mask, start):
+    """Append the sequence numbers of masked rows to each key's _SeqIndex"""
+    rows = np.flatnonzero(mask)
+    if not len(rows):
+        return
+    # Group rows by key once instead of one append per row
+    order = rows[np.argsort(keys[rows], kind='stable')]
+    sorted_keys = keys[order]
+    bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+    for key, group in zip(sorted_keys[np.r_[0, bounds]].tolist(), np.split(order, bounds)):
+        seqs = index.get(key)
+        if seqs is None:
+            seqs = index[key] = _SeqIndex()
+        seqs.extend(group + start)
+
+
+class _SeqIndex:
+    """Growable int64 array of the sequence numbers for one key"""
+
+    __slots__ = ('seqs', 'size')
+
+    def __init__(self):
+        self.seqs = np.empty(4, dtype=np.int64)
+        self.size = 0
+
+    def append(self, seq):
+        if self.size == len(self.seqs):
+            self._grow(self.size + 1)
+        self.seqs[self.size] = seq
+        self.size += 1
+
+    def extend(self, seqs):
+        end = self.size + len(seqs)
+        if end > len(self.seqs):
+            self._grow(end)
+        self.seqs[self.size:end] = seqs
+        self.size = end
+
+    def _grow(self, needed):
+        grown = np.empty(max(2 * len(self.seqs), needed), dtype=np.int64)
+        grown[:self.size] = self.seqs[:self.size]
+        self.seqs = grown
+
+    def view(self):
+        return self.seqs[:self.size]
+
+
+class _KeyedTimestamps:
+    """Sequence view mapping a per-key seq array to timestamps for bisect"""
+
+    __slots__ = ('seqs', 'timestamps')
+
+    def __init__(self, seqs, timestamps):
+        self.seqs = seqs
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.seqs)
+
+    def __getitem__(self, index):
+        return self.timestamps[self.seqs[index]]
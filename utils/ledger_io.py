@@ -0,0 +1,317 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .ledger import RECORD_DTYPE, RECORD_TYPES
+from .money import MINOR_UNITS, to_minor
+
+# Column layout of every export; the same fields as a ledger JSON line
+COLUMNS = ('seq', 'ts', 'type', 'account', 'counterparty', 'description', 'amount_minor', 'balance_minor')
+STRING_COLUMNS = ('type', 'account', 'counterparty', 'description')
+FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.arrows': 'arrow',
+    '.ipc': 'arrow',
+    '.csv': 'csv',
+}
+CHUNK_ROWS = 65536
+
+
+def detect_format(path):
+    """'parquet', 'arrow' or 'csv' from the file extension; CSV when unknown"""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+def export_ledger(ledger, path, format=None, account=None, chunk_rows=CHUNK_ROWS):
+    """Stream the ledger (or one account's records) to a columnar file.
+
+    Rows are written ``chunk_rows`` at a time straight from the ledger's
+    fixed-width rows, so memory stays flat however long the ledger is.
+    Names are written dictionary-encoded per chunk and amounts as exact
+    minor units. Parquet and Arrow (IPC stream) need pyarrow; CSV only
+    needs pandas. Records appended while the export runs are not included.
+    Returns the number of records written.
+    """
+    format = format or detect_format(path)
+    rows = ledger.rows()
+    if account is None:
+        seqs = None
+        total = len(rows)
+    else:
+        seqs = ledger.seqs(account=account)
+        total = len(seqs)
+
+    def chunks():
+        for start in range(0, total, chunk_rows):
+            stop = min(start + chunk_rows, total)
+            if seqs is None:
+                yield _columns(ledger, np.arange(start, stop), rows[start:stop])
+            else:
+                yield _columns(ledger, seqs[start:stop], rows[seqs[start:stop]])
+
+    _WRITERS[format](path, chunks())
+    return total
+
+
+def import_ledger(ledger, path, format=None, account=None, chunk_rows=CHUNK_ROWS, opening=None):
+    """Bulk-load records from a columnar file into the ledger, chunk by chunk.
+
+    Reads files written by ``export_ledger`` and plain statements alike:
+    ``ts`` (epoch seconds) or a ``date`` string, ``type``, ``description``,
+    ``amount_minor`` or ``amount`` in rupees, and optionally ``account``,
+    ``counterparty`` and ``balance_minor``/``balance_after``. Rows without
+    an account are filed under ``account``. A missing balance is computed
+    as a running balance from each account's current balance:
+    ``opening(name)`` in minor units if given and not None (the live
+    balance of an open account, which the ledger may not record), else
+    its last balance in the ledger, else 0.
+
+    Each chunk is ordered by time and appended with ``Ledger.extend_rows``;
+    like any append, a timestamp older than the ledger's newest record is
+    clamped forward, so historical statements belong in a ledger before
+    live transfers. Returns the range of sequence numbers assigned.
+    """
+    format = format or detect_format(path)
+    start = len(ledger)
+    # Running balance per account name, carried from chunk to chunk
+    carry = {}
+    for frame in _READERS[format](path, chunk_rows):
+        if len(frame):
+            rows, names = _rows_from_frame(ledger, frame, account, carry, opening)
+            ledger.extend_rows(rows, names)
+    return range(start, len(ledger))
+
+
+def _columns(ledger, seqs, rows):
+    """One export chunk: numpy columns, names as (codes, dictionary) pairs"""
+    return {
+        'seq': np.asarray(seqs, dtype=np.int64),
+        'ts': rows['ts'],
+        'type': (rows['type'].astype(np.int32), list(RECORD_TYPES)),
+        'account': _dictionary(ledger, rows['account']),
+        'counterparty': _dictionary(ledger, rows['counterparty']),
+        'description': _dictionary(ledger, rows['description']),
+        'amount_minor': rows['amount'],
+        'balance_minor': rows['balance'],
+    }
+
+
+def _dictionary(ledger, ids):
+    """Chunk-local dictionary encoding of name ids; code -1 for no name"""
+    unique, codes = np.unique(ids, return_inverse=True)
+    names = [ledger.name(name_id) for name_id in unique.tolist()]
+    codes = codes.astype(np.int32).reshape(-1)
+    if len(unique) and unique[0] < 0:
+        codes -= 1
+        names = names[1:]
+    return codes, names
+
+
+def _write_csv(path, chunks):
+    import pandas as pd
+
+    with open(path, 'w', newline='') as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for columns in chunks:
+            frame = pd.DataFrame({
+                name: pd.Categorical.from_codes(*columns[name]) if name in STRING_COLUMNS else columns[name]
+                for name in COLUMNS
+            })
+            frame.to_csv(f, header=False, index=False)
+
+
+def _write_arrow(path, chunks, parquet=False):
+    import pyarrow as pa
+
+    names = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([
+        ('seq', pa.int64()), ('ts', pa.int64()), ('type', names), ('account', names),
+        ('counterparty', names), ('description', names),
+        ('amount_minor', pa.int64()), ('balance_minor', pa.int64()),
+    ])
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        # The stream format allows a new dictionary per batch; the file format does not
+        writer = pa.ipc.new_stream(path, schema)
+    try:
+        for columns in chunks:
+            arrays = []
+            for name in COLUMNS:
+                if name in STRING_COLUMNS:
+                    codes, dictionary = columns[name]
+                    arrays.append(pa.DictionaryArray.from_arrays(
+                        pa.array(codes, type=pa.int32(), mask=codes < 0), pa.array(dictionary, type=pa.string())))
+                else:
+                    arrays.append(pa.array(columns[name], type=pa.int64()))
+            batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+            if parquet:
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+    finally:
+        writer.close()
+
+
+def _read_csv(path, chunk_rows):
+    import pandas as pd
+
+    # Only empty fields are missing; a description of "NA" is text
+    yield from pd.read_csv(path, chunksize=chunk_rows, keep_default_na=False, na_values=[''],
+                           dtype={name: 'category' for name in STRING_COLUMNS})
+
+
+def _read_parquet(path, chunk_rows):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def _read_arrow(path, chunk_rows):
+    import pyarrow as pa
+
+    with pa.ipc.open_stream(path) as reader:
+        for batch in reader:
+            yield batch.to_pandas()
+
+
+_WRITERS = {
+    'csv': _write_csv,
+    'arrow': _write_arrow,
+    'parquet': lambda path, chunks: _write_arrow(path, chunks, parquet=True),
+}
+_READERS = {
+    'csv': _read_csv,
+    'arrow': _read_arrow,
+    'parquet': _read_parquet,
+}
+
+
+def _rows_from_frame(ledger, frame, account, carry, opening):
+    """``RECORD_DTYPE`` rows and their name dictionary for one imported chunk"""
+    names = []
+
+    def strings(column, default=None):
+        if column not in frame:
+            if default is None:
+                return np.full(len(frame), -1, dtype=np.int32)
+            names.append(default)
+            return np.full(len(frame), len(names) - 1, dtype=np.int32)
+        values = frame[column].astype('category')
+        codes = values.cat.codes.to_numpy(dtype=np.int32)
+        offset = len(names)
+        names.extend(str(name) for name in values.cat.categories)
+        if default is not None and (codes < 0).any():
+            names.append(default)
+            codes = np.where(codes < 0, len(names) - 1 - offset, codes)
+        return np.where(codes >= 0, codes + offset, -1).astype(np.int32)
+
+    if 'ts' in frame:
+        ts = frame['ts'].to_numpy(dtype=np.int64)
+    elif 'date' in frame:
+        ts = _local_epoch(frame['date'])
+    else:
+        ts = np.full(len(frame), int(time.time()), dtype=np.int64)
+
+    order = np.argsort(ts, kind='stable')
+    frame = frame.iloc[order]
+    rows = np.empty(len(frame), dtype=RECORD_DTYPE)
+    rows['ts'] = ts[order]
+    rows['type'] = _type_codes(frame['type'])
+    rows['account'] = strings('account', account)
+    rows['counterparty'] = strings('counterparty')
+    rows['description'] = strings('description')
+    rows['amount'] = _minor_column(frame, 'amount_minor', 'amount')
+
+    if 'balance_minor' in frame or 'balance_after' in frame:
+        rows['balance'] = _minor_column(frame, 'balance_minor', 'balance_after')
+    else:
+        rows['balance'] = _running_balances(ledger, rows, names, carry, opening)
+    return rows, names
+
+
+def _type_codes(column):
+    values = column.astype('category')
+    codes = []
+    for kind in values.cat.categories:
+        kind = str(kind).strip().lower()
+        if kind not in RECORD_TYPES:
+            raise ValueError(f"Unknown record type: {kind!r}")
+        codes.append(RECORD_TYPES.index(kind))
+    values = values.cat.codes.to_numpy()
+    if (values < 0).any():
+        raise ValueError("Record without a type")
+    return np.array(codes, dtype=np.int8)[values]
+
+
+def _minor_column(frame, minor, rupees):
+    """Exact minor units from a minor-unit column or a rupee amount column"""
+    if minor in frame:
+        return frame[minor].to_numpy(dtype=np.int64)
+    values = frame[rupees].to_numpy()
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int64) * MINOR_UNITS
+    if values.dtype.kind == 'f':
+        if np.isnan(values).any():
+            raise ValueError(f"Missing {rupees} value")
+        # Rupee floats carry at most two decimals; round to the nearest paisa
+        return np.rint(values * MINOR_UNITS).astype(np.int64)
+    return np.array([to_minor(value) for value in values.tolist()], dtype=np.int64)
+
+
+def _running_balances(ledger, rows, names, carry, opening):
+    """Balance after each row, continuing from each account's balance in ``carry``
+
+    Accounts not yet in ``carry`` start from ``_opening_balance``; ``carry``
+    is left holding each account's balance after its last row.
+    """
+    signed = np.where(rows['type'] == RECORD_TYPES.index('debit'), -rows['amount'], rows['amount'])
+    accounts = rows['account']
+    order = np.argsort(accounts, kind='stable')
+    grouped = accounts[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(grouped)) + 1]
+    sizes = np.diff(np.r_[starts, len(grouped)])
+
+    group_names = [names[name_id] if name_id >= 0 else None for name_id in grouped[starts].tolist()]
+    opening_balances = [
+        carry[name] if name in carry else _opening_balance(ledger, name, opening) for name in group_names
+    ]
+    running = np.cumsum(signed[order])
+    # Restart the cumulative sum at every account boundary
+    before = running[starts] - signed[order][starts]
+    running += np.repeat(np.array(opening_balances, dtype=np.int64) - before, sizes)
+    carry.update(zip(group_names, running[starts + sizes - 1].tolist()))
+    balances = np.empty(len(rows), dtype=np.int64)
+    balances[order] = running
+    return balances
+
+
+def _opening_balance(ledger, name, opening):
+    if name is None:
+        return 0
+    balance = opening(name) if opening is not None else None
+    if balance is not None:
+        return balance
+    last = ledger.last(1, account=name)
+    return to_minor(last[0]['balance_after']) if last else 0
+
+
+def _local_epoch(dates):
+    """Epoch seconds for naive local date strings, like ``Ledger`` parses them"""
+    import pandas as pd
+
+    naive = pd.to_datetime(dates, format='ISO8601').to_numpy().astype('datetime64[s]').astype(np.int64)
+    days, inverse = np.unique(naive // 86400, return_inverse=True)
+    # UTC offset of each distinct calendar day, taken at local noon
+    epoch = datetime(1970, 1, 1)
+    offsets = np.array([
+        int((epoch + timedelta(days=day, hours=12)).timestamp()) - (day * 86400 + 43200)
+        for day in days.tolist()
+    ], dtype=np.int64)
+    return naive + offsets[inverse.reshape(-1)]
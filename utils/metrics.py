@@ -0,0 +1,321 @@
+import functools
+import json
+import math
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+
+# Latency buckets in seconds: 10 us doubling up to ~42 s, then +Inf
+LATENCY_BUCKETS = tuple(1e-5 * 2 ** k for k in range(23))
+
+
+class Counter:
+    """Monotonic count, e.g. STT failures or auth rejections"""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """A value that goes up and down, such as a queue depth"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Bucketed distribution with exact count, sum, min and max.
+
+    ``observe`` is a bisect over the bucket bounds plus a few additions
+    under a lock, so it is cheap enough for every command. Quantiles are
+    interpolated within a bucket, so they are accurate to the bucket width
+    (a factor of two for the latency buckets).
+    """
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'min', 'max', '_lock')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def time(self):
+        """Context manager observing the seconds spent inside it"""
+        return _Timer(self)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                value = lower + (upper - lower) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+_KINDS = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+
+class MetricsRegistry:
+    """Named, labelled counters, gauges and histograms with exporters.
+
+    ``counter``, ``gauge`` and ``histogram`` return the metric for a name
+    and label set, creating it on first use; hot paths fetch their metric
+    once and keep it. ``timer`` and ``timed`` wrap code in a histogram of
+    seconds. ``to_prometheus`` renders the text exposition format and
+    ``snapshot`` a JSON-serializable dict of every series.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help='', **labels):
+        return self._get('counter', name, help, labels)
+
+    def gauge(self, name, help='', **labels):
+        return self._get('gauge', name, help, labels)
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS, **labels):
+        return self._get('histogram', name, help, labels, buckets)
+
+    def timer(self, name, **labels):
+        """``with metrics.timer('stage_seconds', stage='classify'): ...``"""
+        return self.histogram(name, **labels).time()
+
+    def timed(self, name, **labels):
+        """Decorator form of ``timer``"""
+        histogram = self.histogram(name, **labels)
+
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _Timer(histogram):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def series(self, name):
+        """``[(labels dict, metric)]`` for one family"""
+        family = self._families.get(name)
+        if family is None:
+            return []
+        return [(dict(labels), metric) for labels, metric in list(family['series'].items())]
+
+    def snapshot(self):
+        snapshot = {}
+        for name, family in list(self._families.items()):
+            series = []
+            for labels, metric in list(family['series'].items()):
+                value = metric.summary() if family['kind'] == 'histogram' else metric.value
+                series.append({'labels': dict(labels), 'value': value})
+            snapshot[name] = {'type': family['kind'], 'help': family['help'], 'series': series}
+        return snapshot
+
+    def to_json(self):
+        return json.dumps({'taken_at': time.time(), 'metrics': self.snapshot()})
+
+    def to_prometheus(self):
+        lines = []
+        for name, family in sorted(self._families.items()):
+            if family['help']:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for labels, metric in sorted(family['series'].items()):
+                if family['kind'] != 'histogram':
+                    lines.append(f"{name}{_labels(labels)} {_number(metric.value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.bounds + (math.inf,), metric.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(metric.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._families = {}
+
+    def _get(self, kind, name, help, labels, buckets=None):
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        family = self._families.get(name)
+        if family is not None:
+            metric = family['series'].get(key)
+            if metric is not None and family['kind'] == kind:
+                return metric
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = {'kind': kind, 'help': help, 'series': {}}
+            elif family['kind'] != kind:
+                raise ValueError(f"Metric {name!r} is a {family['kind']}, not a {kind}")
+            metric = family['series'].get(key)
+            if metric is None:
+                metric = Histogram(buckets) if kind == 'histogram' else _KINDS[kind]()
+                family['series'][key] = metric
+            return metric
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for label, value in labels:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{label}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class SamplingProfiler:
+    """Statistical profiler: samples thread stacks from a background thread.
+
+    Every ``interval`` seconds the sampler reads ``sys._current_frames()``
+    and tallies each stack, so the profiled code runs unmodified and the
+    cost is paid by the sampler thread alone. ``collapsed()`` returns the
+    folded-stack text that flamegraph.pl and speedscope read; ``top()``
+    the functions seen most often. Off until ``start`` is called.
+    """
+
+    def __init__(self, interval=0.005, max_depth=48, thread_prefixes=None):
+        self.interval = interval
+        self.max_depth = max_depth
+        # Only sample threads whose name starts with one of these (all when None)
+        self.thread_prefixes = tuple(thread_prefixes) if thread_prefixes else None
+        self.samples = 0
+        self._stacks = _Tally()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def collapsed(self):
+        with self._lock:
+            return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self._stacks.most_common())
+
+    def top(self, n=15):
+        """``[(function, self_share, total_share)]`` by self samples"""
+        own = _Tally()
+        total = _Tally()
+        with self._lock:
+            stacks = list(self._stacks.items())
+            samples = self.samples
+        for stack, count in stacks:
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        return [(function, count / samples, total[function] / samples) for function, count in own.most_common(n)]
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own_id:
+                    continue
+                name = names.get(ident, '')
+                if self.thread_prefixes is not None and not name.startswith(self.thread_prefixes):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                sampled.append(tuple(reversed(stack)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += len(sampled)
+
+
+# Process-wide registry the app's components report to
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,37 @@
+import numbers
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+# Amounts are stored as integer paise; one rupee is 100 minor units
+MINOR_UNITS = 100
+
+
+def to_minor(amount):
+    """Exact integer minor units for an amount in rupees.
+
+    Accepts ints, Decimals, numeric strings and floats. Floats go through
+    their shortest repr, so ``0.1`` becomes 10 paise rather than its binary
+    expansion. Fractions of a paisa are rounded half-to-even. Raises
+    ValueError for anything that is not a finite number.
+    """
+    if isinstance(amount, bool):
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if isinstance(amount, numbers.Integral):
+        return int(amount) * MINOR_UNITS
+    if isinstance(amount, str):
+        amount = amount.strip()
+        if amount.isdigit():
+            return int(amount) * MINOR_UNITS
+    elif isinstance(amount, float):
+        amount = repr(amount)
+    try:
+        value = Decimal(amount)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Invalid amount: {amount!r}") from None
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {amount!r}")
+    return int((value * MINOR_UNITS).to_integral_value(ROUND_HALF_EVEN))
+
+
+def from_minor(units):
+    """Exact Decimal rupees for integer minor units, e.g. 995050 -> Decimal('9950.50')"""
+    return Decimal(int(units)).scaleb(-2)
@@ -0,0 +1,210 @@
+import itertools
+import queue
+import threading
+import time
+
+from .cache import LRUCache
+from .metrics import REGISTRY
+
+
+class Job:
+    """One voice command moving through the pipeline.
+
+    ``status`` is 'queued', then the stage it is in ('recording',
+    'transcribing', 'classifying', 'executing'), and finally 'done' or
+    'failed'. ``stage`` keeps the last stage entered, so a failed job
+    records where it stopped.
+    """
+
+    def __init__(self, job_id, source=None, clip=None, handler=None):
+        self.id = job_id
+        self.source = source
+        self.clip = clip
+        self.handler = handler
+        self.status = 'queued'
+        self.stage = None
+        self.text = None
+        self.intent = None
+        self.response = None
+        self.error = None
+        self.created = time.monotonic()
+        self.finished = None
+        self._queued_at = None
+        self._on_finish = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.created
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def _finish(self, error=None):
+        self.error = error
+        self.status = 'failed' if error is not None else 'done'
+        self.finished = time.monotonic()
+        if self._on_finish is not None:
+            self._on_finish(self)
+        self._done.set()
+
+
+class _Stage:
+    """A bounded queue drained by a fixed set of daemon worker threads.
+
+    Reports to ``metrics`` how long jobs wait in the queue and run in the
+    stage, the queue depth, and failures by exception type.
+    """
+
+    def __init__(self, name, status, run, workers, maxsize, advance, metrics):
+        self.name = name
+        self.status = status
+        self.queue = queue.Queue(maxsize)
+        self._run = run
+        self._advance = advance
+        self._metrics = metrics
+        self._seconds = metrics.histogram('voice_stage_seconds', "Time spent running in a pipeline stage",
+                                          stage=name)
+        self._waited = metrics.histogram('voice_queue_wait_seconds', "Time queued before a pipeline stage",
+                                         stage=name)
+        self._depth = metrics.gauge('voice_queue_depth', "Jobs waiting for a pipeline stage", stage=name)
+        for n in range(workers):
+            threading.Thread(target=self._work, name=f"{name}-{n}", daemon=True).start()
+
+    def put(self, job, timeout=None):
+        job._queued_at = time.perf_counter()
+        self.queue.put(job, timeout=timeout)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            started = time.perf_counter()
+            self._waited.observe(started - job._queued_at)
+            self._depth.set(self.queue.qsize())
+            job.status = job.stage = self.status
+            try:
+                self._run(job)
+            except Exception as e:
+                self._seconds.observe(time.perf_counter() - started)
+                self._metrics.counter('voice_stage_failures_total', "Jobs that failed in a pipeline stage",
+                                      stage=self.name, error=type(e).__name__).inc()
+                job._finish(e)
+            else:
+                self._seconds.observe(time.perf_counter() - started)
+                self._advance(job)
+            finally:
+                self.queue.task_done()
+
+
+class CommandPipeline:
+    """Record → transcribe → classify → execute, as separate queued stages.
+
+    Every stage has its own worker threads and bounded queue, so a slow
+    speech-to-text call does not hold up recording or execution for other
+    jobs, and throughput is set by the slowest stage rather than the sum of
+    all four. Independent transcriptions (such as the three clips of a PIN
+    change) run concurrently on the STT workers.
+
+    ``transcribe(clip)`` returns text and ``classify(text)`` an intent
+    string. A job skips the stages it already has input for: submitting a
+    clip skips recording, and a job without a handler stops after
+    transcription. Jobs are kept for polling by id until ``history`` newer
+    ones replace them. Per-stage run and queue-wait times, failures and
+    end-to-end command latency go to ``metrics``.
+    """
+
+    def __init__(self, transcribe, classify, record_workers=1, stt_workers=4,
+                 intent_workers=1, execute_workers=2, max_queue=64, history=1024, metrics=REGISTRY):
+        self.transcribe = transcribe
+        self.classify = classify
+        self._jobs = LRUCache(history)
+        self._ids = itertools.count(1)
+        self._stages = {
+            name: _Stage(name, status, run, workers, max_queue, self._advance, metrics)
+            for name, status, run, workers in (
+                ('record', 'recording', self._record, record_workers),
+                ('transcribe', 'transcribing', self._transcribe, stt_workers),
+                ('classify', 'classifying', self._classify, intent_workers),
+                ('execute', 'executing', self._execute, execute_workers),
+            )
+        }
+        self._completed = {
+            outcome: metrics.histogram('voice_command_seconds', "Submit-to-finish time of a voice command job",
+                                       outcome=outcome)
+            for outcome in ('done', 'failed')
+        }
+
+    def submit(self, source=None, clip=None, handler=None, timeout=None):
+        """Queue a job and return it without waiting.
+
+        ``source`` is a zero-argument callable returning an AudioClip (e.g.
+        a recorder method), used when ``clip`` is not given. ``handler(intent,
+        text, request_id)`` executes the command and returns the response;
+        ``request_id`` is the clip digest, so a re-run job is recognizable as
+        the same request. Without a handler the job only transcribes. Raises
+        ``queue.Full`` if the first stage stays full for ``timeout`` seconds.
+        """
+        if source is None and clip is None:
+            raise ValueError("submit needs a source or a clip")
+        job = Job(f"job-{next(self._ids)}", source, clip, handler)
+        job._on_finish = self._observe
+        self._jobs.put(job.id, job)
+        self._stages[self._next_stage(job)].put(job, timeout=timeout)
+        return job
+
+    def transcribe_many(self, clips, timeout=None):
+        """Submit clips for concurrent transcription; returns their jobs"""
+        return [self.submit(clip=clip, timeout=timeout) for clip in clips]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def pending(self):
+        """Jobs waiting or running in each stage"""
+        return {name: stage.queue.unfinished_tasks for name, stage in self._stages.items()}
+
+    def _observe(self, job):
+        self._completed[job.status].observe(job.elapsed)
+
+    def _next_stage(self, job):
+        if job.clip is None:
+            return 'record'
+        if job.text is None:
+            return 'transcribe'
+        if job.handler is None:
+            return None
+        if job.intent is None:
+            return 'classify'
+        if job.response is None:
+            return 'execute'
+        return None
+
+    def _advance(self, job):
+        stage = self._next_stage(job)
+        if stage is None:
+            job._finish()
+        else:
+            job.status = 'queued'
+            # Blocking put: a full downstream stage pushes back on this one
+            self._stages[stage].put(job)
+
+    def _record(self, job):
+        job.clip = job.source()
+        if job.clip is None:
+            raise RuntimeError("No speech detected")
+
+    def _transcribe(self, job):
+        job.text = self.transcribe(job.clip) or ''
+        if not job.text:
+            raise RuntimeError("Could not understand audio")
+
+    def _classify(self, job):
+        job.intent = self.classify(job.text)
+
+    def _execute(self, job):
+        job.response = job.handler(job.intent, job.text, job.clip.digest)
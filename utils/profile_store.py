@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import pickle
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileStore:
+    """Incremental voice profile store.
+
+    Embeddings live in a float32 file memory-mapped as a ``(capacity, dim)``
+    array. Profile metadata is an append-only JSON-lines log whose first
+    line names the embeddings file; after that there is one line per
+    enrollment, and the last line for a user wins.
+
+    Writes are log-structured: an enrollment always takes a fresh embedding
+    row, flushes it, then appends and fsyncs the metadata line, which is the
+    commit point. A crash leaves either the old profile or the new one, and
+    never touches other users' data. Superseded rows are reclaimed by
+    ``compact()``, which writes a new embeddings file and a new log naming
+    it, then swaps the log in with ``os.replace`` as a single atomic step.
+
+    Startup parses only the small metadata log and maps the embedding file;
+    no embedding is read until it is used. Writers (``put``, ``compact``)
+    are serialized by a lock, so concurrent enrollments never share a row.
+    """
+
+    LOG_FILE = "profiles.log"
+
+    def __init__(self, directory="voice_profiles", dim=13, capacity=1024):
+        self.directory = directory
+        self.dim = dim
+        self.profiles = {}
+        self._next_row = 0
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._log_path = os.path.join(directory, self.LOG_FILE)
+        if not os.path.exists(self._log_path):
+            self._write_log(self._log_path, "embeddings-000000.f32", [])
+        self._load_log()
+        self._open_embeddings(max(capacity, self._next_row))
+        self._log = open(self._log_path, 'a')
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def __contains__(self, user_id):
+        return user_id in self.profiles
+
+    @property
+    def user_ids(self):
+        return list(self.profiles)
+
+    def put(self, user_id, embedding, **meta):
+        """Write one profile without touching any other"""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            row = self._next_row
+            if row >= len(self._embeddings):
+                self._open_embeddings(2 * len(self._embeddings))
+            self._embeddings[row] = vector
+            self._embeddings.flush()
+            self._next_row += 1
+
+            profile = dict(meta, user_id=user_id, row=row)
+            self._log.write(json.dumps(profile) + "\n")
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self.profiles[user_id] = profile
+
+            if self._next_row > 2 * len(self.profiles) + 1024:
+                self.compact()
+            return profile
+
+    def get_embedding(self, user_id):
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            return None
+        return np.array(self._embeddings[profile['row']])
+
+    def embeddings_for(self, user_ids):
+        """Embeddings for many users as one ``(n, dim)`` array"""
+        rows = [self.profiles[user_id]['row'] for user_id in user_ids]
+        return np.asarray(self._embeddings[rows])
+
+    def compact(self):
+        """Rewrite the store keeping only the live row of each profile"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        user_ids = self.user_ids
+        live = self.embeddings_for(user_ids) if user_ids else np.zeros((0, self.dim), dtype=np.float32)
+        capacity = max(1024, 2 * len(user_ids))
+
+        generation = int(self._embeddings_file[len("embeddings-"):-len(".f32")]) + 1
+        embeddings_file = f"embeddings-{generation:06d}.f32"
+        compacted = np.memmap(os.path.join(self.directory, embeddings_file), dtype=np.float32,
+                              mode='w+', shape=(capacity, self.dim))
+        compacted[:len(user_ids)] = live
+        compacted.flush()
+        del compacted
+
+        profiles = [dict(self.profiles[user_id], row=row) for row, user_id in enumerate(user_ids)]
+        tmp_log = self._log_path + ".tmp"
+        self._write_log(tmp_log, embeddings_file, profiles)
+
+        old_embeddings = self._embeddings_path
+        self._embeddings = None
+        self._log.close()
+        os.replace(tmp_log, self._log_path)
+        os.remove(old_embeddings)
+
+        self.profiles = {}
+        self._next_row = 0
+        self._load_log()
+        self._open_embeddings(capacity)
+        self._log = open(self._log_path, 'a')
+
+    def import_pickle(self, path, embed=None, embedding_key='embedding'):
+        """Migrate profiles from the legacy whole-dict pickle file.
+
+        Entries without an embedding (the original store only kept
+        ``enrolled_at`` and ``audio_file``) are re-embedded from their
+        recording with ``embed(audio_file)`` when that file still exists.
+        Returns ``(imported, skipped)``, skipped being the user ids that
+        could not be migrated; each one is also logged.
+        """
+        with open(path, 'rb') as f:
+            legacy = pickle.load(f)
+        imported = 0
+        skipped = []
+        for user_id, profile in legacy.items():
+            embedding = profile.get(embedding_key)
+            audio_file = profile.get('audio_file')
+            if embedding is None and embed is not None and audio_file and os.path.exists(audio_file):
+                embedding = embed(audio_file)
+            if embedding is None:
+                logger.warning("Skipped legacy voice profile %r: no embedding and no usable audio_file (%r)",
+                               user_id, audio_file)
+                skipped.append(user_id)
+                continue
+            meta = {k: v for k, v in profile.items() if k != embedding_key}
+            self.put(user_id, embedding, **meta)
+            imported += 1
+        return imported, skipped
+
+    def close(self):
+        if self._embeddings is not None:
+            self._embeddings.flush()
+        self._log.close()
+
+    def _write_log(self, path, embeddings_file, profiles):
+        with open(path, 'w') as f:
+            f.write(json.dumps({'embeddings_file': embeddings_file, 'dim': self.dim}) + "\n")
+            for profile in profiles:
+                f.write(json.dumps(profile) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load_log(self):
+        with open(self._log_path, 'rb') as f:
+            data = f.read()
+        committed = data.rfind(b"\n") + 1
+        if committed < len(data):
+            # Torn append from a crash; it was never committed
+            os.truncate(self._log_path, committed)
+        header_end = data.index(b"\n") + 1
+        header = json.loads(data[:header_end])
+        body = data[header_end:committed].rstrip(b"\n")
+        # One json.loads over the whole log instead of one call per line
+        profiles = json.loads(b"[" + body.replace(b"\n", b",") + b"]") if body else []
+        for profile in profiles:
+            self.profiles[profile['user_id']] = profile
+        if profiles:
+            self._next_row = max(profile['row'] for profile in profiles) + 1
+
+        self._embeddings_file = header['embeddings_file']
+        self._embeddings_path = os.path.join(self.directory, self._embeddings_file)
+        # Leftovers from a compaction interrupted before or after its commit
+        for name in os.listdir(self.directory):
+            if name.startswith("embeddings-") and name != self._embeddings_file:
+                os.remove(os.path.join(self.directory, name))
+
+    def _open_embeddings(self, capacity):
+        row_bytes = self.dim * 4
+        if not os.path.exists(self._embeddings_path):
+            open(self._embeddings_path, 'wb').close()
+        current = os.path.getsize(self._embeddings_path)
+        if current < capacity * row_bytes:
+            os.truncate(self._embeddings_path, capacity * row_bytes)
+        capacity = max(capacity, current // row_bytes)
+        self._embeddings = np.memmap(self._embeddings_path, dtype=np.float32, mode='r+',
+                                     shape=(capacity, self.dim))
@@ -1,51 +1,155 @@
-import speech_recognition as sr
-import wave
 import os
+from contextlib import contextmanager
 from datetime import datetime
 
+from .audio import AudioClip
+from .metrics import REGISTRY
+from .streaming import EnergyVAD, BufferedSTT, microphone_chunks, stream_transcribe
+from .stt import GoogleSTT
+
 class RealTimeRecorder:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        self.setup_microphone()
+    """Microphone recording and transcription for one user session.
+
+    Nothing touches the audio device until the first recording: the
+    microphone is opened and calibrated for ambient noise on first use, so
+    constructing a recorder is free and works on hosts with no audio input.
+    ``speech_recognition`` is imported on first use as well.
+    """
+
+    def __init__(self, stt_backend=None, calibration_duration=1):
+        # Anything with transcribe(clip): a backend from utils.stt or an STTWorkerPool
+        self._stt_backend = stt_backend
+        self.calibration_duration = calibration_duration
+        self.calibrated = False
+        self._recognizer = None
+        self._microphone = None
+    
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            import speech_recognition as sr
+            self._recognizer = sr.Recognizer()
+        return self._recognizer
+    
+    @property
+    def microphone(self):
+        """The input device, opened on first access"""
+        if self._microphone is None:
+            import speech_recognition as sr
+            self._microphone = sr.Microphone()
+        return self._microphone
+    
+    @property
+    def stt_backend(self):
+        if self._stt_backend is None:
+            self._stt_backend = GoogleSTT(self.recognizer)
+        return self._stt_backend
     
     def setup_microphone(self):
         """Setup microphone with ambient noise adjustment"""
         try:
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            with self._listening():
+                pass
             print("✅ Microphone setup completed")
+            return True
         except Exception as e:
             print(f"❌ Microphone setup failed: {e}")
+            return False
+    
+    @contextmanager
+    def _listening(self):
+        """Open the microphone, calibrating the energy threshold the first time"""
+        with self.microphone as source:
+            if not self.calibrated:
+                self.recognizer.adjust_for_ambient_noise(source, duration=self.calibration_duration)
+                self.calibrated = True
+            yield source
+    
+    def record_clip(self, duration=5):
+        """Record audio from microphone into memory"""
+        try:
+            print(f"🎤 Recording for {duration} seconds...")
+            with self._listening() as source, REGISTRY.timer('audio_record_seconds', kind='clip'):
+                audio = self.recognizer.record(source, duration=duration)
+            return AudioClip.from_audio_data(audio)
+        except Exception as e:
+            print(f"❌ Recording error: {e}")
+            return None
     
     def record_audio(self, duration=5, filename=None):
-        """Record audio from microphone"""
+        """Record audio from microphone and save it as a WAV file"""
         if filename is None:
             filename = f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
         
+        clip = self.record_clip(duration)
+        if clip is None:
+            return None
         try:
-            print(f"🎤 Recording for {duration} seconds...")
-            with self.microphone as source:
-                audio = self.recognizer.record(source, duration=duration)
-            
-            # Save audio file
-            filepath = os.path.abspath(filename)
-            with open(filepath, "wb") as f:
-                f.write(audio.get_wav_data())
-            
+            filepath = clip.save(os.path.abspath(filename))
             print(f"✅ Recording saved: {filepath}")
             return filepath
         except Exception as e:
             print(f"❌ Recording error: {e}")
             return None
     
-    def speech_to_text(self, audio_filepath):
-        """Convert speech to text using Google Speech Recognition"""
+    def stream_command(self, backend=None, max_duration=6, end_silence_ms=500,
+                       chunks=None, sample_rate=16000, sample_width=2):
+        """Stream a spoken command, stopping at end of speech
+        
+        Yields TranscriptEvents: partial transcripts as the backend produces
+        them, then one 'final' event with the text and captured AudioClip.
+        ``backend`` defaults to Google recognition on the buffered utterance.
+        Pass ``chunks`` (e.g. streaming.wav_chunks) to run without a microphone.
+        """
+        if chunks is not None:
+            yield from self._stream(chunks, backend, sample_rate, sample_width, end_silence_ms)
+            return
+        with self._listening() as source:
+            yield from self._stream(microphone_chunks(source, max_duration), backend,
+                                    source.SAMPLE_RATE, source.SAMPLE_WIDTH, end_silence_ms)
+    
+    def listen_for_command(self, backend=None, max_duration=6, on_partial=None, chunks=None):
+        """Blocking wrapper around stream_command; returns (text, clip)"""
+        for event in self.stream_command(backend, max_duration, chunks=chunks):
+            if event.kind == 'partial':
+                if on_partial is not None:
+                    on_partial(event.text)
+            else:
+                return event.text, event.clip
+        return '', None
+    
+    def record_command(self, max_duration=6, end_silence_ms=500):
+        """Record one spoken command, stopping at end of speech, without transcribing"""
+        try:
+            with self._listening() as source, REGISTRY.timer('audio_record_seconds', kind='command'):
+                capture = BufferedSTT(lambda clip: '', source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                for event in self._stream(microphone_chunks(source, max_duration), capture,
+                                          source.SAMPLE_RATE, source.SAMPLE_WIDTH, end_silence_ms):
+                    if event.kind == 'final':
+                        return event.clip
+        except Exception as e:
+            print(f"❌ Recording error: {e}")
+        return None
+    
+    def _stream(self, chunks, backend, sample_rate, sample_width, end_silence_ms):
+        vad = EnergyVAD(sample_rate, sample_width, threshold=self.recognizer.energy_threshold,
+                        end_silence_ms=end_silence_ms)
+        if backend is None:
+            backend = BufferedSTT(self.speech_to_text, sample_rate, sample_width)
+        yield from stream_transcribe(chunks, backend, vad)
+    
+    def speech_to_text(self, audio):
+        """Convert speech to text with the configured STT backend
+        
+        ``audio`` is an AudioClip from record_clip or a WAV file path.
+        """
+        import speech_recognition as sr
         try:
-            with sr.AudioFile(audio_filepath) as source:
-                audio = self.recognizer.record(source)
-                text = self.recognizer.recognize_google(audio)
-                return text
+            clip = audio if isinstance(audio, AudioClip) else AudioClip.from_wav(audio)
+            text = self.stt_backend.transcribe(clip)
+            if not text:
+                REGISTRY.counter('stt_failures_total', backend='recorder', reason='no_text').inc()
+            return text if text else "Could not understand audio"
         except sr.UnknownValueError:
             return "Could not understand audio"
         except sr.RequestError as e:
@@ -0,0 +1,376 @@
+import math
+import threading
+import time
+from collections import deque, namedtuple
+
+from .ledger import DEBIT
+from .metrics import REGISTRY
+from .money import to_minor
+
+# Veto limits (counts, or amounts in rupees) and the anomaly flag settings.
+# The recipient limits apply to one sender's transfers to one recipient.
+# An amount is unusual when it is ``anomaly_z`` standard deviations above
+# the account's EWMA baseline, after ``warmup`` transfers and at or above
+# ``anomaly_min_amount``; ``alpha`` is the EWMA weight of each new transfer.
+# Limits are opt-in: TransactionProcessor runs no risk checks unless it is
+# given ``risk_limits`` (DEFAULT_LIMITS, or api_server.py --risk-limits).
+RiskLimits = namedtuple('RiskLimits', [
+    'per_minute', 'per_hour', 'hourly_amount', 'daily_amount',
+    'recipient_per_hour', 'recipient_daily_amount',
+    'anomaly_z', 'anomaly_min_amount', 'warmup', 'alpha',
+], defaults=(5, 30, 100000, 200000, 20, 200000, 4.0, 1000, 10, 0.1))
+DEFAULT_LIMITS = RiskLimits()
+# Nothing is vetoed; windows and baselines are still kept (benchmarks, back office)
+UNLIMITED = RiskLimits(*[math.inf] * 6)
+
+# ``reasons`` names the limits a transfer would break (a veto) or the
+# anomalies it shows (a flag); a transfer is allowed when only flags fire
+RiskDecision = namedtuple('RiskDecision', ['allowed', 'reasons'])
+ALLOW = RiskDecision(True, ())
+REASONS = {
+    'burst': "too many transfers in the last minute",
+    'hourly_count': "too many transfers in the last hour",
+    'hourly_amount': "hourly transfer limit reached",
+    'daily_amount': "daily transfer limit reached",
+    'recipient_velocity': "too many transfers to this recipient in the last hour",
+    'recipient_daily_amount': "daily limit for this recipient reached",
+    'unusual_amount': "amount is unusual for this account",
+}
+FLAGS = frozenset({'unusual_amount'})
+
+# (span, slots): a minute in 5 s slots, an hour in 1 min slots, a day in 15 min slots
+MINUTE, HOUR, DAY = (60, 12), (3600, 60), (86400, 96)
+# Idle (account, recipient) windows are dropped once there are this many pairs,
+# and again whenever the count doubles since the last sweep
+PRUNE_PAIRS = 10000
+
+
+class TransferBlocked(Exception):
+    """A transfer vetoed by the risk checks; ``decision`` says why"""
+
+    def __init__(self, decision):
+        super().__init__(", ".join(REASONS[reason] for reason in decision.reasons))
+        self.decision = decision
+
+
+class SlidingWindow:
+    """Sum and count over the last ``span`` seconds in a ring of ``slots`` buckets.
+
+    Each bucket covers ``span / slots`` seconds. Running totals are kept,
+    and moving forward subtracts only the buckets that fall out, so ``add``
+    and ``totals`` are O(1) amortized. The window slides a bucket at a
+    time, so it covers between ``span - span / slots`` and ``span``
+    seconds.
+    """
+
+    __slots__ = ('width', 'slots', 'sums', 'counts', 'head', 'sum', 'count')
+
+    def __init__(self, span, slots):
+        self.width = span // slots
+        self.slots = slots
+        self.sums = [0] * slots
+        self.counts = [0] * slots
+        self.head = 0
+        self.sum = 0
+        self.count = 0
+
+    def add(self, ts, amount):
+        bucket = ts // self.width
+        if bucket > self.head:
+            self._advance(bucket)
+        elif bucket <= self.head - self.slots:
+            return  # older than the window
+        i = bucket % self.slots
+        self.sums[i] += amount
+        self.counts[i] += 1
+        self.sum += amount
+        self.count += 1
+
+    def totals(self, now):
+        """``(sum, count)`` over the window ending at ``now``"""
+        bucket = now // self.width
+        if bucket > self.head:
+            self._advance(bucket)
+        return self.sum, self.count
+
+    def _advance(self, bucket):
+        if bucket - self.head >= self.slots:
+            self.sums = [0] * self.slots
+            self.counts = [0] * self.slots
+            self.sum = self.count = 0
+        else:
+            sums, counts, slots = self.sums, self.counts, self.slots
+            for expired in range(self.head + 1, bucket + 1):
+                i = expired % slots
+                self.sum -= sums[i]
+                self.count -= counts[i]
+                sums[i] = counts[i] = 0
+        self.head = bucket
+
+    def state(self):
+        return [self.head, self.sums, self.counts]
+
+    @classmethod
+    def restore(cls, span, slots, state):
+        window = cls(span, slots)
+        window.head, window.sums, window.counts = state[0], list(state[1]), list(state[2])
+        window.sum, window.count = sum(window.sums), sum(window.counts)
+        return window
+
+
+class _Sender:
+    """Windows and EWMA amount baseline for one source account"""
+
+    __slots__ = ('minute', 'hour', 'day', 'mean', 'var', 'n')
+
+    def __init__(self):
+        self.minute = SlidingWindow(*MINUTE)
+        self.hour = SlidingWindow(*HOUR)
+        self.day = SlidingWindow(*DAY)
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+
+
+class _Pair:
+    """Windows for one sender's transfers to one recipient"""
+
+    __slots__ = ('hour', 'day')
+
+    def __init__(self):
+        self.hour = SlidingWindow(*HOUR)
+        self.day = SlidingWindow(*DAY)
+
+
+class RiskEngine:
+    """Streaming velocity, cap and anomaly checks for transfers.
+
+    Subscribes to the ledger and folds every debit into per-account
+    minute/hour/day windows and an EWMA baseline of amounts, and into
+    hour/day windows per (account, recipient) pair, so one sender's
+    payments never count against another's. Nothing ever scans the
+    ledger: each debit is O(1) to fold in and ``check`` reads a handful of
+    running totals, however long the history is. That is still about
+    12 us per transfer on the suite's process_transfer path (p50 23 ->
+    36 us, ``process_transfer_risk``): some 4 us to check and 7 us to fold
+    the debit into five windows and the baseline.
+
+    ``check`` returns a RiskDecision: vetoed when the transfer would break
+    one of ``limits``, flagged (allowed, with reasons) when its amount is
+    far above the account's baseline. AccountStore calls it under the
+    source account's lock, so transfers from one account are checked
+    against each other's effects; ``check_many`` does the same for a batch,
+    counting each allowed item against the ones after it. ``flagged``
+    keeps the latest flags for review.
+
+    ``snapshot`` returns the state as JSON-ready data for the ledger's
+    ``state_provider``; a new engine restores it from ``ledger.state`` and
+    only folds in the rows appended after it. Without a snapshot, and for
+    bulk imports, only the last ``replay_limit`` rows of a block are
+    folded in: the windows only need the last day, and older amounts have
+    all but decayed out of the baselines.
+    """
+
+    def __init__(self, ledger, limits=None, clock=time.time, replay_limit=200000, flag_history=1000):
+        self.ledger = ledger
+        self.limits = limits or DEFAULT_LIMITS
+        self.clock = clock
+        self.replay_limit = replay_limit
+        self.flagged = deque(maxlen=flag_history)
+        self._senders = {}
+        self._pairs = {}
+        self._prune_at = PRUNE_PAIRS
+        self._seen = 0
+        self._restored = 0
+        self._lock = threading.Lock()
+        self._set_caps()
+        self._outcomes = {
+            outcome: REGISTRY.counter('risk_decisions_total', "Transfer risk checks by outcome", outcome=outcome)
+            for outcome in ('allowed', 'flagged', 'blocked')
+        }
+        self._restore(ledger.state.get('risk'))
+        ledger.subscribe(self._on_rows, replay=True)
+
+    def check(self, account_id, recipient, amount):
+        """Decide on a transfer of ``amount`` rupees"""
+        return self.check_minor(account_id, recipient, to_minor(amount))
+
+    def check_minor(self, account_id, recipient, amount):
+        """``check`` for an amount already in minor units"""
+        now = int(self.clock())
+        with self._lock:
+            reasons = self._reasons(now, account_id, recipient, amount)
+        return self._decide(now, account_id, recipient, amount, reasons)
+
+    def check_many(self, items):
+        """Decide on ``(account_id, recipient, amount in minor units)`` items in order.
+
+        Each allowed item counts against the limits of the items after it,
+        as if they had been checked and committed one at a time.
+        """
+        now = int(self.clock())
+        decisions = []
+        senders = {}
+        pairs = {}
+        with self._lock:
+            for account_id, recipient, amount in items:
+                pending = senders.get(account_id, (0, 0, 0, 0))
+                pair_pending = pairs.get((account_id, recipient), (0, 0))
+                reasons = self._reasons(now, account_id, recipient, amount, pending, pair_pending)
+                decision = self._decide(now, account_id, recipient, amount, reasons)
+                if decision.allowed:
+                    minute_count, hour_sum, hour_count, day_sum = pending
+                    senders[account_id] = (minute_count + 1, hour_sum + amount, hour_count + 1, day_sum + amount)
+                    pairs[account_id, recipient] = (pair_pending[0] + 1, pair_pending[1] + amount)
+                decisions.append(decision)
+        return decisions
+
+    def set_limits(self, limits):
+        with self._lock:
+            self.limits = limits
+            self._set_caps()
+
+    def window_totals(self, account_id):
+        """``{'minute'|'hour'|'day': (amount in minor units, count)}`` for an account"""
+        now = int(self.clock())
+        with self._lock:
+            sender = self._senders.get(account_id)
+            if sender is None:
+                return {'minute': (0, 0), 'hour': (0, 0), 'day': (0, 0)}
+            return {'minute': sender.minute.totals(now), 'hour': sender.hour.totals(now),
+                    'day': sender.day.totals(now)}
+
+    def snapshot(self):
+        """JSON-ready state; accounts idle for a day keep only their baseline, idle pairs are dropped"""
+        now = int(self.clock())
+        with self._lock:
+            senders = {}
+            for account_id, sender in self._senders.items():
+                entry = {'ewma': [sender.mean, sender.var, sender.n]}
+                if sender.day.totals(now)[1]:
+                    entry.update(minute=sender.minute.state(), hour=sender.hour.state(), day=sender.day.state())
+                senders[account_id] = entry
+            self._prune(now)
+            pairs = [[account_id, recipient, pair.hour.state(), pair.day.state()]
+                     for (account_id, recipient), pair in self._pairs.items()]
+            return {'seq': self._seen, 'senders': senders, 'pairs': pairs}
+
+    def _reasons(self, now, account_id, recipient, amount, pending=(0, 0, 0, 0), pair_pending=(0, 0)):
+        # ``pending``: (minute count, hour sum, hour count, day sum) not yet in the windows
+        limits = self.limits
+        minute_count, hour_sum, hour_count, day_sum = pending
+        reasons = []
+        sender = self._senders.get(account_id)
+        if sender is not None:
+            minute_count += sender.minute.totals(now)[1]
+            window_sum, window_count = sender.hour.totals(now)
+            hour_sum += window_sum
+            hour_count += window_count
+            day_sum += sender.day.totals(now)[0]
+        if minute_count + 1 > limits.per_minute:
+            reasons.append('burst')
+        if hour_count + 1 > limits.per_hour:
+            reasons.append('hourly_count')
+        if hour_sum + amount > self._hourly_amount:
+            reasons.append('hourly_amount')
+        if day_sum + amount > self._daily_amount:
+            reasons.append('daily_amount')
+        if sender is not None and sender.n >= limits.warmup and amount >= self._anomaly_min \
+                and amount > sender.mean + limits.anomaly_z * math.sqrt(sender.var):
+            reasons.append('unusual_amount')
+        pair_count, pair_sum = pair_pending
+        pair = self._pairs.get((account_id, recipient))
+        if pair is not None:
+            pair_count += pair.hour.totals(now)[1]
+            pair_sum += pair.day.totals(now)[0]
+        if pair_count + 1 > limits.recipient_per_hour:
+            reasons.append('recipient_velocity')
+        if pair_sum + amount > self._recipient_daily_amount:
+            reasons.append('recipient_daily_amount')
+        return reasons
+
+    def _decide(self, now, account_id, recipient, amount, reasons):
+        if not reasons:
+            self._outcomes['allowed'].inc()
+            return ALLOW
+        decision = RiskDecision(all(reason in FLAGS for reason in reasons), tuple(reasons))
+        if decision.allowed:
+            self._outcomes['flagged'].inc()
+            self.flagged.append((now, account_id, recipient, amount, decision.reasons))
+        else:
+            self._outcomes['blocked'].inc()
+        return decision
+
+    def _prune(self, now):
+        # Pairs idle for a day hold nothing a check would read
+        self._pairs = {key: pair for key, pair in self._pairs.items() if pair.day.totals(now)[1]}
+        self._prune_at = max(PRUNE_PAIRS, 2 * len(self._pairs))
+
+    def _set_caps(self):
+        limits = self.limits
+        self._hourly_amount = _cap(limits.hourly_amount)
+        self._daily_amount = _cap(limits.daily_amount)
+        self._recipient_daily_amount = _cap(limits.recipient_daily_amount)
+        self._anomaly_min = _cap(limits.anomaly_min_amount)
+
+    def _restore(self, state):
+        if not state:
+            return
+        for account_id, entry in state['senders'].items():
+            sender = self._senders[account_id] = _Sender()
+            sender.mean, sender.var, sender.n = entry['ewma']
+            if 'day' in entry:
+                sender.minute = SlidingWindow.restore(*MINUTE, entry['minute'])
+                sender.hour = SlidingWindow.restore(*HOUR, entry['hour'])
+                sender.day = SlidingWindow.restore(*DAY, entry['day'])
+        for account_id, recipient, hour, day in state.get('pairs', ()):
+            pair = self._pairs[account_id, recipient] = _Pair()
+            pair.hour = SlidingWindow.restore(*HOUR, hour)
+            pair.day = SlidingWindow.restore(*DAY, day)
+        self._restored = state['seq']
+
+    def _on_rows(self, rows):
+        start = self._seen
+        self._seen += len(rows)
+        # Rows up to the snapshot are already in the restored state
+        if self._restored > start or len(rows) > self.replay_limit:
+            rows = rows[max(self._restored - start, len(rows) - self.replay_limit):]
+        name = self.ledger.name
+        alpha = self.limits.alpha
+        with self._lock:
+            senders, pairs = self._senders, self._pairs
+            # One tolist() walk: appends are a row or two, where numpy masks cost more than the fold
+            for ts, amount, _, account, counterparty, _, kind in rows.tolist():
+                if kind != DEBIT:
+                    continue
+                account_id = name(account)
+                sender = senders.get(account_id)
+                if sender is None:
+                    sender = senders[account_id] = _Sender()
+                sender.minute.add(ts, amount)
+                sender.hour.add(ts, amount)
+                sender.day.add(ts, amount)
+                # Exponentially weighted mean and variance of amounts
+                if sender.n:
+                    diff = amount - sender.mean
+                    increment = alpha * diff
+                    sender.mean += increment
+                    sender.var = (1 - alpha) * (sender.var + diff * increment)
+                else:
+                    sender.mean = float(amount)
+                sender.n += 1
+
+                if counterparty < 0:
+                    continue
+                key = (account_id, name(counterparty))
+                pair = pairs.get(key)
+                if pair is None:
+                    pair = pairs[key] = _Pair()
+                pair.hour.add(ts, amount)
+                pair.day.add(ts, amount)
+            if len(pairs) > self._prune_at:
+                self._prune(int(self.clock()))
+
+
+def _cap(amount):
+    return amount if amount == math.inf else to_minor(amount)
@@ -0,0 +1,201 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from .idempotency import idempotency_key
+
+
+class Session:
+    """Per-browser-session state over the shared banking backend.
+
+    The processor (ledger, account store, intent classifier) is shared by
+    every session; a session only carries the account it is logged in as,
+    its own recorder and a lock that serializes its actions. All account
+    operations are scoped to ``account_id``.
+
+    Logging in checks the account's PIN and issues a signed session
+    ``token``; ``resume`` binds a session to the token's account without
+    checking the PIN again. Sessions never open accounts: that is
+    ``TransactionProcessor.open_account``'s job.
+    """
+
+    def __init__(self, session_id, processor, recorder_factory=None):
+        self.session_id = session_id
+        self.processor = processor
+        self.account_id = None
+        self.token = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.RLock()
+        self._recorder_factory = recorder_factory
+        self._recorder = None
+
+    @property
+    def authenticated(self):
+        return self.account_id is not None
+
+    @property
+    def recorder(self):
+        """This session's recorder, created on first use"""
+        if self._recorder is None:
+            with self.lock:
+                if self._recorder is None:
+                    if self._recorder_factory is None:
+                        raise RuntimeError("No recorder factory configured")
+                    self._recorder = self._recorder_factory()
+        return self._recorder
+
+    def login(self, account_id, pin):
+        """Bind the session to an existing account if ``pin`` is right; returns the token or None"""
+        # Unknown accounts fail the PIN check, in the same time as a wrong PIN
+        token = self.processor.credentials.login(account_id, pin)
+        if token is None:
+            return None
+        if not self.processor.accounts.has_account(account_id):
+            self.processor.credentials.revoke(account_id, token)
+            return None
+        with self.lock:
+            self._bind(account_id, token)
+            return token
+
+    def resume(self, token):
+        """Bind the session to a live token's account; False if the token is not valid"""
+        account_id = self.processor.credentials.check_token(token)
+        if account_id is None:
+            return False
+        with self.lock:
+            self.account_id = account_id
+            self.token = token
+        return True
+
+    def logout(self):
+        with self.lock:
+            if self.token is not None:
+                self.processor.credentials.revoke(self.account_id, self.token)
+            self.account_id = None
+            self.token = None
+
+    def get_balance(self):
+        return self.processor.get_balance(self._account())
+
+    def check_balance(self):
+        return self.processor.check_balance(self._account())
+
+    def recent_transactions(self, count=10):
+        return self.processor.transactions.last(count, account=self._account())
+
+    def show_transactions(self, count=5):
+        return self.processor.show_transactions(count, account_id=self._account())
+
+    def process_transfer(self, command_text, idempotency_key=None):
+        with self.lock:
+            return self.processor.process_transfer(command_text, account_id=self._account(),
+                                                   idempotency_key=idempotency_key)
+
+    def change_pin(self, old_pin, new_pin):
+        """Change this account's PIN; other sessions' tokens are revoked and this one gets a new token"""
+        with self.lock:
+            account_id = self._account()
+            changed = self.processor.change_pin_manual(old_pin, new_pin, account_id)
+            if changed:
+                self.token = self.processor.credentials.issue_token(account_id)
+            return changed
+
+    def run_command(self, command_text):
+        """Classify a voice command and execute it; returns (intent, response)"""
+        intent = self.processor.classify_intent(command_text)
+        return intent, self.execute(intent, command_text)
+
+    def execute(self, intent, command_text, request_id=None):
+        """Execute an already classified command; returns the response text
+
+        ``request_id`` (e.g. the audio digest) makes a transfer idempotent
+        within this session: replaying the same request does not move money
+        twice.
+        """
+        if intent == 'transfer':
+            key = idempotency_key(self.session_id, request_id) if request_id is not None else None
+            response = self.process_transfer(command_text, idempotency_key=key)
+        elif intent == 'balance':
+            response = self.check_balance()
+        elif intent == 'transactions':
+            response = self.show_transactions()
+        elif intent == 'spending':
+            response = self.processor.answer_spending_query(command_text, self._account())
+        elif intent == 'change_pin':
+            response = "Please use 'Account Settings' for voice PIN change feature"
+        else:
+            response = "Sorry, I didn't understand that command. Try: 'Transfer 500 to John', 'Check balance', or 'Show transactions'"
+        return response
+
+    def _bind(self, account_id, token):
+        if self.token is not None:
+            self.processor.credentials.revoke(self.account_id, self.token)
+        self.account_id = account_id
+        self.token = token
+
+    def _account(self):
+        if self.account_id is None:
+            raise PermissionError("Session is not logged in")
+        return self.account_id
+
+
+class SessionManager:
+    """Maps session ids to Session handles and evicts idle ones.
+
+    Sessions are kept in least-recently-used order, so idle eviction only
+    looks at the oldest entries and costs O(evicted) per call. At most
+    ``max_sessions`` are kept; past that the least recently used session is
+    dropped even if it is not idle yet.
+    """
+
+    def __init__(self, processor, recorder_factory=None, idle_timeout=900, max_sessions=10000):
+        self.processor = processor
+        self.recorder_factory = recorder_factory
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def new_session_id(self):
+        return uuid.uuid4().hex
+
+    def get(self, session_id):
+        """Return the session for ``session_id``, creating it if needed"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.processor, self.recorder_factory)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+            self._evict(now)
+        return session
+
+    def release(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        """Drop sessions idle for longer than idle_timeout; returns how many"""
+        with self._lock:
+            return self._evict(time.monotonic())
+
+    def _evict(self, now):
+        evicted = 0
+        cutoff = now - self.idle_timeout
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and session.last_seen > cutoff:
+                break
+            del self._sessions[session_id]
+            evicted += 1
+        return evicted
@@ -0,0 +1,207 @@
+import json
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from .audio import AudioClip
+
+# kind is 'partial' or 'final'; clip is the captured utterance on 'final'
+TranscriptEvent = namedtuple('TranscriptEvent', ['kind', 'text', 'clip'])
+
+
+def microphone_chunks(source, max_duration=10):
+    """Yield raw PCM chunks from an open ``speech_recognition`` Microphone"""
+    chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+    elapsed = 0.0
+    while elapsed < max_duration:
+        yield source.stream.read(source.CHUNK)
+        elapsed += chunk_seconds
+
+
+def wav_chunks(source, chunk_ms=30, realtime=False):
+    """Fake microphone: yield PCM chunks from a WAV file or AudioClip.
+
+    With ``realtime=True`` each chunk is delayed by its own duration, so
+    latency measurements match a live microphone.
+    """
+    clip = source if isinstance(source, AudioClip) else AudioClip.from_wav(source)
+    frame_bytes = clip.sample_width * clip.channels
+    step = max(1, int(clip.sample_rate * chunk_ms / 1000)) * frame_bytes
+    for start in range(0, len(clip.data), step):
+        if realtime:
+            time.sleep(chunk_ms / 1000)
+        yield clip.data[start:start + step]
+
+
+class EnergyVAD:
+    """RMS-energy voice activity detector over 16-bit PCM chunks.
+
+    The noise floor is estimated from the first ``calibration_ms`` of input
+    (instead of a blocking one-second ambient-noise adjustment). Speech
+    starts after ``speech_start_ms`` of consecutive loud chunks and ends after
+    ``end_silence_ms`` of quiet ones.
+    """
+
+    def __init__(self, sample_rate=16000, sample_width=2, threshold=None, calibration_ms=150,
+                 factor=3.0, min_threshold=300.0, speech_start_ms=60, end_silence_ms=500):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.threshold = threshold
+        self.calibration_ms = calibration_ms
+        self.factor = factor
+        self.min_threshold = min_threshold
+        self.speech_start_ms = speech_start_ms
+        self.end_silence_ms = end_silence_ms
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self._noise = []
+        self._noise_ms = 0.0
+        self._voiced_ms = 0.0
+        self._silence_ms = 0.0
+
+    def chunk_ms(self, chunk):
+        return 1000.0 * len(chunk) / (self.sample_width * self.sample_rate)
+
+    def rms(self, chunk):
+        samples = np.frombuffer(chunk, dtype='<i2').astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+    def update(self, chunk):
+        """Feed one chunk; returns 'silence', 'start', 'speech' or 'end'"""
+        duration = self.chunk_ms(chunk)
+        energy = self.rms(chunk)
+
+        if self.threshold is None:
+            self._noise.append(energy)
+            self._noise_ms += duration
+            if self._noise_ms < self.calibration_ms:
+                return 'silence'
+            self.threshold = max(self.min_threshold, self.factor * float(np.median(self._noise)))
+
+        voiced = energy >= self.threshold
+        if not self.in_speech:
+            self._voiced_ms = self._voiced_ms + duration if voiced else 0.0
+            if self._voiced_ms >= self.speech_start_ms:
+                self.in_speech = True
+                self._silence_ms = 0.0
+                return 'start'
+            return 'silence'
+
+        self._silence_ms = 0.0 if voiced else self._silence_ms + duration
+        if self._silence_ms >= self.end_silence_ms:
+            self.in_speech = False
+            return 'end'
+        return 'speech'
+
+
+class BufferedSTT:
+    """Streaming adapter for any whole-clip recognizer.
+
+    ``transcribe`` takes an AudioClip and returns text. Audio is buffered
+    as it arrives; every ``partial_interval`` seconds of new audio the
+    buffer so far is transcribed for a partial result. With the default of
+    None only the final transcript is produced, so network recognizers are
+    called once per utterance.
+    """
+
+    def __init__(self, transcribe, sample_rate=16000, sample_width=2, partial_interval=None):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.partial_interval = partial_interval
+        self._buffer = bytearray()
+        self._since_partial = 0.0
+
+    def accept(self, chunk):
+        """Add audio; returns partial text or None"""
+        self._buffer.extend(chunk)
+        if self.partial_interval is None:
+            return None
+        self._since_partial += len(chunk) / (self.sample_width * self.sample_rate)
+        if self._since_partial < self.partial_interval:
+            return None
+        self._since_partial = 0.0
+        return self.transcribe(self.clip())
+
+    def finish(self):
+        return self.transcribe(self.clip())
+
+    def clip(self):
+        return AudioClip(bytes(self._buffer), self.sample_rate, self.sample_width)
+
+
+class VoskSTT:
+    """Offline incremental recognizer backed by Vosk (optional dependency)"""
+
+    def __init__(self, model_path, sample_rate=16000, sample_width=2):
+        from vosk import Model, KaldiRecognizer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._recognizer = KaldiRecognizer(Model(model_path), sample_rate)
+        self._buffer = bytearray()
+
+    def accept(self, chunk):
+        self._buffer.extend(chunk)
+        if self._recognizer.AcceptWaveform(bytes(chunk)):
+            return json.loads(self._recognizer.Result()).get('text') or None
+        return json.loads(self._recognizer.PartialResult()).get('partial') or None
+
+    def finish(self):
+        return json.loads(self._recognizer.FinalResult()).get('text', '')
+
+    def clip(self):
+        return AudioClip(bytes(self._buffer), self.sample_rate, self.sample_width)
+
+
+def stream_transcribe(chunks, backend, vad, pre_roll_ms=200, no_speech_timeout=5.0):
+    """Run VAD over ``chunks`` and feed the utterance to ``backend`` as it arrives.
+
+    Yields TranscriptEvent('partial', ...) whenever the backend has new
+    partial text, then exactly one TranscriptEvent('final', text, clip) once
+    speech ends, the chunks run out, or no speech starts within
+    ``no_speech_timeout`` seconds (text is then empty).
+    """
+    pre_roll = deque()
+    pre_roll_ms_buffered = 0.0
+    waited_ms = 0.0
+    last_partial = None
+    started = False
+
+    for chunk in chunks:
+        state = vad.update(chunk)
+        duration = vad.chunk_ms(chunk)
+
+        if not started:
+            pre_roll.append(chunk)
+            pre_roll_ms_buffered += duration
+            while pre_roll_ms_buffered - vad.chunk_ms(pre_roll[0]) >= pre_roll_ms:
+                pre_roll_ms_buffered -= vad.chunk_ms(pre_roll.popleft())
+            if state != 'start':
+                waited_ms += duration
+                if waited_ms >= no_speech_timeout * 1000:
+                    yield TranscriptEvent('final', '', None)
+                    return
+                continue
+            # Speech onset: include the pre-roll so the first syllable is not clipped
+            started = True
+            pending = list(pre_roll)
+            pre_roll.clear()
+        else:
+            pending = [chunk]
+
+        for part in pending:
+            partial = backend.accept(part)
+            if partial and partial != last_partial:
+                last_partial = partial
+                yield TranscriptEvent('partial', partial, None)
+
+        if state == 'end':
+            break
+
+    if not started:
+        yield TranscriptEvent('final', '', None)
+        return
+    yield TranscriptEvent('final', backend.finish(), backend.clip())
@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from .audio import AudioClip
+from .cache import LRUCache
+from .metrics import REGISTRY
+
+
+def _observed(backend, transcribe, clip):
+    """Run one STT call, recording its latency and any failure by backend"""
+    try:
+        with REGISTRY.timer('stt_request_seconds', backend=backend):
+            return transcribe(clip)
+    except Exception as e:
+        REGISTRY.counter('stt_failures_total', backend=backend, reason=type(e).__name__).inc()
+        raise
+
+
+class GoogleSTT:
+    """Google Web Speech recognition (network round-trip per call)"""
+
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, clip):
+        return _observed('google', self._recognize, clip)
+
+    def _recognize(self, clip):
+        return self.recognizer.recognize_google(clip.to_audio_data())
+
+
+class WhisperSTT:
+    """Local offline Whisper model, loaded once per instance"""
+
+    def __init__(self, model_name="base"):
+        import whisper
+        self.model = whisper.load_model(model_name)
+
+    def transcribe(self, clip):
+        return _observed('whisper', self._recognize, clip)
+
+    def _recognize(self, clip):
+        result = self.model.transcribe(clip.to_float32(16000), fp16=False)
+        return result["text"].strip()
+
+
+class FallbackSTT:
+    """Try backends in order until one returns text"""
+
+    def __init__(self, backends):
+        self.backends = backends
+
+    def transcribe(self, clip):
+        error = None
+        for backend in self.backends:
+            try:
+                text = backend.transcribe(clip)
+                if text:
+                    return text
+            except Exception as e:
+                error = e
+        if error is not None:
+            raise error
+        return ""
+
+
+# Backend instance owned by each pool worker process
+_worker_backend = None
+
+
+def _init_worker(factory, kwargs):
+    global _worker_backend
+    _worker_backend = factory(**kwargs)
+
+
+def _worker_ready():
+    # Hold briefly so each warm-up task lands on a different worker
+    time.sleep(0.1)
+    return os.getpid()
+
+
+def _worker_transcribe(data, sample_rate, sample_width, channels):
+    return _worker_backend.transcribe(AudioClip(data, sample_rate, sample_width, channels))
+
+
+class STTWorkerPool:
+    """Warm pool of STT worker processes with backpressure and a result cache.
+
+    Each worker process builds its own backend (``factory(**kwargs)``) once
+    at startup, so model loading is paid up front and inference runs outside
+    the GIL. At most ``max_pending`` clips are queued or running; past that
+    ``submit`` blocks up to ``timeout`` seconds and then raises
+    ``queue.Full``. Results are cached by the clip's content hash, and
+    concurrent submissions of the same clip share one future.
+    """
+
+    def __init__(self, factory, workers=2, max_pending=8, cache_size=256, **kwargs):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(factory, kwargs))
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.cache = LRUCache(cache_size)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Start every worker and wait for its backend to load"""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        return sorted({future.result() for future in futures})
+
+    def submit(self, clip, timeout=None):
+        """Queue a clip; returns a Future resolving to the transcript"""
+        key = clip.digest
+        cached = self.cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        with self._lock:
+            if key in self._inflight:
+                return self._inflight[key]
+
+        if not self._slots.acquire(timeout=timeout):
+            raise queue.Full("STT pool is saturated")
+        with self._lock:
+            if key in self._inflight:
+                self._slots.release()
+                return self._inflight[key]
+            future = self._executor.submit(_worker_transcribe, clip.data, clip.sample_rate,
+                                           clip.sample_width, clip.channels)
+            self._inflight[key] = future
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def transcribe(self, clip):
+        """Blocking transcription through the pool"""
+        return _observed('pool', lambda clip: self.submit(clip).result(), clip)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _finish(self, key, future):
+        with self._lock:
+            self._inflight.pop(key, None)
+        self._slots.release()
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
@@ -1,120 +1,191 @@
-import re
-from datetime import datetime
-import hashlib
+from decimal import Decimal
+
+import numpy as np
+
+from .ledger import Ledger
+from .accounts import AccountStore
+from .intent import IntentMatcher
+from .intent_model import HybridIntentClassifier
+from .dashboard_view import DashboardView
+from .analytics import SpendingAnalytics, parse_spending_query
+from .entities import EntityParser
+from .credentials import CredentialService
+from .risk import RiskEngine, TransferBlocked
+from .ledger_io import export_ledger, import_ledger
+from .money import to_minor
+from .metrics import REGISTRY
+
+DEFAULT_ACCOUNT = 'user123'
+INITIAL_BALANCE = 10000
 
 class TransactionProcessor:
-    def __init__(self):
-        self.transactions = []
-        self.account_balance = 10000  # Initial balance
-        self.users = {
-            'user123': {
-                'pin': self.hash_pin('1234'),
-                'balance': 10000
-            }
-        }
+    def __init__(self, ledger_dir=None, intent_keywords=None, intent_backend=None, credentials=None,
+                 risk_limits=None):
+        # Durable when ledger_dir is given, in-memory otherwise
+        self.transactions = Ledger(ledger_dir)
+        # Opt-in velocity, cap and anomaly checks from streaming windows, snapshotted with the ledger
+        self.risk = None
+        if risk_limits is not None:
+            self.risk = RiskEngine(self.transactions, risk_limits)
+            self.transactions.state_provider = lambda: {'risk': self.risk.snapshot()}
+        self.accounts = AccountStore(self.transactions, risk=self.risk)
+        self.dashboard = DashboardView(self.transactions)
+        self.analytics = SpendingAnalytics(self.transactions)
+        # PINs are salted scrypt records, hashed and checked in a worker pool
+        self.credentials = credentials or CredentialService()
+        self.intent_matcher = IntentMatcher(intent_keywords)
+        self.entities = EntityParser()
+        # Optional model backend, consulted only when keyword confidence is low
+        if intent_backend is not None:
+            self.intent_classifier = HybridIntentClassifier(self.intent_matcher, intent_backend)
+        else:
+            self.intent_classifier = self.intent_matcher
+        self.open_account(DEFAULT_ACCOUNT, '1234', INITIAL_BALANCE)
+    
+    @property
+    def account_balance(self):
+        """Balance of the default account"""
+        return self.accounts.balance(DEFAULT_ACCOUNT)
+    
+    @account_balance.setter
+    def account_balance(self, value):
+        self.accounts.set_balance(DEFAULT_ACCOUNT, value)
+    
+    def open_account(self, account_id, pin, initial_balance=INITIAL_BALANCE):
+        """Register a user account; existing ledger history wins over initial_balance"""
+        if account_id not in self.credentials:
+            self.credentials.set_pin(account_id, pin)
+        return self.accounts.open_account(account_id, initial_balance)
+    
+    def get_balance(self, account_id=DEFAULT_ACCOUNT):
+        return self.accounts.balance(account_id)
     
     def hash_pin(self, pin):
         """Hash PIN for security"""
-        return hashlib.sha256(pin.encode()).hexdigest()
+        return self.credentials.hash_pin(pin)
+    
+    def verify_pin(self, pin, account_id=DEFAULT_ACCOUNT):
+        """Check a PIN against the account's stored record"""
+        return self.credentials.check(account_id, pin)
     
     def classify_intent(self, text):
         """Classify user intent from voice command"""
-        text_lower = text.lower()
-        
-        # Transfer intent
-        if any(word in text_lower for word in ['transfer', 'send', 'pay', 'send money']):
-            return 'transfer'
-        # Balance intent
-        elif any(word in text_lower for word in ['balance', 'check balance', 'account balance']):
-            return 'balance'
-        # Transactions intent
-        elif any(word in text_lower for word in ['transaction', 'history', 'statement', 'transactions']):
-            return 'transactions'
-        # PIN change intent
-        elif any(word in text_lower for word in ['pin', 'change pin', 'reset pin', 'update pin']):
-            return 'change_pin'
-        else:
-            return 'unknown'
+        return self.intent_classifier.classify(text)[0]
+    
+    def classify_intent_scored(self, text):
+        """Classify user intent, returning (intent, confidence)"""
+        return self.intent_classifier.classify(text)
+    
+    def classify_many(self, texts):
+        """Classify a batch of voice commands into (intent, confidence) pairs"""
+        return self.intent_classifier.classify_many(texts)
     
     def extract_transfer_details(self, text):
         """Extract amount and recipient from transfer command"""
-        # Pattern for amount extraction
-        amount_pattern = r'(\d+)(?:\s*(?:dollars|rupees|rs|inr|\$))?'
-        amount_match = re.search(amount_pattern, text)
-        
-        # Pattern for recipient extraction
-        recipient_pattern = r'(?:to|for)\s+([a-zA-Z\s]+)'
-        recipient_match = re.search(recipient_pattern, text.lower())
-        
-        amount = None
-        recipient = None
-        
-        if amount_match:
-            amount = float(amount_match.group(1))
-        
-        if recipient_match:
-            recipient = recipient_match.group(1).strip()
-        
-        return amount, recipient
+        # Amount is a Decimal, exact down to the paisa; either may be None
+        entities = self.entities.parse(text)
+        return entities.amount, entities.recipient
     
     def extract_pin_from_speech(self, text):
         """Extract PIN digits from spoken text"""
-        number_words = {
-            'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
-            'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9',
-            'ten': '10', 'eleven': '11', 'twelve': '12', 'thirteen': '13', 
-            'fourteen': '14', 'fifteen': '15', 'sixteen': '16', 'seventeen': '17',
-            'eighteen': '18', 'nineteen': '19', 'twenty': '20'
-        }
-        
-        pin_digits = ""
-        words = text.lower().split()
-        
-        for word in words:
-            clean_word = word.strip('.,!?')
-            if clean_word in number_words:
-                pin_digits += number_words[clean_word]
-            elif clean_word.isdigit():
-                pin_digits += clean_word
-        
-        return pin_digits
+        return self.entities.parse(text).digits
     
-    def process_transfer(self, command_text):
-        """Process money transfer command"""
+    def process_transfer(self, command_text, account_id=DEFAULT_ACCOUNT, idempotency_key=None):
+        """Process money transfer command
+        
+        Retries carrying the same ``idempotency_key`` (a session id plus audio
+        digest, or a client token) are applied once.
+        """
         try:
-            amount, recipient = self.extract_transfer_details(command_text)
-            
-            if amount is None or recipient is None:
-                return "Could not understand transfer details. Please specify amount and recipient like 'transfer 500 to John'"
-            
-            if amount > self.account_balance:
-                return f"Insufficient funds. Available balance: ₹{self.account_balance}"
+            with _TRANSFER_SECONDS.time():
+                amount, recipient = self.extract_transfer_details(command_text)
+                
+                if amount is None or recipient is None:
+                    _transfer_result('not_understood')
+                    return "Could not understand transfer details. Please specify amount and recipient like 'transfer 500 to John'"
+                
+                success, balance = self.accounts.transfer(account_id, recipient, amount,
+                                                          idempotency_key=idempotency_key)
+            if not success:
+                _transfer_result('insufficient_funds')
+                return f"Insufficient funds. Available balance: ₹{balance}"
             
-            # Process transfer
-            self.account_balance -= amount
-            self.users['user123']['balance'] = self.account_balance
-            
-            transaction = {
-                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'type': 'debit',
-                'amount': amount,
-                'description': f'Transfer to {recipient}',
-                'balance_after': self.account_balance
-            }
-            self.transactions.append(transaction)
-            
-            return f"✅ Successfully transferred ₹{amount} to {recipient}. New balance: ₹{self.account_balance}"
+            _transfer_result('ok')
+            return f"✅ Successfully transferred ₹{amount} to {recipient}. New balance: ₹{balance}"
             
+        except TransferBlocked as e:
+            _transfer_result('blocked')
+            return f"🚫 Transfer blocked: {e}"
         except Exception as e:
+            _transfer_result('error')
             return f"❌ Error processing transfer: {str(e)}"
     
-    def check_balance(self):
+    def process_transfers_batch(self, instructions, account_id=DEFAULT_ACCOUNT, atomic=True):
+        """Process many transfer instructions in one pass.
+        
+        Each instruction is either a command string ("transfer 500 to John")
+        or a dict with 'amount', 'recipient' and optional 'account'. Returns
+        the result dict from AccountStore.transfer_batch.
+        """
+        sources = []
+        recipients = []
+        amounts = []
+        instructions = list(instructions)
+        parsed = iter(self.entities.parse_many([item for item in instructions if isinstance(item, str)]))
+        for item in instructions:
+            if isinstance(item, str):
+                entities = next(parsed)
+                sources.append(account_id)
+                amounts.append(None if entities.amount is None else str(entities.amount))
+                recipients.append(entities.recipient)
+            else:
+                sources.append(item.get('account', account_id))
+                amounts.append(item.get('amount'))
+                recipients.append(item.get('recipient'))
+        
+        return self.accounts.transfer_batch(sources, recipients, amounts, atomic=atomic)
+    
+    def spent_to(self, counterparty, period=None, account_id=DEFAULT_ACCOUNT):
+        """Total sent to ``counterparty`` over a period name from analytics.PERIODS"""
+        return self.analytics.sent_to(account_id, counterparty, period)
+    
+    def spending_by_recipient(self, period=None, account_id=DEFAULT_ACCOUNT):
+        """Sent/received/count per counterparty over a period"""
+        return self.analytics.by_counterparty(account_id, period)
+    
+    def top_recipients(self, k=5, period=None, account_id=DEFAULT_ACCOUNT):
+        """The k recipients with the most money sent, as (name, amount)"""
+        return self.analytics.top_recipients(account_id, k, period)
+    
+    def period_summary(self, bucket='month', periods=12, account_id=DEFAULT_ACCOUNT):
+        """Sent/received totals for the last few days or months"""
+        return self.analytics.period_totals(account_id, bucket, periods)
+    
+    def answer_spending_query(self, command_text, account_id=DEFAULT_ACCOUNT):
+        """Answer "how much did I send to John this month" style questions"""
+        period, recipient, top = parse_spending_query(command_text)
+        when = period or "in total"
+        if recipient and recipient not in ('me', 'my account'):
+            amount = self.spent_to(recipient, period, account_id)
+            return f"📊 You sent ₹{amount} to {recipient} {when}."
+        if top:
+            ranked = self.top_recipients(3, period, account_id)
+            if not ranked:
+                return f"📊 No transfers {when}."
+            lines = [f"{i}. {name} - ₹{amount}" for i, (name, amount) in enumerate(ranked, 1)]
+            return f"📊 Top recipients {when}:\n" + "\n".join(lines)
+        by_recipient = self.spending_by_recipient(period, account_id)
+        sent = sum((totals['sent'] for totals in by_recipient.values()), Decimal(0))
+        count = sum(totals['count'] for totals in by_recipient.values())
+        return f"📊 You sent ₹{sent:.2f} {when} across {count} transactions."
+    
+    def check_balance(self, account_id=DEFAULT_ACCOUNT):
         """Check account balance"""
-        return f"💰 Your current account balance is: ₹{self.account_balance}"
+        return f"💰 Your current account balance is: ₹{self.get_balance(account_id)}"
     
-    def show_transactions(self, count=5):
+    def show_transactions(self, count=5, account_id=DEFAULT_ACCOUNT):
         """Show recent transactions"""
-        recent_txns = self.transactions[-count:] if self.transactions else []
+        recent_txns = self.transactions.last(count, account=account_id)
         
         if not recent_txns:
             return "No recent transactions found."
@@ -126,9 +197,39 @@ class TransactionProcessor:
         
         return result
     
-    def change_pin_manual(self, old_pin, new_pin):
+    def export_transactions(self, path, format=None, account_id=None):
+        """Stream the ledger, or one account's records, to Parquet/Arrow/CSV"""
+        return export_ledger(self.transactions, path, format, account=account_id)
+    
+    def import_transactions(self, path, format=None, account_id=DEFAULT_ACCOUNT):
+        """Bulk-load a ledger export or statement; rows without an account go to account_id
+        
+        Open accounts touched by the import take their balance from its last row;
+        a statement without balances runs on from the account's live balance.
+        """
+        def opening(account):
+            return to_minor(self.accounts.balance(account)) if self.accounts.has_account(account) else None
+
+        imported = import_ledger(self.transactions, path, format, account=account_id, opening=opening)
+        rows = self.transactions.rows()[imported.start:imported.stop]
+        for name_id in np.unique(rows['account']).tolist():
+            account = self.transactions.name(name_id)
+            if self.accounts.has_account(account):
+                last = self.transactions.last(1, account=account)[0]
+                self.accounts.set_balance(account, last['balance_after'])
+        return imported
+    
+    def change_pin_manual(self, old_pin, new_pin, account_id=DEFAULT_ACCOUNT):
         """Change user PIN manually"""
-        if self.hash_pin(old_pin) == self.users['user123']['pin']:
-            self.users['user123']['pin'] = self.hash_pin(new_pin)
-            return True
-        return False
\ No newline at end of file
+        return self.credentials.change_pin(account_id, old_pin, new_pin)
+
+
+_TRANSFER_SECONDS = REGISTRY.histogram('transfer_seconds', "Transfer command handling time")
+_TRANSFERS = {
+    result: REGISTRY.counter('transfers_total', "Voice and text transfer commands by outcome", result=result)
+    for result in ('ok', 'insufficient_funds', 'not_understood', 'blocked', 'error')
+}
+
+
+def _transfer_result(result):
+    _TRANSFERS[result].inc()
@@ -1,45 +1,199 @@
-import pickle
+import json
+import logging
 import os
+import threading
 import time
 
+import numpy as np
+
+from .voice_index import VoiceprintIndex
+from .profile_store import ProfileStore
+from .audio import AudioClip
+from .features import FeatureExtractor
+from .metrics import REGISTRY
+
+EMBEDDING_DIM = 13
+CALIBRATION_FILE = "calibration.json"
+
+logger = logging.getLogger(__name__)
+
+# Raw mean MFCCs are dominated by c0 (loudness) and spectral tilt, which
+# every recording shares, so embeddings are normalized against background
+# statistics before the cosine. These defaults come from
+# ``python -m benchmarks.bench_voice_auth --calibrate`` on the synthetic
+# voices of ``benchmarks.corpus``, not on speech: they keep the tests and
+# benchmarks meaningful but say nothing about real users. Until
+# ``VoiceAuthenticator.calibrate`` has fitted statistics on real
+# recordings, ``calibrated`` is False, a warning is logged, and a voice
+# match must only ever be a second factor next to the PIN (both the API
+# and the Streamlit app always ask for the PIN).
+DEFAULT_BACKGROUND_MEAN = (-202.63, 31.56, 15.55, 2.80, -0.23, -0.68, -2.21, -3.39, -2.99, -2.83, -3.47, -4.00, -4.36)
+DEFAULT_BACKGROUND_STD = (2.682, 5.396, 10.435, 8.995, 4.374, 2.006, 3.241, 3.322, 2.952, 2.683, 3.002, 2.791, 2.252)
+DEFAULT_THRESHOLD = 0.949
+
+
+def normalize_embeddings(embeddings, mean, std):
+    """Mean/variance-normalize embeddings against background statistics"""
+    return (np.asarray(embeddings, dtype=np.float32) - mean) / std
+
+
+def calibrate_threshold(impostor_scores, far=0.01):
+    """Lowest threshold accepting at most ``far`` of the impostor scores"""
+    return float(np.quantile(impostor_scores, 1 - far, method='higher'))
+
+
+def pair_scores(embeddings, speakers):
+    """Cosine scores of every same-speaker and cross-speaker pair"""
+    vectors = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = vectors @ vectors.T
+    speakers = np.asarray(speakers)
+    same = speakers[:, None] == speakers[None, :]
+    upper = np.triu(np.ones_like(same), k=1)
+    return scores[same & upper], scores[~same & upper]
+
+
 class VoiceAuthenticator:
-    def __init__(self, state_file="voice_profiles.pkl"):
-        self.state_file = state_file
-        self.voice_profiles = self.load_voice_profiles()
+    def __init__(self, state_dir="voice_profiles", threshold=None, legacy_file="voice_profiles.pkl"):
+        self.features = FeatureExtractor(n_mfcc=EMBEDDING_DIM)
+        self.store = ProfileStore(state_dir, dim=EMBEDDING_DIM)
+        # Keeps the store and the index on the same embedding when enrollments race
+        self._enroll_lock = threading.Lock()
+        self._calibration_path = os.path.join(state_dir, CALIBRATION_FILE)
+        self._load_calibration()
+        if threshold is not None:
+            self.threshold = threshold
+        if not len(self.store) and legacy_file and os.path.exists(legacy_file):
+            imported, skipped = self.store.import_pickle(legacy_file, embed=self.create_voice_embedding)
+            print(f"✓ Migrated {imported} voice profiles from {legacy_file}")
+            if skipped:
+                print(f"⚠️ {len(skipped)} voice profiles could not be migrated and must re-enroll: "
+                      f"{', '.join(map(str, skipped))}")
+        self.voice_profiles = self.store.profiles
+        
+        self._build_index()
+
+    def calibrate(self, background, held_out, far=0.01):
+        """Fit background statistics and the threshold, and persist them.
+
+        ``background`` is a list of recordings (AudioClips or WAV paths)
+        from many speakers; its embeddings give the normalization mean and
+        standard deviation. ``held_out`` is a list of ``(speaker, audio)``
+        from other speakers, at least two recordings each; the threshold is
+        set so that at most ``far`` of its cross-speaker pairs would be
+        accepted. Returns the threshold with the false-accept and
+        false-reject rates on the held-out pairs.
+        """
+        reference = self.features.embed_batch(list(background))
+        mean = reference.mean(axis=0)
+        std = np.maximum(reference.std(axis=0), 1e-6)
+        speakers = [speaker for speaker, _ in held_out]
+        embeddings = self.features.embed_batch([audio for _, audio in held_out])
+        genuine, impostor = pair_scores(normalize_embeddings(embeddings, mean, std), speakers)
+        if not len(genuine) or not len(impostor):
+            raise ValueError("held_out needs two or more speakers with two or more recordings each")
+        threshold = calibrate_threshold(impostor, far)
+
+        with open(self._calibration_path, 'w') as f:
+            json.dump({'mean': mean.tolist(), 'std': std.tolist(), 'threshold': threshold}, f)
+        self.background_mean, self.background_std, self.threshold = mean, std, threshold
+        self._build_index()
+        return {
+            'threshold': threshold,
+            'far': float((impostor > threshold).mean()),
+            'frr': float((genuine <= threshold).mean()),
+        }
     
-    def load_voice_profiles(self):
+    def create_voice_embedding(self, audio):
+        """Create voice embedding (mean MFCC) from an AudioClip or WAV path"""
         try:
-            if os.path.exists(self.state_file):
-                with open(self.state_file, 'rb') as f:
-                    return pickle.load(f)
-            return {}
-        except:
-            return {}
+            with REGISTRY.timer('voice_embedding_seconds'):
+                return self.features.embed(audio)
+        except Exception as e:
+            print(f"❌ Voice embedding error: {e}")
+            return None
     
-    def save_voice_profiles(self):
+    def enroll_user(self, user_id, audio, archive_path=None):
+        """Enroll a user by storing the voice embedding of their recording
+        
+        ``audio`` is an AudioClip or WAV path. A clip is only written to disk
+        when ``archive_path`` is given.
+        """
+        embedding = self.create_voice_embedding(audio)
+        if embedding is None:
+            return False
+        
         try:
-            with open(self.state_file, 'wb') as f:
-                pickle.dump(self.voice_profiles, f)
-            return True
-        except:
+            if isinstance(audio, AudioClip):
+                audio_file = audio.save(archive_path) if archive_path else None
+            else:
+                audio_file = audio
+            with self._enroll_lock:
+                self.store.put(user_id, embedding, enrolled_at=time.time(), audio_file=audio_file)
+                self.index.add(user_id, self._normalize(embedding))
+        except OSError as e:
+            print(f"❌ Could not save voice profile: {e}")
             return False
+        self.voice_profiles = self.store.profiles
+        print(f"✓ User {user_id} enrolled successfully!")
+        return True
     
-    def enroll_user(self, user_id, audio_path):
-        """Simple enrollment - just store that user is enrolled"""
-        self.voice_profiles[user_id] = {
-            'enrolled_at': time.time(),
-            'audio_file': audio_path
-        }
-        success = self.save_voice_profiles()
-        if success:
-            print(f"✓ User {user_id} enrolled successfully!")
-        return success
-    
-    def authenticate_user(self, user_id, audio_path):
-        """Simple authentication - check if user is enrolled"""
-        if user_id in self.voice_profiles:
+    def authenticate_user(self, user_id, audio):
+        """Verify a recording against the user's enrolled voiceprint"""
+        if user_id not in self.index:
+            print(f"❌ User {user_id} not enrolled")
+            _auth_result('not_enrolled')
+            return False, 0.0
+        
+        embedding = self.create_voice_embedding(audio)
+        if embedding is None:
+            _auth_result('error')
+            return False, 0.0
+        
+        similarity = self.index.verify(user_id, self._normalize(embedding))
+        if similarity > self.threshold:
             print(f"✓ User {user_id} authenticated successfully!")
-            return True, 1.0
+            _auth_result('accepted')
+            return True, similarity
+        print(f"❌ Voice mismatch for {user_id}: {similarity:.4f}")
+        _auth_result('rejected')
+        return False, similarity
+    
+    def identify_speaker(self, audio, k=3, approximate=False):
+        """Return the top-k enrolled users most similar to the recording"""
+        embedding = self.create_voice_embedding(audio)
+        if embedding is None:
+            return []
+        return self.index.identify(self._normalize(embedding), k=k, approximate=approximate)
+
+    def _normalize(self, embeddings):
+        return normalize_embeddings(embeddings, self.background_mean, self.background_std)
+
+    @property
+    def calibrated(self):
+        """Whether the statistics and threshold were fitted on real recordings with ``calibrate``"""
+        return os.path.exists(self._calibration_path)
+
+    def _load_calibration(self):
+        self.background_mean = np.array(DEFAULT_BACKGROUND_MEAN, dtype=np.float32)
+        self.background_std = np.array(DEFAULT_BACKGROUND_STD, dtype=np.float32)
+        self.threshold = DEFAULT_THRESHOLD
+        if not self.calibrated:
+            logger.warning("Voice authentication is not calibrated: using statistics fitted on synthetic "
+                           "fixtures. Run VoiceAuthenticator.calibrate on real recordings; until then a "
+                           "voice match is only a second factor to the PIN.")
         else:
-            print(f"❌ User {user_id} not enrolled")
-            return False, 0.0
\ No newline at end of file
+            with open(self._calibration_path) as f:
+                calibration = json.load(f)
+            self.background_mean = np.array(calibration['mean'], dtype=np.float32)
+            self.background_std = np.array(calibration['std'], dtype=np.float32)
+            self.threshold = calibration['threshold']
+
+    def _build_index(self):
+        self.index = VoiceprintIndex(dim=EMBEDDING_DIM, capacity=max(1024, len(self.store)))
+        user_ids = self.store.user_ids
+        if user_ids:
+            self.index.add_many(user_ids, self._normalize(self.store.embeddings_for(user_ids)))
+
+
+def _auth_result(result):
+    REGISTRY.counter('voice_auth_attempts_total', "Voice authentication attempts by outcome", result=result).inc()
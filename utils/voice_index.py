@@ -0,0 +1,164 @@
+import threading
+
+import numpy as np
+
+
+class VoiceprintIndex:
+    """Contiguous float32 matrix of L2-normalized voice embeddings.
+
+    Row ``i`` belongs to ``user_ids[i]``. Because rows are unit length, cosine
+    similarity is a plain dot product: 1:1 verification is a row dot, a
+    batch of verifications is one einsum, and 1:N identification is one
+    matrix-vector product followed by a top-k partial sort.
+
+    For large populations ``build_ann`` clusters the rows with spherical
+    k-means into an inverted file; ``identify(..., approximate=True)`` then
+    only scores the ``nprobe`` closest clusters.
+
+    Writers (``add``, ``add_many``, ``build_ann``) are serialized by a lock;
+    lookups do not take it.
+    """
+
+    def __init__(self, dim=13, capacity=1024):
+        self.dim = dim
+        self.user_ids = []
+        self._rows = {}
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._centroids = None
+        self._lists = None
+        self._unclustered = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    @property
+    def matrix(self):
+        """View of the populated rows"""
+        return self._matrix[:len(self.user_ids)]
+
+    def add(self, user_id, embedding):
+        """Insert or replace a user's embedding"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                row = len(self.user_ids)
+                if row == len(self._matrix):
+                    grown = np.zeros((max(1, 2 * len(self._matrix)), self.dim), dtype=np.float32)
+                    grown[:row] = self._matrix
+                    self._matrix = grown
+                self.user_ids.append(user_id)
+                self._rows[user_id] = row
+                if self._centroids is not None:
+                    self._unclustered.append(row)
+            self._matrix[row] = vector
+            return row
+
+    def add_many(self, user_ids, embeddings):
+        """Bulk insert users with one vectorized normalize and copy"""
+        with self._lock:
+            if any(user_id in self._rows for user_id in user_ids):
+                for user_id, embedding in zip(user_ids, embeddings):
+                    self.add(user_id, embedding)
+                return
+            vectors = self._normalize_rows(embeddings)
+            start = len(self.user_ids)
+            end = start + len(user_ids)
+            if end > len(self._matrix):
+                grown = np.zeros((max(end, 2 * len(self._matrix)), self.dim), dtype=np.float32)
+                grown[:start] = self._matrix[:start]
+                self._matrix = grown
+            self._matrix[start:end] = vectors
+            for row, user_id in enumerate(user_ids, start):
+                self.user_ids.append(user_id)
+                self._rows[user_id] = row
+                if self._centroids is not None:
+                    self._unclustered.append(row)
+
+    def get(self, user_id):
+        row = self._rows.get(user_id)
+        return None if row is None else self._matrix[row]
+
+    def verify(self, user_id, embedding):
+        """Cosine similarity between an enrolled user and a probe embedding"""
+        row = self._rows.get(user_id)
+        if row is None:
+            return 0.0
+        return float(self._matrix[row] @ self._normalize(embedding))
+
+    def verify_batch(self, user_ids, embeddings):
+        """Similarities for many (user, probe) pairs; unknown users score 0"""
+        probes = self._normalize_rows(embeddings)
+        rows = np.array([self._rows.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        known = rows >= 0
+        scores = np.zeros(len(rows), dtype=np.float32)
+        scores[known] = np.einsum('ij,ij->i', self._matrix[rows[known]], probes[known])
+        return scores
+
+    def identify(self, embedding, k=5, approximate=False, nprobe=8):
+        """Top-k ``(user_id, similarity)`` matches for a probe, best first"""
+        if not self.user_ids:
+            return []
+        probe = self._normalize(embedding)
+        if approximate and self._centroids is not None:
+            candidates = self._candidate_rows(probe, nprobe)
+            scores = self._matrix[candidates] @ probe
+        else:
+            candidates = None
+            scores = self.matrix @ probe
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if candidates is None else candidates[top]
+        return [(self.user_ids[row], float(score)) for row, score in zip(rows, scores[top])]
+
+    def build_ann(self, n_lists=None, iterations=10, seed=0, chunk=65536):
+        """Cluster rows into an inverted file for approximate identification"""
+        with self._lock:
+            data = self.matrix
+            n = len(data)
+            if n == 0:
+                return
+            n_lists = min(n, n_lists or max(1, int(np.sqrt(n))))
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(n, n_lists, replace=False)].copy()
+
+            assign = np.empty(n, dtype=np.int64)
+            for _ in range(iterations):
+                for start in range(0, n, chunk):
+                    assign[start:start + chunk] = np.argmax(data[start:start + chunk] @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                empty = ~sums.any(axis=1)
+                sums[empty] = centroids[empty]
+                centroids = self._normalize_rows(sums)
+
+            order = np.argsort(assign, kind='stable')
+            bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+            self._centroids = centroids
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(n_lists)]
+            self._unclustered = []
+
+    def _candidate_rows(self, probe, nprobe):
+        nprobe = min(nprobe, len(self._centroids))
+        nearest = np.argpartition(-(self._centroids @ probe), nprobe - 1)[:nprobe]
+        parts = [self._lists[i] for i in nearest]
+        if self._unclustered:
+            parts.append(np.array(self._unclustered, dtype=np.int64))
+        return np.concatenate(parts)
+
+    def _normalize(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _normalize_rows(self, embeddings):
+        rows = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return rows / norms